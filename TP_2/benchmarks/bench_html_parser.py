@@ -0,0 +1,116 @@
+"""
+benchmarks/bench_html_parser.py
+
+Compara el parsing con BeautifulSoup (HTML completo en memoria) contra
+StreamingPageParser (eventos lxml, pedazos de 8 KB) sobre una página
+sintética de varios MB.
+
+Cada variante corre en un proceso nuevo para que el pico de memoria (RSS)
+de una no afecte a la otra. Ejemplo:
+
+    python benchmarks/bench_html_parser.py --size-mb 8 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from typing import Dict, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.html_parser import StreamingPageParser, extract_page_bundle  # noqa: E402
+
+CHUNK_SIZE = 8192
+BASE_URL = "https://bench.example.com/"
+
+
+def _page_chunks(size_mb: float) -> Iterator[str]:
+    """
+    Genera una página con links, imágenes, encabezados, scripts y JSON-LD,
+    en pedazos de CHUNK_SIZE caracteres (como llegaría por la red).
+    """
+    head = (
+        "<!doctype html><html><head><title>Bench</title>"
+        '<meta name="description" content="bench page">'
+        '<meta property="og:title" content="Bench">'
+        '<script type="application/ld+json">{"@context": "https://schema.org", "@type": "WebSite", "name": "B"}</script>'
+        "</head><body>"
+    )
+    block = (
+        '<div class="item"><h2>Item {n}</h2><p>Texto de relleno para el item {n}, '
+        'con <a href="/items/{n}">un link</a> y <a href="https://other.example.com/{n}">otro</a>.</p>'
+        '<img src="/img/{n}.jpg" alt="foto {n}"><ul><li>a</li><li>b</li><li>c</li></ul>'
+        "<script>window.items = (window.items || 0) + 1;</script></div>"
+    )
+    target = int(size_mb * 1024 * 1024)
+
+    buffer = head
+    produced = 0
+    n = 0
+    while produced < target:
+        buffer += block.format(n=n)
+        n += 1
+        while len(buffer) >= CHUNK_SIZE:
+            yield buffer[:CHUNK_SIZE]
+            produced += CHUNK_SIZE
+            buffer = buffer[CHUNK_SIZE:]
+    yield buffer + "</body></html>"
+
+
+def _run_soup(size_mb: float) -> Dict[str, float]:
+    html = "".join(_page_chunks(size_mb))
+    started = time.perf_counter()
+    scraping_data, _ = extract_page_bundle(html, BASE_URL)
+    return {"seconds": time.perf_counter() - started, "links": len(scraping_data["links"])}
+
+
+def _run_stream(size_mb: float) -> Dict[str, float]:
+    started = time.perf_counter()
+    parser = StreamingPageParser(BASE_URL)
+    for chunk in _page_chunks(size_mb):
+        parser.feed(chunk)
+    scraping_data, _ = parser.close()
+    return {"seconds": time.perf_counter() - started, "links": len(scraping_data["links"])}
+
+
+def _child(name: str, size_mb: float, queue: "multiprocessing.Queue") -> None:
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = (_run_soup if name == "soup" else _run_stream)(size_mb)
+    result["peak_rss_mb"] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb) / 1024.0
+    queue.put(result)
+
+
+def _measure(name: str, size_mb: float) -> Dict[str, float]:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(name, size_mb, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de parsing HTML (soup vs stream)")
+    parser.add_argument("--size-mb", type=float, default=5.0, help="Tamaño de la página (default: 5)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por variante (default: 3)")
+    args = parser.parse_args()
+
+    print(f"Página sintética de {args.size_mb:g} MB, {args.repeat} repeticiones\n")
+    print(f"{'parser':<8} {'mejor (s)':>10} {'promedio (s)':>13} {'pico RSS (MB)':>14} {'links':>8}")
+    for name in ("soup", "stream"):
+        runs = [_measure(name, args.size_mb) for _ in range(max(1, args.repeat))]
+        seconds = [r["seconds"] for r in runs]
+        print(
+            f"{name:<8} {min(seconds):>10.3f} {sum(seconds) / len(seconds):>13.3f} "
+            f"{max(r['peak_rss_mb'] for r in runs):>14.1f} {int(runs[0]['links']):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+benchmarks/bench_processing_frontend.py
+
+Compara el costo de atender conexiones en el servidor B con cada frontend
+(--frontend threads / asyncio):
+
+    - Abrir N conexiones persistentes (como N pools de Servidores A).
+    - Rondas de un "ping" por conexión, todas a la vez: requests/s y
+      latencia p50/p99. El ping no toca los pools de etapas, así que mide
+      sólo el manejo de conexiones y del protocolo.
+    - Threads y memoria (RSS) del proceso servidor con las N conexiones
+      abiertas (de /proc; en otros sistemas se muestra "-").
+
+Cada servidor corre en un proceso aparte para que el cliente no comparta
+el GIL con él.
+
+Ejemplo:
+
+    python benchmarks/bench_processing_frontend.py --connections 2000 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.protocol import read_message_async, send_message_async  # noqa: E402
+from server_processing import (  # noqa: E402
+    FRONTEND_ASYNCIO,
+    FRONTEND_CHOICES,
+    AsyncProcessingServer,
+    ProcessingRequestHandler,
+    ProcessingTCPServer,
+    StageContext,
+)
+
+
+def _serve(frontend: str, ready: "multiprocessing.Queue") -> None:
+    """Proceso servidor: sin límite de conexiones ni control de admisión."""
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    if frontend == FRONTEND_ASYNCIO:
+        async def _run() -> None:
+            server = AsyncProcessingServer(
+                ("127.0.0.1", 0), StageContext(process_pool=pool, thread_pool=pool)
+            )
+            await server.start()
+            ready.put(server.server_address[1])
+            await server.serve_forever()
+
+        asyncio.run(_run())
+        return
+
+    server = ProcessingTCPServer(("127.0.0.1", 0), ProcessingRequestHandler, process_pool=pool)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def _proc_status(pid: int) -> Dict[str, Optional[int]]:
+    """Threads y VmRSS (KB) de /proc/<pid>/status, si existe."""
+    values: Dict[str, Optional[int]] = {"threads": None, "rss_kb": None}
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("Threads:"):
+                    values["threads"] = int(line.split()[1])
+                elif line.startswith("VmRSS:"):
+                    values["rss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return values
+
+
+async def _open(port: int, count: int, concurrency: int) -> List:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def _one():
+        async with limit:
+            return await asyncio.open_connection("127.0.0.1", port)
+
+    return await asyncio.gather(*(_one() for _ in range(count)))
+
+
+async def _ping_round(conns: List, round_no: int) -> List[float]:
+    async def _ping(n: int, reader, writer) -> float:
+        started = time.perf_counter()
+        await send_message_async(writer, {"action": "ping", "request_id": f"{round_no}-{n}"})
+        await read_message_async(reader)
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(_ping(n, r, w) for n, (r, w) in enumerate(conns)))
+
+
+async def _measure(port: int, pid: int, args: argparse.Namespace) -> Dict[str, float]:
+    idle = _proc_status(pid)
+    started = time.perf_counter()
+    conns = await _open(port, args.connections, args.connect_concurrency)
+    connect_seconds = time.perf_counter() - started
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for round_no in range(args.rounds):
+        latencies.extend(await _ping_round(conns, round_no))
+    rounds_seconds = time.perf_counter() - started
+    loaded = _proc_status(pid)
+
+    for _, writer in conns:
+        writer.close()
+    latencies.sort()
+    return {
+        "connect_ms": 1000 * connect_seconds,
+        "req_per_s": len(latencies) / rounds_seconds,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p99_ms": 1000 * latencies[int(0.99 * (len(latencies) - 1))],
+        "threads": loaded["threads"],
+        "rss_mb": (
+            (loaded["rss_kb"] - idle["rss_kb"]) / 1024
+            if loaded["rss_kb"] is not None and idle["rss_kb"] is not None
+            else None
+        ),
+    }
+
+
+def _run_frontend(frontend: str, args: argparse.Namespace) -> Dict[str, float]:
+    ready: "multiprocessing.Queue" = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(frontend, ready), daemon=True)
+    proc.start()
+    try:
+        port = ready.get(timeout=10)
+        return asyncio.run(_measure(port, proc.pid, args))
+    finally:
+        proc.terminate()
+        proc.join(5)
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de los frontends del servidor B")
+    parser.add_argument("--connections", type=int, default=1000, help="Conexiones simultáneas (default: 1000)")
+    parser.add_argument("--rounds", type=int, default=5, help="Rondas de ping por conexión (default: 5)")
+    parser.add_argument(
+        "--connect-concurrency", type=int, default=100,
+        help="Conexiones abriéndose a la vez (default: 100)",
+    )
+    parser.add_argument(
+        "--frontend", choices=FRONTEND_CHOICES, action="append",
+        help="Frontend a medir (se puede repetir; default: todos)",
+    )
+    args = parser.parse_args()
+
+    print(f"{args.connections} conexiones, {args.rounds} rondas de ping\n")
+    print(f"{'frontend':<10} {'conectar ms':>12} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'threads':>8} {'RSS MB':>8}")
+    for frontend in args.frontend or FRONTEND_CHOICES:
+        result = _run_frontend(frontend, args)
+        print(
+            f"{frontend:<10} {result['connect_ms']:>12.1f} {result['req_per_s']:>9.0f} "
+            f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{_fmt(result['threads'], 'd'):>8} {_fmt(result['rss_mb'], '.1f'):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+benchmarks/bench_task_journal.py
+
+Mide cuánto le agrega el journal (--task-journal) a cada alta de tarea y
+cuánto tarda en recuperarse al arrancar:
+
+    - create_task() con y sin journal (µs por tarea, sin workers: sólo el
+      costo del alta que paga el handler de POST /tasks).
+    - Escritura en disco: registros por segundo y ms por flush+fsync con
+      un flush cada N ms (group commit) contra un fsync por registro.
+    - replay() del archivo resultante.
+
+Ejemplo:
+
+    python benchmarks/bench_task_journal.py --tasks 20000 --flush-ms 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.task_journal import TaskJournal, replay  # noqa: E402
+from server_scraping import ScraperService  # noqa: E402
+
+
+async def _create_tasks(count: int, journal_path: Optional[str], flush_ms: float) -> Dict[str, float]:
+    service = ScraperService(
+        workers=4,
+        cache_ttl_seconds=0,
+        task_queue_size=count,
+        task_journal_path=journal_path,
+        task_journal_flush_interval=flush_ms / 1000,
+    )
+    if service._journal is not None:
+        await service._restore_tasks()
+
+    started = time.perf_counter()
+    for n in range(count):
+        service.create_task(f"https://bench{n % 50}.example.com/page/{n}")
+        if n % 500 == 0:
+            await asyncio.sleep(0)  # deja correr al flusher, como entre requests
+    elapsed = time.perf_counter() - started
+
+    result = {"us_per_task": 1e6 * elapsed / count}
+    if service._journal is not None:
+        await service._journal.close()
+        stats = service._journal.stats()
+        result["flushes"] = stats["flushes"]
+        result["avg_flush_ms"] = stats["avg_flush_ms"] or 0.0
+    return result
+
+
+async def _fsync_each(count: int, path: str) -> float:
+    """Un flush+fsync por registro: lo que costaría sin agrupar."""
+    journal = TaskJournal(path, flush_interval=3600)
+    await journal.start()
+    started = time.perf_counter()
+    for n in range(count):
+        journal.append({"op": "task", "id": str(n), "url": f"https://x.com/{n}", "status": "pending"})
+        await journal.flush()
+    elapsed = time.perf_counter() - started
+    await journal.close()
+    return elapsed
+
+
+async def _run(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tasks.jsonl")
+
+        plain = await _create_tasks(args.tasks, None, args.flush_ms)
+        journaled = await _create_tasks(args.tasks, path, args.flush_ms)
+
+        print(f"{args.tasks} tareas, flush cada {args.flush_ms:g} ms\n")
+        print(f"{'create_task':<22} {'µs/tarea':>10} {'flushes':>9} {'ms/flush':>9}")
+        print(f"{'sin journal':<22} {plain['us_per_task']:>10.1f} {'-':>9} {'-':>9}")
+        print(
+            f"{'con journal':<22} {journaled['us_per_task']:>10.1f} "
+            f"{int(journaled['flushes']):>9} {journaled['avg_flush_ms']:>9.3f}"
+        )
+
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        started = time.perf_counter()
+        tasks, _, _ = replay(path)
+        replay_seconds = time.perf_counter() - started
+
+        fsync_count = min(args.tasks, args.fsync_each)
+        fsync_seconds = await _fsync_each(fsync_count, os.path.join(tmp, "each.jsonl"))
+
+        print(f"\n{'disco':<22} {'registros/s':>12}")
+        group_seconds = journaled["flushes"] * journaled["avg_flush_ms"] / 1000
+        if group_seconds:
+            print(f"{'flush agrupado':<22} {args.tasks / group_seconds:>12.0f}")
+        print(f"{'fsync por registro':<22} {fsync_count / fsync_seconds:>12.0f}")
+        print(f"\nreplay: {len(tasks)} tareas, {size_mb:.1f} MB en {replay_seconds:.3f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del journal de tareas")
+    parser.add_argument("--tasks", type=int, default=20000, help="Tareas a crear (default: 20000)")
+    parser.add_argument("--flush-ms", type=float, default=50.0, help="Intervalo de flush (default: 50)")
+    parser.add_argument(
+        "--fsync-each", type=int, default=500,
+        help="Registros para la variante de un fsync por registro (default: 500)",
+    )
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+addresses.py
+Parseo de direcciones "host:puerto" que usan los dos servidores
+(--processing-server / --processing-broker en A, --pull en B).
+"""
+
+from typing import Optional, Tuple
+
+
+def parse_address(value: str, default_port: Optional[int] = None) -> Tuple[str, int]:
+    """
+    "host:puerto", "[ipv6]:puerto" o sólo el host -> (host, puerto).
+    Sin default_port el puerto es obligatorio. Lanza ValueError.
+    """
+    value = value.strip()
+    if value.startswith("["):
+        host, _, rest = value[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else rest
+    elif value.count(":") == 1:
+        host, port = value.split(":")
+    else:
+        host, port = value, ""  # host o IPv6 sin corchetes
+    if not port and default_port is not None:
+        port = str(default_port)
+    if not host:
+        raise ValueError(f"Dirección inválida: {value!r}")
+    if not port:
+        raise ValueError(f"Falta el puerto en {value!r} (HOST:PUERTO)")
+    try:
+        port_number = int(port)
+    except ValueError:
+        raise ValueError(f"Puerto inválido en {value!r}") from None
+    if not 0 < port_number < 65536:
+        raise ValueError(f"Puerto inválido en {value!r}")
+    return host, port_number
@@ -0,0 +1,219 @@
+"""
+html_parser.py
+Funciones de parsing HTML para extraer título, links, estructura, etc.
+
+El árbol se recorre UNA sola vez: en la misma pasada se juntan los datos de
+scraping y las señales para el análisis avanzado (ver page_signals.py).
+Lo usa el Servidor A para el scraping y el B cuando un A viejo le manda el
+HTML en lugar de las señales; por eso vive en common/.
+
+Hay dos formas de alimentar esa pasada, con el mismo resultado:
+    - extract_page_bundle: HTML completo -> árbol BeautifulSoup.
+    - StreamingPageParser: eventos de lxml (HTMLPullParser) a medida que
+      llegan los pedazos del HTML; los elementos ya cerrados se descartan,
+      así la memoria no crece con el tamaño de la página.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from . import page_signals
+
+_HEADER_TAGS = {f"h{level}": f"h{level}" for level in range(1, 7)}
+
+
+def extract_page_data(html: str, base_url: str) -> Dict:
+    """
+    A partir del HTML crudo y la URL base, devuelve un diccionario con:
+
+      - title
+      - links (lista de URLs absolutas)
+      - meta_tags (description, keywords, og:*)
+      - structure (conteo h1..h6)
+      - images_count
+      - images (lista de URLs absolutas de imágenes)
+    """
+    scraping_data, _ = extract_page_bundle(html, base_url)
+    return scraping_data
+
+
+def extract_page_bundle(html: str, base_url: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Parsea el HTML una vez y devuelve (scraping_data, page_signals).
+
+    scraping_data es el mismo dict que extract_page_data; page_signals es lo
+    que necesita el análisis avanzado del Servidor B (ver page_signals.py).
+    """
+    soup = BeautifulSoup(html, "lxml")
+    collector = _PageCollector(base_url)
+    collector.feed_text(html or "")
+
+    for tag in soup.find_all(True):
+        collector.start(tag.name, tag.attrs)
+        collector.end(tag.name, tag.attrs, tag.string)
+
+    return collector.result()
+
+
+class StreamingPageParser:
+    """
+    Versión incremental de extract_page_bundle: se le pasa el HTML de a
+    pedazos con feed() (por ejemplo, mientras se descarga) y close()
+    devuelve (scraping_data, page_signals).
+
+    Sólo mantiene en memoria los elementos todavía abiertos (html, body y
+    los ancestros del nodo actual): cada elemento se procesa en sus eventos
+    start/end y después se borra del árbol.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self._collector = _PageCollector(base_url)
+        self._parser = etree.HTMLPullParser(events=("start", "end"))
+        self._closed = False
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        self._collector.feed_text(text)
+        self._parser.feed(text)
+        self._drain_events()
+
+    def close(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if not self._closed:
+            self._closed = True
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                # Documento vacío o sin elementos: nos quedamos con lo que haya
+                pass
+            self._drain_events()
+        return self._collector.result()
+
+    def _drain_events(self) -> None:
+        collector = self._collector
+        for event, elem in self._parser.read_events():
+            if not isinstance(elem.tag, str):
+                continue
+            if event == "start":
+                collector.start(elem.tag, elem.attrib)
+                continue
+
+            collector.end(elem.tag, elem.attrib, elem.text)
+
+            # Liberar el elemento y sus hermanos anteriores ya procesados
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+def extract_page_bundle_streaming(
+    html: str,
+    base_url: str,
+    chunk_size: int = 8192,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Igual que extract_page_bundle pero usando StreamingPageParser, pasándole
+    el HTML en pedazos de `chunk_size` caracteres.
+    """
+    parser = StreamingPageParser(base_url)
+    for offset in range(0, len(html), chunk_size):
+        parser.feed(html[offset:offset + chunk_size])
+    return parser.close()
+
+
+class _PageCollector:
+    """
+    Acumula datos de scraping y señales a partir de eventos de elementos.
+
+    start() recibe los atributos apenas abre el elemento (links, imágenes,
+    meta, encabezados); end() recibe además el texto (title, script).
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self._base_url = base_url
+        self._title: Optional[str] = None
+        self._links: List[str] = []
+        self._images: List[str] = []
+        self._structure: Dict[str, int] = {tag: 0 for tag in _HEADER_TAGS}
+        self._meta_tags: Dict[str, str] = {}
+        self._named_meta_seen: set[str] = set()
+        self._generator_seen = False
+        self._hints = page_signals.TextHintScanner()
+        self._signals = page_signals.new_signals()
+
+    def feed_text(self, text: str) -> None:
+        self._hints.feed(text)
+
+    def start(self, name: str, attrs: Mapping[str, Any]) -> None:
+        if name == "a":
+            href = attrs.get("href")
+            if href is not None:
+                self._links.append(urljoin(self._base_url, href.strip()))
+
+        elif name == "img":
+            src = attrs.get("src")
+            if src is not None:
+                self._images.append(urljoin(self._base_url, src.strip()))
+            page_signals.add_image(self._signals, attrs.get("alt"))
+
+        elif name in _HEADER_TAGS:
+            self._structure[name] += 1
+
+        elif name == "meta":
+            self._add_meta(attrs)
+
+    def end(self, name: str, attrs: Mapping[str, Any], text: Optional[str]) -> None:
+        if name == "script":
+            src = attrs.get("src")
+            page_signals.add_script(self._signals, src if src else (text or ""))
+            if attrs.get("type") == "application/ld+json":
+                page_signals.add_json_ld(self._signals, text or "")
+
+        elif name == "title" and self._title is None:
+            self._title = text.strip() if text else ""
+
+    def result(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        signals = dict(self._signals)
+        signals["other"] = []
+        self._hints.apply(signals)
+
+        scraping_data = {
+            "title": self._title or "",
+            "links": list(self._links),
+            "meta_tags": _ordered_meta_tags(self._meta_tags),
+            "structure": dict(self._structure),
+            "images_count": len(self._images),
+            "images": list(self._images),
+        }
+        return scraping_data, signals
+
+    def _add_meta(self, attrs: Mapping[str, Any]) -> None:
+        content = attrs.get("content")
+        meta_name = attrs.get("name")
+
+        # description / keywords: sólo cuenta la primera de cada una
+        if meta_name in ("description", "keywords") and meta_name not in self._named_meta_seen:
+            self._named_meta_seen.add(meta_name)
+            if content:
+                self._meta_tags[meta_name] = content.strip()
+
+        # Open Graph (property="og:...")
+        prop = attrs.get("property")
+        if prop is not None and prop.startswith("og:") and content:
+            self._meta_tags[prop] = content.strip()
+
+        if meta_name == "generator" and not self._generator_seen:
+            self._generator_seen = True
+            self._signals["generator"] = content or None
+
+
+def _ordered_meta_tags(meta_tags: Dict[str, str]) -> Dict[str, str]:
+    # Mismo orden que antes: description, keywords y después las og:*
+    ordered = {key: meta_tags[key] for key in ("description", "keywords") if key in meta_tags}
+    ordered.update((key, value) for key, value in meta_tags.items() if key not in ordered)
+    return ordered
@@ -0,0 +1,168 @@
+"""
+page_signals.py
+Señales de la página para el análisis avanzado (Bonus Opción 3).
+
+El Servidor A ya recorre el árbol HTML para el scraping, así que en esa
+misma pasada junta todo lo que el análisis avanzado necesita del HTML
+(tecnologías, meta generator, JSON-LD, alt de imágenes). Al Servidor B le
+llegan sólo estas señales, sin tener que recibir y parsear el HTML de nuevo.
+
+Está en common/ porque lo usan los dos servidores: A para armar las
+señales y B para el fallback con HTML (y cms_from_generator).
+
+Formato de las señales (dict serializable a JSON):
+
+    {
+        "cms_hint": "WordPress" | "Drupal" | "Joomla" | None,   # por texto del HTML
+        "generator": str | None,          # <meta name="generator">
+        "frameworks_js": [...],           # detectados en <script>
+        "other": [...],                   # Bootstrap, Tailwind CSS
+        "json_ld_count": int,
+        "schema_org_detected": bool,
+        "json_ld_examples": [...],        # resumen de los primeros JSON-LD
+        "total_images": int,              # todas las <img>
+        "images_with_alt": int,
+    }
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Set
+
+# Cuántos bloques JSON-LD se miran en detalle (no procesar infinitos)
+MAX_JSON_LD_EXAMPLES = 3
+
+FRAMEWORK_PATTERNS = {
+    "react": "React",
+    "angular": "Angular",
+    "vue": "Vue.js",
+    "jquery": "jQuery",
+    "next.js": "Next.js",
+    "nuxt.js": "Nuxt.js",
+}
+
+_TEXT_HINT_PATTERNS = ("wp-content", "wordpress", "drupal", "joomla", "bootstrap", "tailwind")
+_MAX_HINT_LEN = max(len(pattern) for pattern in _TEXT_HINT_PATTERNS)
+
+_CMS_NAMES = (
+    ("wordpress", "WordPress"),
+    ("drupal", "Drupal"),
+    ("joomla", "Joomla"),
+)
+
+
+def new_signals() -> Dict[str, Any]:
+    return {
+        "cms_hint": None,
+        "generator": None,
+        "frameworks_js": [],
+        "other": [],
+        "json_ld_count": 0,
+        "schema_org_detected": False,
+        "json_ld_examples": [],
+        "total_images": 0,
+        "images_with_alt": 0,
+    }
+
+
+def apply_html_text_hints(signals: Dict[str, Any], html_lower: str) -> None:
+    """
+    Heurísticas sobre el texto completo del HTML (en minúsculas): CMS por
+    rutas/nombres conocidos y frameworks CSS.
+    """
+    scanner = TextHintScanner()
+    scanner.feed(html_lower)
+    scanner.apply(signals)
+
+
+class TextHintScanner:
+    """
+    Busca los patrones de apply_html_text_hints sobre el HTML recibido de a
+    pedazos (sin tener el documento completo en memoria). Guarda la cola de
+    cada pedazo para encontrar también los patrones partidos entre dos.
+    """
+
+    def __init__(self) -> None:
+        self._found: Set[str] = set()
+        self._tail = ""
+
+    def feed(self, text: str) -> None:
+        window = self._tail + text.lower()
+        for pattern in _TEXT_HINT_PATTERNS:
+            if pattern not in self._found and pattern in window:
+                self._found.add(pattern)
+        self._tail = window[-(_MAX_HINT_LEN - 1):]
+
+    def apply(self, signals: Dict[str, Any]) -> None:
+        found = self._found
+        if "wp-content" in found or "wordpress" in found:
+            signals["cms_hint"] = "WordPress"
+        elif "drupal" in found:
+            signals["cms_hint"] = "Drupal"
+        elif "joomla" in found:
+            signals["cms_hint"] = "Joomla"
+
+        if "bootstrap" in found:
+            signals["other"].append("Bootstrap")
+        if "tailwind" in found:
+            signals["other"].append("Tailwind CSS")
+
+
+def add_script(signals: Dict[str, Any], text: str) -> None:
+    """
+    Registra un <script>: `text` es el src si tiene, o el código inline.
+    """
+    text_lower = text.lower()
+    frameworks: List[str] = signals["frameworks_js"]
+    for key, name in FRAMEWORK_PATTERNS.items():
+        if key in text_lower and name not in frameworks:
+            frameworks.append(name)
+
+
+def add_json_ld(signals: Dict[str, Any], text: str) -> None:
+    """
+    Registra un bloque <script type="application/ld+json">.
+    """
+    signals["json_ld_count"] += 1
+    if signals["json_ld_count"] > MAX_JSON_LD_EXAMPLES:
+        return
+    if "schema.org" in text.lower():
+        signals["schema_org_detected"] = True
+    try:
+        data = json.loads(text)
+    except Exception:
+        # Si no se puede parsear, ignoramos
+        return
+    signals["json_ld_examples"].append(simplify_json_ld(data))
+
+
+def add_image(signals: Dict[str, Any], alt: Optional[str]) -> None:
+    signals["total_images"] += 1
+    if alt is not None and alt.strip():
+        signals["images_with_alt"] += 1
+
+
+def cms_from_generator(generator: Optional[str]) -> Optional[str]:
+    if not generator:
+        return None
+    gen_value = generator.lower()
+    for key, name in _CMS_NAMES:
+        if key in gen_value:
+            return name
+    return None
+
+
+def simplify_json_ld(data: Any) -> Any:
+    """
+    Intenta devolver una versión "resumida" del JSON-LD:
+    - si es dict con "@type" y "name", devolvemos solo eso.
+    """
+    if isinstance(data, dict):
+        result = {}
+        for key in ("@type", "name", "headline"):
+            if key in data:
+                result[key] = data[key]
+        if result:
+            return result
+    return data
@@ -3,38 +3,308 @@ protocol.py
 Protocolo binario simple: [longitud (4 bytes big-endian)] + [payload JSON].
 
 Sirve tanto para el Servidor A (asyncio) como para el B (socketserver).
+
+Multiplexado: sobre una misma conexión pueden viajar varias requests a la
+vez. Cada request lleva un campo `request_id` (REQUEST_ID_KEY) y la
+respuesta correspondiente lo devuelve tal cual, así que las respuestas
+pueden llegar en cualquier orden. Un peer que no manda `request_id` sigue
+funcionando como antes (una request por conexión).
+
+Frame v2 (binario, versionado):
+
+    cabecera (8 bytes): magic 0xB7 | versión | flags | reservado | largo del cuerpo (4 bytes)
+    cuerpo:             largo del JSON (4) | cantidad de adjuntos (4)
+                        | largo de cada adjunto (4 c/u) | JSON | adjuntos
+
+    - flags indica si la sección JSON va comprimida (zlib, o LZ4 si el
+      paquete `lz4` está instalado en los dos lados).
+    - Los valores bytes del mensaje (PNG de screenshots y thumbnails)
+      viajan crudos como adjuntos, sin base64 (ver serialization.py).
+
+Un frame JSON de siempre nunca empieza con 0xB7 (sería un largo de más de
+3 GB), así que los lectores aceptan los dos formatos sin configurar nada.
+Para *enviar* v2 hay que negociarlo antes con la acción "hello" (ver
+hello_message / accept_hello / wire_from_hello_reply); un peer que no la
+conoce responde con error y se sigue usando JSON puro.
 """
 
 import asyncio
 import socket
 import struct
-from typing import Any, Dict
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from .serialization import dumps, loads
+from .serialization import dumps, extract_attachments, loads, restore_attachments
+
+try:
+    import lz4.frame as _lz4_frame
+except ImportError:  # dependencia opcional
+    _lz4_frame = None
 
 # Unsigned int de 4 bytes big-endian
 _HEADER_STRUCT = struct.Struct("!I")
 
+# Cabecera del frame v2: magic, versión, flags, reservado, largo del cuerpo
+_V2_HEADER_STRUCT = struct.Struct("!BBBBI")
+_V2_COUNTS_STRUCT = struct.Struct("!II")
+_V2_MAGIC = 0xB7
+
+# Campo que identifica cada request dentro de una conexión multiplexada
+REQUEST_ID_KEY = "request_id"
+
+# Status con el que un Servidor B saturado rechaza trabajo (control de admisión)
+BUSY_STATUS = "busy"
+
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+SUPPORTED_VERSIONS = (PROTOCOL_JSON, PROTOCOL_BINARY)
+
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_LZ4 = "lz4"
+
+FLAG_ZLIB = 0x01
+FLAG_LZ4 = 0x02
+
+# Tamaño máximo de frame que se acepta al leer (una cabecera corrupta o
+# maliciosa no puede hacer reservar gigabytes)
+DEFAULT_MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+# La sección JSON sólo se comprime si supera este tamaño
+COMPRESSION_MIN_BYTES = 1024
+_ZLIB_LEVEL = 1
+
+
+class FrameTooLargeError(ValueError):
+    """
+    La cabecera anuncia un frame más grande que el máximo permitido (o la
+    sección JSON comprimida se expande a más que eso).
+    """
+    pass
+
+
+@dataclass(frozen=True)
+class WireFormat:
+    """
+    Formato negociado para ENVIAR por una conexión: versión del protocolo
+    y compresión de la sección JSON (None = sin comprimir).
+    """
+    version: int = PROTOCOL_JSON
+    compression: Optional[str] = None
+
+
+LEGACY_WIRE = WireFormat()
+
+
+def available_compressions() -> Tuple[str, ...]:
+    """Compresiones soportadas localmente, en orden de preferencia."""
+    if _lz4_frame is not None:
+        return (COMPRESSION_LZ4, COMPRESSION_ZLIB)
+    return (COMPRESSION_ZLIB,)
+
+
+# --------- Negociación (acción "hello") ---------
+
+
+def hello_message() -> Dict[str, Any]:
+    """
+    Mensaje con el que el cliente ofrece el protocolo v2. Se manda siempre
+    en JSON puro, así lo entiende cualquier peer.
+    """
+    return {
+        "action": "hello",
+        "protocol_versions": list(SUPPORTED_VERSIONS),
+        "compression": list(available_compressions()),
+    }
+
+
+def accept_hello(request: Dict[str, Any]) -> Tuple[Dict[str, Any], WireFormat]:
+    """
+    Lado servidor: elige versión y compresión a partir del "hello" del
+    cliente. Devuelve (respuesta, formato a usar de acá en adelante).
+    """
+    versions = request.get("protocol_versions") or []
+    offered = request.get("compression") or []
+
+    if PROTOCOL_BINARY not in versions:
+        wire = LEGACY_WIRE
+    else:
+        compression = next((c for c in available_compressions() if c in offered), None)
+        wire = WireFormat(PROTOCOL_BINARY, compression)
+
+    reply = {
+        "status": "ok",
+        "protocol_version": wire.version,
+        "compression": wire.compression,
+    }
+    return reply, wire
+
+
+def wire_from_hello_reply(reply: Dict[str, Any]) -> WireFormat:
+    """
+    Lado cliente: formato a usar según la respuesta al "hello". Un peer
+    viejo responde con error (acción desconocida) -> JSON puro.
+    """
+    if not isinstance(reply, dict) or reply.get("status") != "ok":
+        return LEGACY_WIRE
+    if reply.get("protocol_version") != PROTOCOL_BINARY:
+        return LEGACY_WIRE
+    compression = reply.get("compression")
+    if compression not in available_compressions():
+        compression = None
+    return WireFormat(PROTOCOL_BINARY, compression)
+
+
+# --------- Codificación de frames ---------
+
+
+def encode_frame(message: Dict[str, Any], wire: Optional[WireFormat] = None) -> bytes:
+    """
+    Arma el frame completo (cabecera + cuerpo) de `message` según `wire`.
+    """
+    if wire is None or wire.version != PROTOCOL_BINARY:
+        body = dumps(message)
+        return _HEADER_STRUCT.pack(len(body)) + body
+
+    obj, attachments = extract_attachments(message)
+    json_section = dumps(obj)
+
+    flags = 0
+    if wire.compression and len(json_section) >= COMPRESSION_MIN_BYTES:
+        if wire.compression == COMPRESSION_LZ4 and _lz4_frame is not None:
+            json_section = _lz4_frame.compress(json_section)
+            flags |= FLAG_LZ4
+        elif wire.compression == COMPRESSION_ZLIB:
+            json_section = zlib.compress(json_section, _ZLIB_LEVEL)
+            flags |= FLAG_ZLIB
+
+    parts: List[bytes] = [_V2_COUNTS_STRUCT.pack(len(json_section), len(attachments))]
+    parts.extend(_HEADER_STRUCT.pack(len(att)) for att in attachments)
+    parts.append(json_section)
+    parts.extend(attachments)
+
+    body_len = sum(len(part) for part in parts)
+    header = _V2_HEADER_STRUCT.pack(_V2_MAGIC, PROTOCOL_BINARY, flags, 0, body_len)
+    return b"".join([header, *parts])
+
+
+def _is_v2_header(first4: bytes) -> bool:
+    return first4[0] == _V2_MAGIC
+
+
+def _decode_v2_body(
+    version: int,
+    flags: int,
+    body: Union[bytes, bytearray],
+    max_frame_bytes: Optional[int] = DEFAULT_MAX_FRAME_BYTES,
+) -> Dict[str, Any]:
+    if version != PROTOCOL_BINARY:
+        raise ValueError(f"Versión de protocolo no soportada: {version}")
+
+    view = memoryview(body)
+    if len(view) < _V2_COUNTS_STRUCT.size:
+        raise ValueError("Frame v2 truncado")
+    json_len, count = _V2_COUNTS_STRUCT.unpack_from(view, 0)
+    offset = _V2_COUNTS_STRUCT.size
+
+    table_end = offset + count * _HEADER_STRUCT.size
+    if table_end + json_len > len(view):
+        raise ValueError("Frame v2 inconsistente")
+    lengths = [
+        _HEADER_STRUCT.unpack_from(view, offset + i * _HEADER_STRUCT.size)[0]
+        for i in range(count)
+    ]
+    offset = table_end
+
+    json_section = view[offset:offset + json_len]
+    offset += json_len
+
+    attachments: List[bytes] = []
+    for length in lengths:
+        if offset + length > len(view):
+            raise ValueError("Frame v2 inconsistente")
+        attachments.append(bytes(view[offset:offset + length]))
+        offset += length
+
+    if flags & (FLAG_LZ4 | FLAG_ZLIB):
+        raw = _decompress_json(flags, json_section, max_frame_bytes)
+    else:
+        raw = json_section
+
+    obj = loads(raw)
+    if not isinstance(obj, dict):
+        raise ValueError("El mensaje recibido no es un dict JSON")
+    if attachments:
+        obj = restore_attachments(obj, attachments)
+    return obj
+
+
+def _decompress_json(flags: int, data: memoryview, max_frame_bytes: Optional[int]) -> bytes:
+    """
+    Descomprime la sección JSON sin pasar de `max_frame_bytes`: un frame
+    chico puede expandirse a gigabytes (bomba de compresión), así que se
+    pide como mucho el límite + 1 byte y se corta ahí.
+    """
+    # max_length 0 (zlib) / -1 (lz4) = sin límite
+    limit = max_frame_bytes + 1 if max_frame_bytes is not None else None
+    if flags & FLAG_LZ4:
+        if _lz4_frame is None:
+            raise ValueError("Frame comprimido con LZ4 pero lz4 no está instalado")
+        lz4_decompressor = _lz4_frame.LZ4FrameDecompressor()
+        raw = lz4_decompressor.decompress(bytes(data), max_length=limit if limit is not None else -1)
+        complete = lz4_decompressor.eof
+    else:
+        zlib_decompressor = zlib.decompressobj()
+        raw = zlib_decompressor.decompress(data, limit or 0)
+        if zlib_decompressor.unconsumed_tail and max_frame_bytes is not None:
+            raise FrameTooLargeError(
+                f"La sección JSON descomprimida supera el máximo de {max_frame_bytes} bytes"
+            )
+        complete = zlib_decompressor.eof
+
+    if max_frame_bytes is not None and len(raw) > max_frame_bytes:
+        raise FrameTooLargeError(
+            f"La sección JSON descomprimida supera el máximo de {max_frame_bytes} bytes"
+        )
+    if not complete:
+        raise ValueError("Sección JSON comprimida truncada")
+    return raw
+
 
 # --------- Versión asíncrona (asyncio) ---------
 
 
-async def send_message_async(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+async def send_message_async(
+    writer: asyncio.StreamWriter,
+    message: Dict[str, Any],
+    wire: Optional[WireFormat] = None,
+) -> None:
     """
     Envía un mensaje (dict) a través de un StreamWriter de asyncio.
+    Por defecto en JSON puro; con `wire` negociado, en frame v2.
     """
-    body = dumps(message)
-    header = _HEADER_STRUCT.pack(len(body))
-    writer.write(header + body)
+    writer.write(encode_frame(message, wire))
     await writer.drain()
 
 
-async def read_message_async(reader: asyncio.StreamReader) -> Dict[str, Any]:
+async def read_message_async(
+    reader: asyncio.StreamReader,
+    max_frame_bytes: int = DEFAULT_MAX_FRAME_BYTES,
+) -> Dict[str, Any]:
     """
-    Lee un mensaje desde un StreamReader de asyncio y lo devuelve como dict.
+    Lee un mensaje (JSON puro o frame v2) desde un StreamReader de asyncio
+    y lo devuelve como dict.
     """
     header_data = await reader.readexactly(_HEADER_STRUCT.size)
+    if _is_v2_header(header_data):
+        rest = await reader.readexactly(_V2_HEADER_STRUCT.size - _HEADER_STRUCT.size)
+        _, version, flags, _, length = _V2_HEADER_STRUCT.unpack(header_data + rest)
+        _check_frame_size(length, max_frame_bytes)
+        body = await reader.readexactly(length)
+        return _decode_v2_body(version, flags, body, max_frame_bytes)
+
     (length,) = _HEADER_STRUCT.unpack(header_data)
+    _check_frame_size(length, max_frame_bytes)
     body = await reader.readexactly(length)
     obj = loads(body)
     if not isinstance(obj, dict):
@@ -44,27 +314,48 @@ async def read_message_async(reader: asyncio.StreamReader) -> Dict[str, Any]:
 
 
 
-def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+def send_message(
+    sock: socket.socket,
+    message: Dict[str, Any],
+    wire: Optional[WireFormat] = None,
+) -> None:
     """
     Envía un mensaje (dict) por un socket bloqueante.
+    Por defecto en JSON puro; con `wire` negociado, en frame v2.
     """
-    body = dumps(message)
-    header = _HEADER_STRUCT.pack(len(body))
-    sock.sendall(header + body)
+    sock.sendall(encode_frame(message, wire))
 
 
-def read_message(sock: socket.socket) -> Dict[str, Any]:
+def read_message(
+    sock: socket.socket,
+    max_frame_bytes: int = DEFAULT_MAX_FRAME_BYTES,
+) -> Dict[str, Any]:
     """
-    Lee un mensaje completo desde un socket bloqueante y lo devuelve como dict.
+    Lee un mensaje completo (JSON puro o frame v2) desde un socket
+    bloqueante y lo devuelve como dict.
+
+    El cuerpo se recibe con recv_into sobre un bytearray del tamaño justo
+    (sin ir concatenando pedazos) y el JSON se decodifica desde ese mismo
+    buffer. Si la cabecera anuncia más de `max_frame_bytes`, se lanza
+    FrameTooLargeError antes de reservar memoria.
     """
-    header_data = _recv_exact(sock, _HEADER_STRUCT.size)
-    if not header_data:
-        raise ConnectionError("Conexión cerrada al leer cabecera")
+    header = bytearray(_V2_HEADER_STRUCT.size)
+    header_view = memoryview(header)
+    _recv_into_exact(sock, header_view[:_HEADER_STRUCT.size], "cabecera")
 
-    (length,) = _HEADER_STRUCT.unpack(header_data)
-    body = _recv_exact(sock, length)
-    if not body:
-        raise ConnectionError("Conexión cerrada al leer cuerpo")
+    v2 = _is_v2_header(header)
+    if v2:
+        _recv_into_exact(sock, header_view[_HEADER_STRUCT.size:], "cabecera")
+        _, version, flags, _, length = _V2_HEADER_STRUCT.unpack(header)
+    else:
+        (length,) = _HEADER_STRUCT.unpack_from(header)
+    _check_frame_size(length, max_frame_bytes)
+
+    body = bytearray(length)
+    _recv_into_exact(sock, memoryview(body), "cuerpo")
+
+    if v2:
+        return _decode_v2_body(version, flags, body, max_frame_bytes)
 
     obj = loads(body)
     if not isinstance(obj, dict):
@@ -72,14 +363,22 @@ def read_message(sock: socket.socket) -> Dict[str, Any]:
     return obj
 
 
-def _recv_exact(sock: socket.socket, num_bytes: int) -> bytes:
+def _recv_into_exact(sock: socket.socket, view: memoryview, what: str) -> None:
     """
-    Recibe exactamente num_bytes desde el socket (salvo que se cierre).
+    Llena `view` completo con datos del socket. Lanza ConnectionError si
+    el peer cierra antes.
     """
-    data = b""
-    while len(data) < num_bytes:
-        chunk = sock.recv(num_bytes - len(data))
-        if not chunk:
-            break
-        data += chunk
-    return data
+    received = 0
+    total = len(view)
+    while received < total:
+        count = sock.recv_into(view[received:], total - received)
+        if count == 0:
+            raise ConnectionError(f"Conexión cerrada al leer {what}")
+        received += count
+
+
+def _check_frame_size(length: int, max_frame_bytes: Optional[int]) -> None:
+    if max_frame_bytes is not None and length > max_frame_bytes:
+        raise FrameTooLargeError(
+            f"Frame de {length} bytes supera el máximo de {max_frame_bytes} bytes"
+        )
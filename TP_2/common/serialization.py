@@ -1,23 +1,82 @@
 """
 serialization.py
 Funciones de serialización para comunicación entre servidores.
+
+Los valores `bytes` (PNG de screenshots/thumbnails) se manejan de dos formas:
+    - En JSON puro viajan como string base64 (formato de siempre).
+    - En el frame binario (protocolo v2) se sacan del JSON como "adjuntos"
+      y en su lugar queda {ATTACHMENT_KEY: índice}; viajan crudos.
 """
 
+import base64
 import json
-from typing import Any
+from typing import Any, List, Tuple, Union
+
+# Marcador que reemplaza a un valor bytes dentro del JSON del frame v2
+ATTACHMENT_KEY = "__attachment__"
+
+_BYTES_TYPES = (bytes, bytearray, memoryview)
 
 
 def dumps(obj: Any) -> bytes:
     """
     Serializa un objeto Python a bytes usando JSON (UTF-8).
+    Los valores bytes se codifican en base64.
     """
-    text = json.dumps(obj, ensure_ascii=False)
+    text = json.dumps(obj, ensure_ascii=False, default=_encode_bytes)
     return text.encode("utf-8")
 
 
-def loads(data: bytes) -> Any:
+def loads(data: Union[bytes, bytearray, memoryview]) -> Any:
     """
     Deserializa bytes (JSON UTF-8) a objeto Python.
+    Acepta cualquier buffer (bytearray, memoryview) sin copiarlo antes.
     """
-    text = data.decode("utf-8")
+    text = str(data, "utf-8")
     return json.loads(text)
+
+
+def extract_attachments(obj: Any) -> Tuple[Any, List[bytes]]:
+    """
+    Devuelve (obj_sin_bytes, adjuntos): una copia de `obj` donde cada valor
+    bytes se reemplaza por {ATTACHMENT_KEY: i}, y la lista de esos bytes.
+    Sólo se recorren dicts y listas.
+    """
+    attachments: List[bytes] = []
+
+    def _walk(value: Any) -> Any:
+        if isinstance(value, _BYTES_TYPES):
+            attachments.append(bytes(value) if not isinstance(value, bytes) else value)
+            return {ATTACHMENT_KEY: len(attachments) - 1}
+        if isinstance(value, dict):
+            return {key: _walk(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [_walk(item) for item in value]
+        return value
+
+    return _walk(obj), attachments
+
+
+def restore_attachments(obj: Any, attachments: List[bytes]) -> Any:
+    """
+    Inversa de extract_attachments: vuelve a poner los bytes en su lugar.
+    """
+    def _walk(value: Any) -> Any:
+        if isinstance(value, dict):
+            if len(value) == 1 and ATTACHMENT_KEY in value:
+                index = value[ATTACHMENT_KEY]
+                if not isinstance(index, int) or not 0 <= index < len(attachments):
+                    raise ValueError(f"Adjunto inválido: {index!r}")
+                return attachments[index]
+            return {key: _walk(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [_walk(item) for item in value]
+        return value
+
+    return _walk(obj)
+
+
+def _encode_bytes(value: Any) -> str:
+    if isinstance(value, _BYTES_TYPES):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -7,23 +7,25 @@ Incluye:
 - Análisis de accesibilidad (uso de alt en imágenes)
 
 Todo se hace con:
-- HTML crudo (string)
+- las señales de la página que arma el Servidor A (page_signals)
+  o, si no vienen, el HTML crudo (string)
 - scraping_data (meta_tags, structure, images_count, etc.)
 """
 
 from __future__ import annotations
 
-import json
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 
-from bs4 import BeautifulSoup
+from common.html_parser import extract_page_bundle
+from common.page_signals import cms_from_generator
 
 
 def analyze_advanced(
     url: str,
     scraping_data: Dict[str, Any],
-    html: str,
+    html: str = "",
+    signals: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Devuelve un dict con claves:
@@ -32,22 +34,25 @@ def analyze_advanced(
         - structured_data
         - accessibility
 
-    Si no hay HTML o hay errores de parseo, devuelve lo que pueda.
+    Lo normal es recibir `signals`, que el Servidor A ya calculó en la misma
+    pasada del scraping (ver common/page_signals.py). Si no vienen (un
+    Servidor A viejo que manda el HTML), se calculan parseando `html`.
+
+    Si no hay HTML ni señales o hay errores de parseo, devuelve lo que pueda.
     """
     logger = logging.getLogger(__name__)
 
-    soup: Optional[BeautifulSoup] = None
-    if html:
+    if signals is None and html:
         try:
-            soup = BeautifulSoup(html, "lxml")
+            _, signals = extract_page_bundle(html, url or "")
         except Exception as exc:  # noqa: BLE001
             logger.warning("No se pudo parsear HTML para análisis avanzado: %s", exc)
-            soup = None
+            signals = None
 
-    technologies = _detect_technologies(scraping_data, soup, html)
+    technologies = _detect_technologies(signals)
     seo = _analyze_seo(scraping_data)
-    structured_data = _analyze_structured_data(soup)
-    accessibility = _analyze_accessibility(soup, scraping_data)
+    structured_data = _analyze_structured_data(signals)
+    accessibility = _analyze_accessibility(signals, scraping_data)
 
     return {
         "url": url,
@@ -63,69 +68,21 @@ def analyze_advanced(
 # ----------------------------------------------------------------------
 
 
-def _detect_technologies(
-    scraping_data: Dict[str, Any],
-    soup: Optional[BeautifulSoup],
-    html: str,
-) -> Dict[str, Any]:
-    frameworks_js: List[str] = []
-    cms: Optional[str] = None
-    others: List[str] = []
-
-    html_lower = html.lower() if html else ""
-
-    # Heurísticas simples para CMS
-    if "wp-content" in html_lower or "wordpress" in html_lower:
-        cms = "WordPress"
-    elif "drupal" in html_lower:
-        cms = "Drupal"
-    elif "joomla" in html_lower:
-        cms = "Joomla"
-
-    
-    if soup is not None:
-        meta_gen = soup.find("meta", attrs={"name": "generator"})
-        if meta_gen and meta_gen.get("content"):
-            gen_value = meta_gen["content"].lower()
-            if "wordpress" in gen_value:
-                cms = "WordPress"
-            elif "drupal" in gen_value:
-                cms = "Drupal"
-            elif "joomla" in gen_value:
-                cms = "Joomla"
-
-   
-    framework_patterns = {
-        "react": "React",
-        "angular": "Angular",
-        "vue": "Vue.js",
-        "jquery": "jQuery",
-        "next.js": "Next.js",
-        "nuxt.js": "Nuxt.js",
-    }
+def _detect_technologies(signals: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if signals is None:
+        return {
+            "frameworks_js": [],
+            "cms": None,
+            "other": [],
+        }
 
-    if soup is not None:
-        for script in soup.find_all("script"):
-            text = ""
-            if script.get("src"):
-                text = script["src"]
-            elif script.string:
-                text = script.string
-            text_lower = text.lower()
-            for key, name in framework_patterns.items():
-                if key in text_lower and name not in frameworks_js:
-                    frameworks_js.append(name)
-
-    
-    if "bootstrap" in html_lower:
-        others.append("Bootstrap")
-    if "tailwind" in html_lower:
-        others.append("Tailwind CSS")
+    # El meta generator manda sobre las heurísticas de texto
+    cms = cms_from_generator(signals.get("generator")) or signals.get("cms_hint")
 
     return {
-        "frameworks_js": frameworks_js,
+        "frameworks_js": list(signals.get("frameworks_js") or []),
         "cms": cms,
-        "other": others,
+        "other": list(signals.get("other") or []),
     }
 
 
@@ -178,63 +135,31 @@ def _analyze_seo(scraping_data: Dict[str, Any]) -> Dict[str, Any]:
 # ----------------------------------------------------------------------
 
 
-def _analyze_structured_data(soup: Optional[BeautifulSoup]) -> Dict[str, Any]:
-    if soup is None:
+def _analyze_structured_data(signals: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if signals is None:
         return {
             "json_ld_count": 0,
             "schema_org_detected": False,
             "examples": [],
         }
 
-    json_ld_tags = soup.find_all("script", type="application/ld+json")
-    json_ld_count = len(json_ld_tags)
-
-    schema_org_detected = False
-    examples: List[Dict[str, Any]] = []
-
-    for tag in json_ld_tags[:3]:  # no procesar infinitos
-        text = tag.string or ""
-        if "schema.org" in text.lower():
-            schema_org_detected = True
-        try:
-            data = json.loads(text)
-            examples.append(_simplify_json_ld(data))
-        except Exception:
-            # Si no se puede parsear, ignoramos
-            continue
-
     return {
-        "json_ld_count": json_ld_count,
-        "schema_org_detected": schema_org_detected,
-        "examples": examples,
+        "json_ld_count": int(signals.get("json_ld_count") or 0),
+        "schema_org_detected": bool(signals.get("schema_org_detected")),
+        "examples": list(signals.get("json_ld_examples") or []),
     }
 
 
-def _simplify_json_ld(data: Any) -> Any:
-    """
-    Intenta devolver una versión "resumida" del JSON-LD:
-    - si es dict con "@type" y "name", devolvemos solo eso.
-    """
-    if isinstance(data, dict):
-        result = {}
-        for key in ("@type", "name", "headline"):
-            if key in data:
-                result[key] = data[key]
-        if result:
-            return result
-    return data
-
-
 # ----------------------------------------------------------------------
 #  Accesibilidad: alt en imágenes
 # ----------------------------------------------------------------------
 
 
 def _analyze_accessibility(
-    soup: Optional[BeautifulSoup],
+    signals: Optional[Dict[str, Any]],
     scraping_data: Dict[str, Any],
 ) -> Dict[str, Any]:
-    if soup is None:
+    if signals is None:
         total_images = scraping_data.get("images_count")
         return {
             "total_images": total_images,
@@ -242,15 +167,8 @@ def _analyze_accessibility(
             "alt_coverage": None,
         }
 
-    imgs = soup.find_all("img")
-    total = len(imgs)
-    with_alt = 0
-
-    for img in imgs:
-        alt = img.get("alt")
-        if alt is not None and alt.strip():
-            with_alt += 1
-
+    total = int(signals.get("total_images") or 0)
+    with_alt = int(signals.get("images_with_alt") or 0)
     coverage = (with_alt / total) if total > 0 else None
 
     return {
@@ -0,0 +1,249 @@
+"""
+processor/browser_pool.py
+
+Pool de navegadores headless reutilizables para generar screenshots.
+
+Lanzar Chrome es lo más caro de cada screenshot, así que cada proceso
+worker del Servidor B lanza su navegador una sola vez (en el initializer
+del ProcessPoolExecutor) y lo reutiliza para todas las páginas:
+
+- La misma pestaña se reutiliza; entre página y página se navega a
+  about:blank y se borran las cookies.
+- El navegador se recicla después de `max_pages` páginas (Chrome va
+  acumulando memoria) o cuando se cae.
+- En lugar de dormir un tiempo fijo, se espera a que
+  `document.readyState` sea "complete" (con timeout).
+
+`FakeDriver` imita la parte de la API de Selenium que usamos, para poder
+probar la lógica del pool sin Chrome y sin red.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from PIL import Image
+
+DEFAULT_MAX_PAGES_PER_BROWSER = 50
+DEFAULT_LOAD_TIMEOUT_SECONDS = 10.0
+DEFAULT_RELAUNCH_COOLDOWN_SECONDS = 60.0
+READY_STATE_POLL_SECONDS = 0.1
+
+DRIVER_CHROME = "chrome"
+DRIVER_FAKE = "fake"
+DRIVER_NONE = "none"
+DRIVER_CHOICES = (DRIVER_CHROME, DRIVER_FAKE, DRIVER_NONE)
+
+
+class BrowserUnavailableError(Exception):
+    """No hay navegador disponible (no está instalado o no pudo lanzarse)."""
+    pass
+
+
+def chrome_driver_factory(width: int = 1280, height: int = 720) -> Any:
+    """
+    Lanza un Chrome headless con Selenium. Lanza BrowserUnavailableError si
+    Selenium no está instalado o Chrome no arranca.
+    """
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+    except Exception as exc:  # noqa: BLE001
+        raise BrowserUnavailableError(f"Selenium no disponible: {exc}") from exc
+
+    options = ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    options.add_argument(f"--window-size={width},{height}")
+
+    try:
+        return webdriver.Chrome(options=options)
+    except Exception as exc:  # noqa: BLE001
+        raise BrowserUnavailableError(f"No se pudo lanzar Chrome: {exc}") from exc
+
+
+class FakeDriver:
+    """
+    Driver falso con la misma interfaz que usamos de Selenium.
+
+    - `ready_after_polls`: cuántas consultas de readyState devuelven
+      "loading" antes de "complete".
+    - `crash_on_get`: número de get() (1-based) que lanza una excepción,
+      para simular que el navegador se cae.
+    """
+
+    launches = 0  # total de drivers creados (útil en tests)
+
+    def __init__(self, ready_after_polls: int = 1, crash_on_get: Optional[int] = None) -> None:
+        FakeDriver.launches += 1
+        self.ready_after_polls = ready_after_polls
+        self.crash_on_get = crash_on_get
+        self.visited: list[str] = []
+        self.quit_called = False
+        self._polls = 0
+        self._size = (1280, 720)
+
+    def set_window_size(self, width: int, height: int) -> None:
+        self._size = (width, height)
+
+    def set_page_load_timeout(self, seconds: float) -> None:
+        pass
+
+    def get(self, url: str) -> None:
+        self.visited.append(url)
+        self._polls = 0
+        if self.crash_on_get is not None and len(self.visited) == self.crash_on_get:
+            raise RuntimeError("FakeDriver: el navegador se cayó")
+
+    def execute_script(self, script: str) -> Any:
+        if "readyState" in script:
+            self._polls += 1
+            return "complete" if self._polls > self.ready_after_polls else "loading"
+        return None
+
+    def delete_all_cookies(self) -> None:
+        pass
+
+    def get_screenshot_as_png(self) -> bytes:
+        buffer = io.BytesIO()
+        Image.new("RGB", self._size, color=(255, 255, 255)).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+class BrowserPool:
+    """
+    Un navegador reutilizable por proceso (cada worker procesa una página a
+    la vez, así que no hace falta más de uno).
+
+    `driver_factory` es una función sin argumentos que devuelve un driver
+    nuevo (Chrome real o FakeDriver).
+    """
+
+    def __init__(
+        self,
+        driver_factory: Callable[[], Any],
+        max_pages: int = DEFAULT_MAX_PAGES_PER_BROWSER,
+        load_timeout: float = DEFAULT_LOAD_TIMEOUT_SECONDS,
+        relaunch_cooldown: float = DEFAULT_RELAUNCH_COOLDOWN_SECONDS,
+    ) -> None:
+        self._driver_factory = driver_factory
+        self._max_pages = max(1, int(max_pages))
+        self._load_timeout = load_timeout
+        self._relaunch_cooldown = relaunch_cooldown
+        self._driver: Any = None
+        self._pages_served = 0
+        self._launch_failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.launches = 0
+
+    def warm_up(self) -> None:
+        """
+        Lanza el navegador ya mismo (se llama desde el initializer del pool).
+        Si falla, no lanza excepción: se vuelve a intentar más adelante.
+        """
+        with self._lock:
+            try:
+                self._ensure_driver()
+            except BrowserUnavailableError as exc:
+                logging.getLogger(__name__).warning("Navegador no disponible: %s", exc)
+
+    def capture(self, url: str, width: int, height: int) -> bytes:
+        """
+        Navega a `url` y devuelve el screenshot en PNG.
+
+        Si el navegador se cae, se relanza y se reintenta una vez.
+        """
+        with self._lock:
+            try:
+                return self._capture_once(url, width, height)
+            except BrowserUnavailableError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                logging.getLogger(__name__).warning(
+                    "El navegador falló con %s, se relanza: %s", url, exc
+                )
+                self._quit_driver()
+                return self._capture_once(url, width, height)
+
+    def close(self) -> None:
+        with self._lock:
+            self._quit_driver()
+
+    def _capture_once(self, url: str, width: int, height: int) -> bytes:
+        driver = self._ensure_driver()
+        try:
+            driver.set_window_size(width, height)
+            driver.get(url)
+            self._wait_until_loaded(driver)
+            png_bytes = driver.get_screenshot_as_png()
+        except Exception:
+            self._quit_driver()
+            raise
+
+        self._pages_served += 1
+        if self._pages_served >= self._max_pages:
+            self._quit_driver()
+        else:
+            self._reset_tab(driver)
+        return png_bytes
+
+    def _ensure_driver(self) -> Any:
+        if self._driver is not None:
+            return self._driver
+
+        if (
+            self._launch_failed_at is not None
+            and time.monotonic() - self._launch_failed_at < self._relaunch_cooldown
+        ):
+            raise BrowserUnavailableError("Navegador no disponible (reintento en espera)")
+
+        try:
+            driver = self._driver_factory()
+        except BrowserUnavailableError:
+            self._launch_failed_at = time.monotonic()
+            raise
+        except Exception as exc:  # noqa: BLE001
+            self._launch_failed_at = time.monotonic()
+            raise BrowserUnavailableError(str(exc)) from exc
+
+        if hasattr(driver, "set_page_load_timeout"):
+            driver.set_page_load_timeout(self._load_timeout)
+        self._driver = driver
+        self._pages_served = 0
+        self._launch_failed_at = None
+        self.launches += 1
+        return driver
+
+    def _wait_until_loaded(self, driver: Any) -> None:
+        deadline = time.monotonic() + self._load_timeout
+        while time.monotonic() < deadline:
+            if driver.execute_script("return document.readyState") == "complete":
+                return
+            time.sleep(READY_STATE_POLL_SECONDS)
+        logging.getLogger(__name__).debug("Timeout esperando readyState=complete")
+
+    def _reset_tab(self, driver: Any) -> None:
+        """
+        Deja la pestaña limpia para la próxima página.
+        """
+        try:
+            driver.get("about:blank")
+            driver.delete_all_cookies()
+        except Exception:  # noqa: BLE001
+            self._quit_driver()
+
+    def _quit_driver(self) -> None:
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:  # noqa: BLE001
+                pass
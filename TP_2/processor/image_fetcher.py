@@ -0,0 +1,192 @@
+"""
+processor/image_fetcher.py
+
+Descarga asíncrona de imágenes (asyncio + aiohttp) para los thumbnails.
+
+Antes cada imagen se bajaba con `urlopen` bloqueante dentro de un proceso
+del pool, así que un host lento dejaba un proceso ocupado hasta un minuto.
+Ahora las descargas corren en un event loop (todas a la vez, con límite de
+concurrencia por host) y al pool de procesos sólo le llegan los bytes ya
+descargados para decodificar y redimensionar.
+
+Además:
+    - Tamaño máximo por imagen (Content-Length y bytes leídos).
+    - Se mira el contenido real ("magic bytes") para saber si es una
+      imagen soportada, sin confiar en el Content-Type del servidor.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+USER_AGENT = "TP2-Scraper-Images/1.0"
+
+DEFAULT_PER_HOST_LIMIT = 2
+DEFAULT_TOTAL_LIMIT = 16
+DEFAULT_MAX_IMAGE_BYTES = 5 * 1024 * 1024  # 5 MB
+DEFAULT_IMAGE_TIMEOUT_SECONDS = 10.0
+
+# Firma -> formato. WEBP se chequea aparte (RIFF....WEBP)
+_MAGIC_PREFIXES = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"BM", "BMP"),
+)
+
+
+class ImageFetchError(Exception):
+    """La imagen no se pudo descargar o no es una imagen soportada."""
+    pass
+
+
+@dataclass
+class ImageBlob:
+    """Bytes crudos de una imagen descargada y su formato detectado."""
+    url: str
+    data: bytes
+    format: str
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """
+    Devuelve el formato de imagen según los primeros bytes, o None si no
+    es un formato soportado.
+    """
+    for prefix, fmt in _MAGIC_PREFIXES:
+        if head.startswith(prefix):
+            return fmt
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+class ImageFetcher:
+    """
+    Descargador de imágenes con límite de concurrencia por host.
+
+    Debe usarse siempre desde el mismo event loop (el ClientSession se crea
+    la primera vez que se lo necesita).
+    """
+
+    def __init__(
+        self,
+        per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+        total_limit: int = DEFAULT_TOTAL_LIMIT,
+        max_bytes: int = DEFAULT_MAX_IMAGE_BYTES,
+        timeout: float = DEFAULT_IMAGE_TIMEOUT_SECONDS,
+    ) -> None:
+        self._per_host_limit = max(1, int(per_host_limit))
+        self._total_limit = max(1, int(total_limit))
+        self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        # host -> (semáforo, descargas que lo tienen o lo esperan). Se borra
+        # cuando el host queda sin descargas, para no juntar uno por host
+        # durante toda la vida del proceso.
+        self._host_semaphores: Dict[str, Tuple[asyncio.Semaphore, int]] = {}
+
+    async def fetch_many(self, urls: Sequence[str]) -> List[ImageBlob]:
+        """
+        Descarga todas las URLs a la vez y devuelve las que salieron bien,
+        en el mismo orden. Las que fallan se loguean y se omiten.
+        """
+        results = await asyncio.gather(
+            *(self.fetch(url) for url in urls),
+            return_exceptions=True,
+        )
+        blobs: List[ImageBlob] = []
+        for url, result in zip(urls, results):
+            if isinstance(result, ImageBlob):
+                blobs.append(result)
+            else:
+                logging.getLogger(__name__).warning(
+                    "Error descargando imagen %s: %s", url, result
+                )
+        return blobs
+
+    async def fetch(self, url: str) -> ImageBlob:
+        host = urlparse(url).netloc
+        semaphore = self._acquire_host(host)
+        try:
+            session = self._get_session()
+            async with semaphore:
+                try:
+                    async with session.get(url) as resp:
+                        resp.raise_for_status()
+                        return await self._read_image(url, resp)
+                except asyncio.TimeoutError as exc:
+                    raise ImageFetchError(f"Timeout descargando {url}") from exc
+                except aiohttp.ClientError as exc:
+                    raise ImageFetchError(f"Error HTTP descargando {url}: {exc}") from exc
+        finally:
+            self._release_host(host)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._host_semaphores.clear()
+
+    def _acquire_host(self, host: str) -> asyncio.Semaphore:
+        semaphore, users = self._host_semaphores.get(host, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._per_host_limit)
+        self._host_semaphores[host] = (semaphore, users + 1)
+        return semaphore
+
+    def _release_host(self, host: str) -> None:
+        entry = self._host_semaphores.get(host)
+        if entry is None:  # close() ya limpió
+            return
+        semaphore, users = entry
+        if users <= 1:
+            del self._host_semaphores[host]
+        else:
+            self._host_semaphores[host] = (semaphore, users - 1)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self._timeout),
+                connector=aiohttp.TCPConnector(limit=self._total_limit),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def _read_image(self, url: str, resp: aiohttp.ClientResponse) -> ImageBlob:
+        content_length = resp.headers.get("Content-Length")
+        if content_length and content_length.isdigit() and int(content_length) > self._max_bytes:
+            raise ImageFetchError(f"Imagen demasiado grande: {url}")
+
+        chunks: List[bytes] = []
+        total = 0
+        fmt: Optional[str] = None
+
+        async for chunk in resp.content.iter_chunked(16384):
+            total += len(chunk)
+            if total > self._max_bytes:
+                raise ImageFetchError(f"Imagen demasiado grande: {url}")
+            chunks.append(chunk)
+
+            # Con los primeros bytes ya sabemos si es una imagen; si no lo es
+            # (ej: una página HTML de error) cortamos la descarga.
+            if fmt is None and total >= 12:
+                fmt = sniff_image_format(b"".join(chunks)[:12])
+                if fmt is None:
+                    raise ImageFetchError(f"El contenido no es una imagen soportada: {url}")
+
+        data = b"".join(chunks)
+        if fmt is None:
+            fmt = sniff_image_format(data[:12])
+            if fmt is None:
+                raise ImageFetchError(f"El contenido no es una imagen soportada: {url}")
+
+        return ImageBlob(url=url, data=data, format=fmt)
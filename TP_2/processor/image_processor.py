@@ -3,68 +3,190 @@ processor/image_processor.py
 
 Descarga algunas imágenes de la página y genera thumbnails optimizados.
 
-Devuelve una lista de strings base64 (PNG) para poner en:
+Devuelve una lista de strings base64 (PNG por defecto, o JPEG/WebP) para
+poner en:
 
     "thumbnails": ["base64_thumb1", "base64_thumb2", ...]
+
+La descarga es asíncrona (ver image_fetcher.py) y lo único que corre en el
+pool de procesos es `thumbnails_from_blobs`, que decodifica y redimensiona
+bytes ya descargados.
+
+Para no gastar CPU y memoria de más:
+    - Los JPEG se decodifican ya reducidos con `Image.draft()` (el decoder
+      escala 1/2, 1/4 u 1/8 mientras decodifica).
+    - Sólo se convierte de modo cuando el formato de salida no soporta el
+      modo original.
+    - Se mide el tiempo de decode/resize/encode de cada imagen.
 """
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import io
 import logging
-from typing import Any, Dict, List
-from urllib.request import Request, urlopen
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from PIL import Image
 
-USER_AGENT = "TP2-Scraper-Images/1.0"
+from .image_fetcher import ImageBlob, ImageFetcher
+
+DEFAULT_MAX_IMAGES = 3
+DEFAULT_THUMB_SIZE = (200, 200)
+DEFAULT_THUMB_FORMAT = "PNG"
+DEFAULT_THUMB_QUALITY = 80
+THUMB_FORMATS = ("PNG", "JPEG", "WEBP")
+
+# Modos que cada formato de salida puede guardar sin convertir. Los modos
+# con paleta ("P", "1") se convierten igual: redimensionarlos sólo admite
+# vecino más cercano y los thumbnails quedan pixelados.
+_SUPPORTED_MODES = {
+    "PNG": {"L", "LA", "RGB", "RGBA"},
+    "JPEG": {"L", "RGB"},
+    "WEBP": {"RGB", "RGBA"},
+}
+
+
+@dataclass(frozen=True)
+class ThumbnailOptions:
+    """Tamaño máximo, formato de salida y calidad (JPEG/WebP) de los thumbnails."""
+    size: Tuple[int, int] = DEFAULT_THUMB_SIZE
+    format: str = DEFAULT_THUMB_FORMAT
+    quality: int = DEFAULT_THUMB_QUALITY
 
 
 def generate_thumbnails(
     url: str,
     scraping_data: Dict[str, Any],
-    max_images: int = 3,
-    thumb_size: tuple[int, int] = (200, 200),
+    max_images: int = DEFAULT_MAX_IMAGES,
+    thumb_size: tuple[int, int] = DEFAULT_THUMB_SIZE,
+    thumb_format: str = DEFAULT_THUMB_FORMAT,
+    quality: int = DEFAULT_THUMB_QUALITY,
 ) -> List[str]:
     """
     Genera thumbnails para algunas imágenes de la página.
 
     Usa scraping_data.get("images", []) si está disponible.
     Si no hay imágenes, devuelve [].
+
+    Versión "todo en uno" (descarga + resize) para usar fuera del Servidor B;
+    el servidor hace las dos partes por separado.
     """
-    logger = logging.getLogger(__name__)
+    image_urls = select_image_urls(scraping_data, max_images)
+    if not image_urls:
+        return []
+
+    blobs = asyncio.run(_fetch_blobs(image_urls))
+    options = ThumbnailOptions(size=thumb_size, format=thumb_format, quality=quality)
+    thumbs, _ = thumbnails_from_blobs(blobs, options)
+    return thumbs
+
 
+def select_image_urls(scraping_data: Dict[str, Any], max_images: int = DEFAULT_MAX_IMAGES) -> List[str]:
+    """
+    Devuelve las URLs de imágenes (como máximo `max_images`) a procesar.
+    """
     image_urls = scraping_data.get("images") or []
     if not isinstance(image_urls, list):
-        image_urls = []
+        return []
+    return [u for u in image_urls if isinstance(u, str)][:max_images]
+
+
+def thumbnails_from_blobs(
+    blobs: Sequence[ImageBlob],
+    options: Optional[ThumbnailOptions] = None,
+    raw: bool = False,
+) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    Parte de CPU: decodifica y redimensiona imágenes ya descargadas.
+    Pensada para correr en el pool de procesos.
 
-    thumbs: List[str] = []
+    Devuelve (thumbnails, stats) con una entrada de stats por thumbnail
+    generado (ver make_thumbnail). Los thumbnails son strings base64, o
+    bytes crudos si raw=True.
+    """
+    logger = logging.getLogger(__name__)
+    options = options or ThumbnailOptions()
+    thumbs: List[Any] = []
+    stats: List[Dict[str, Any]] = []
 
-    for img_url in image_urls[:max_images]:
+    for blob in blobs:
         try:
-            thumb_b64 = _download_and_resize(img_url, thumb_size)
-            if thumb_b64 is not None:
-                thumbs.append(thumb_b64)
+            thumb, image_stats = render_thumbnail(blob.data, options)
         except Exception as exc:  # noqa: BLE001
-            logger.warning("Error generando thumbnail para %s: %s", img_url, exc)
+            logger.warning("Error generando thumbnail para %s: %s", blob.url, exc)
+            continue
+        image_stats["url"] = blob.url
+        thumbs.append(thumb if raw else base64.b64encode(thumb).decode("ascii"))
+        stats.append(image_stats)
 
-    return thumbs
+    return thumbs, stats
 
 
-def _download_and_resize(img_url: str, thumb_size: tuple[int, int]) -> str | None:
+def make_thumbnail(data: bytes, options: ThumbnailOptions) -> Tuple[str, Dict[str, Any]]:
     """
-    Descarga una imagen y genera un thumbnail PNG en base64.
+    Genera un thumbnail en base64 a partir de los bytes de una imagen.
+
+    Devuelve (thumbnail_base64, stats) donde stats tiene tamaños y los
+    tiempos en ms de decode, resize y encode.
     """
-    req = Request(img_url, headers={"User-Agent": USER_AGENT})
+    encoded, stats = render_thumbnail(data, options)
+    return base64.b64encode(encoded).decode("ascii"), stats
+
 
-    with urlopen(req, timeout=20.0) as resp:
-        data = resp.read()
+def render_thumbnail(data: bytes, options: ThumbnailOptions) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Como make_thumbnail, pero devuelve los bytes de la imagen sin base64.
+    """
+    started = time.perf_counter()
 
     image = Image.open(io.BytesIO(data))
-    image = image.convert("RGB")
-    image.thumbnail(thumb_size)
+    source_format = image.format
+    source_size = image.size
+
+    if source_format == "JPEG":
+        # El decoder JPEG puede escalar mientras decodifica: pedimos el
+        # tamaño más chico que siga siendo >= al thumbnail.
+        image.draft("RGB", options.size)
+    image.load()
+    decoded_at = time.perf_counter()
+    decoded_size = image.size
+
+    if image.mode not in _SUPPORTED_MODES.get(options.format, {"RGB"}):
+        has_alpha = "A" in image.mode or "transparency" in image.info
+        target_mode = "RGBA" if has_alpha and "RGBA" in _SUPPORTED_MODES[options.format] else "RGB"
+        image = image.convert(target_mode)
+    image.thumbnail(options.size, reducing_gap=2.0)
+    resized_at = time.perf_counter()
 
     buffer = io.BytesIO()
-    image.save(buffer, format="PNG")
-    return base64.b64encode(buffer.getvalue()).decode("ascii")
+    save_kwargs: Dict[str, Any] = {}
+    if options.format in ("JPEG", "WEBP"):
+        save_kwargs["quality"] = options.quality
+    image.save(buffer, format=options.format, **save_kwargs)
+    encoded = buffer.getvalue()
+    encoded_at = time.perf_counter()
+
+    stats = {
+        "source_format": source_format,
+        "source_size": list(source_size),
+        "decoded_size": list(decoded_size),
+        "output_size": list(image.size),
+        "output_format": options.format,
+        "bytes": len(encoded),
+        "decode_ms": round((decoded_at - started) * 1000, 2),
+        "resize_ms": round((resized_at - decoded_at) * 1000, 2),
+        "encode_ms": round((encoded_at - resized_at) * 1000, 2),
+    }
+    return encoded, stats
+
+
+async def _fetch_blobs(image_urls: Sequence[str]) -> List[ImageBlob]:
+    fetcher = ImageFetcher()
+    try:
+        return await fetcher.fetch_many(image_urls)
+    finally:
+        await fetcher.close()
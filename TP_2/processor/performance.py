@@ -5,7 +5,7 @@ Análisis de rendimiento básico:
 
 - Tiempo de carga (ms) del HTML principal
 - Tamaño total (KB) del HTML
-- Cantidad de requests (aquí contamos sólo el HTML principal = 1)
+- Cantidad de requests (HTML principal + redirecciones)
 
 La idea es cumplir con la estructura:
 
@@ -14,23 +14,70 @@ La idea es cumplir con la estructura:
         "total_size_kb": ...,
         "num_requests": ...
     }
+
+Por defecto las métricas salen de la descarga que ya hizo el Servidor A
+(`fetch_metrics` en el payload de process_page), así la página no se baja
+dos veces. En modo "cold" se hace una medición aparte, descargando de nuevo.
 """
 
 from __future__ import annotations
 
 import logging
 import time
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from urllib.request import Request, urlopen
 
 USER_AGENT = "TP2-Scraper-Performance/1.0"
 
+MODE_REUSE = "reuse"
+MODE_COLD = "cold"
+PERFORMANCE_MODES = (MODE_REUSE, MODE_COLD)
+
 
-def analyze_performance(url: str, timeout: float = 20.0) -> Dict[str, Any]:
+def analyze_performance(
+    url: str,
+    timeout: float = 20.0,
+    fetch_metrics: Optional[Dict[str, Any]] = None,
+    mode: str = MODE_REUSE,
+) -> Dict[str, Any]:
     """
     Devuelve un dict con métricas de rendimiento.
     Si algo falla, devuelve valores nulos.
+
+    Si hay `fetch_metrics` del Servidor A y mode != "cold", sólo se calculan
+    métricas derivadas; si no, se mide descargando la página.
     """
+    if fetch_metrics and mode != MODE_COLD:
+        return _derive_from_fetch_metrics(fetch_metrics)
+    return _measure_cold(url, timeout)
+
+
+def _derive_from_fetch_metrics(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    total_ms = metrics.get("total_ms")
+    size = metrics.get("bytes")
+    download_ms = metrics.get("download_ms")
+
+    throughput_kbps: Optional[float] = None
+    if size is not None and download_ms:
+        throughput_kbps = round((size / 1024.0) / (download_ms / 1000.0), 2)
+
+    return {
+        "load_time_ms": int(total_ms) if total_ms is not None else None,
+        "total_size_kb": round(size / 1024.0, 2) if size is not None else None,
+        "num_requests": 1 + int(metrics.get("redirects") or 0),
+        "timing": {
+            "dns_ms": metrics.get("dns_ms"),
+            "connect_ms": metrics.get("connect_ms"),
+            "ttfb_ms": metrics.get("ttfb_ms"),
+            "download_ms": download_ms,
+            "connection_reused": metrics.get("connection_reused"),
+        },
+        "throughput_kbps": throughput_kbps,
+        "source": "scraper",
+    }
+
+
+def _measure_cold(url: str, timeout: float) -> Dict[str, Any]:
     logger = logging.getLogger(__name__)
 
     start = time.perf_counter()
@@ -54,4 +101,5 @@ def analyze_performance(url: str, timeout: float = 20.0) -> Dict[str, Any]:
         "load_time_ms": elapsed_ms,
         "total_size_kb": size_kb,
         "num_requests": 1,
+        "source": "cold",
     }
@@ -3,7 +3,8 @@ processor/screenshot.py
 
 Generación de screenshot de una página web.
 
-- Intenta usar Selenium (Chrome headless).
+- Usa un navegador headless reutilizable por proceso (ver browser_pool.py),
+  lanzado una sola vez en el initializer del pool de procesos.
 - Si falla (no hay driver, error, etc.), genera una imagen placeholder
   con Pillow para no romper el flujo.
 """
@@ -11,65 +12,110 @@ Generación de screenshot de una página web.
 from __future__ import annotations
 
 import base64
+import functools
 import io
 import logging
-import time
+import multiprocessing.util
 from typing import Optional
 
 from PIL import Image, ImageDraw, ImageFont
 
+from .browser_pool import (
+    DEFAULT_MAX_PAGES_PER_BROWSER,
+    DRIVER_CHROME,
+    DRIVER_FAKE,
+    DRIVER_NONE,
+    BrowserPool,
+    BrowserUnavailableError,
+    FakeDriver,
+    chrome_driver_factory,
+)
+
+# Pool de navegador del proceso actual (uno por worker del ProcessPoolExecutor)
+_WORKER_POOL: Optional[BrowserPool] = None
+_SCREENSHOTS_DISABLED = False
+
+
+def init_worker_browser(
+    driver: str = DRIVER_CHROME,
+    max_pages: int = DEFAULT_MAX_PAGES_PER_BROWSER,
+    width: int = 1280,
+    height: int = 720,
+) -> None:
+    """
+    Initializer del ProcessPoolExecutor: crea el pool de navegador del
+    worker y lanza el navegador de una vez, así la primera página no paga
+    el arranque.
+
+    driver: "chrome" (Selenium), "fake" (FakeDriver, sin Chrome) o
+    "none" (siempre placeholder).
+    """
+    global _WORKER_POOL, _SCREENSHOTS_DISABLED
+
+    if driver == DRIVER_NONE:
+        _WORKER_POOL = None
+        _SCREENSHOTS_DISABLED = True
+        return
+
+    if driver == DRIVER_FAKE:
+        factory = FakeDriver
+    else:
+        factory = functools.partial(chrome_driver_factory, width, height)
+
+    _WORKER_POOL = BrowserPool(factory, max_pages=max_pages)
+    _WORKER_POOL.warm_up()
+    # Cerrar el navegador cuando termina el proceso worker
+    multiprocessing.util.Finalize(_WORKER_POOL, _WORKER_POOL.close, exitpriority=10)
+
+
+def _get_worker_pool() -> Optional[BrowserPool]:
+    """
+    Devuelve el pool del proceso. Si no se llamó al initializer (por ejemplo,
+    fuera del Servidor B), se crea uno con Chrome la primera vez.
+    """
+    global _WORKER_POOL
+    if _SCREENSHOTS_DISABLED:
+        return None
+    if _WORKER_POOL is None:
+        _WORKER_POOL = BrowserPool(chrome_driver_factory)
+    return _WORKER_POOL
+
 
 def generate_screenshot(url: str, width: int = 1280, height: int = 720) -> Optional[str]:
     """
     Devuelve un PNG en base64 con el screenshot de `url`.
-    Si Selenium no está disponible o algo falla, devuelve un placeholder.
+    Si no hay navegador disponible o algo falla, devuelve un placeholder.
 
     La idea es cumplir con:
         "screenshot": "base64_encoded_image"
     """
+    return base64.b64encode(capture_screenshot_png(url, width, height)).decode("ascii")
+
+
+def capture_screenshot_png(url: str, width: int = 1280, height: int = 720) -> bytes:
+    """
+    Igual que generate_screenshot pero devuelve los bytes PNG crudos (el
+    Servidor B los manda como adjunto binario, sin base64).
+    """
     logger = logging.getLogger(__name__)
 
-    # Intentar Selenium sólo si está instalado
-    try:
-        from selenium import webdriver
-        from selenium.webdriver.chrome.options import Options as ChromeOptions
-        from selenium.common.exceptions import WebDriverException
-    except Exception:  
-        webdriver = None
-        ChromeOptions = None  
-        WebDriverException = Exception  
-
-    if webdriver is not None and ChromeOptions is not None:
+    pool = _get_worker_pool()
+    if pool is not None:
         try:
-            options = ChromeOptions()
-            options.add_argument("--headless=new")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-gpu")
-            options.add_argument(f"--window-size={width},{height}")
-
-            driver = webdriver.Chrome(options=options)
-            try:
-                driver.set_window_size(width, height)
-                driver.get(url)
-                # Esperar un poquito para que cargue algo de contenido
-                time.sleep(2.0)
-                png_bytes = driver.get_screenshot_as_png()
-                return base64.b64encode(png_bytes).decode("ascii")
-            finally:
-                driver.quit()
-        except WebDriverException as exc:  # type: ignore[misc]
-            logger.warning("Error al usar Selenium, se usará placeholder: %s", exc)
+            return pool.capture(url, width, height)
+        except BrowserUnavailableError as exc:
+            logger.warning("Navegador no disponible, se usará placeholder: %s", exc)
         except Exception as exc:  # noqa: BLE001
-            logger.warning("Error inesperado con Selenium, se usará placeholder: %s", exc)
+            logger.warning("Error inesperado con el navegador, se usará placeholder: %s", exc)
 
     # Fallback: imagen simple con texto
     return _generate_placeholder_image(url, width, height)
 
 
-def _generate_placeholder_image(url: str, width: int, height: int) -> str:
+def _generate_placeholder_image(url: str, width: int, height: int) -> bytes:
     """
     Genera una imagen PNG simple con el texto de la URL.
-    Devuelve la imagen en base64 (string).
+    Devuelve los bytes PNG.
     """
     img = Image.new("RGB", (width, height), color=(30, 30, 30))
     draw = ImageDraw.Draw(img)
@@ -80,5 +126,4 @@ def _generate_placeholder_image(url: str, width: int, height: int) -> str:
 
     buffer = io.BytesIO()
     img.save(buffer, format="PNG")
-    data = buffer.getvalue()
-    return base64.b64encode(data).decode("ascii")
+    return buffer.getvalue()
@@ -3,13 +3,45 @@ async_http.py
 Cliente HTTP asíncrono usando aiohttp.
 
 Responsable de descargar el HTML sin bloquear el event loop.
+
+Durante la descarga se miden tiempos reales (DNS, conexión, TTFB,
+descarga) y bytes recibidos, para que el Servidor B no tenga que volver a
+bajar la página sólo para medir rendimiento.
+
+Con stream_parse=True el HTML se parsea mientras llega (ver
+StreamingPageParser en common/html_parser.py) y no se guarda completo en memoria.
+
+La codificación sale del charset del Content-Type; si no viene, de un
+<meta charset> en los primeros 1024 bytes (como el prescan del navegador),
+y si tampoco hay, utf-8. Los dos modos de lectura usan la misma regla.
+
+Con `validators` (ETag / Last-Modified de una descarga anterior) el GET es
+condicional; si el sitio responde 304, el resultado viene con
+not_modified=True y sin cuerpo.
 """
 
 import asyncio
-from typing import Tuple
+import codecs
+import re
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
 
 import aiohttp
 
+from common.html_parser import StreamingPageParser
+
+
+# Bytes del comienzo del cuerpo donde se busca un <meta charset>
+CHARSET_SNIFF_BYTES = 1024
+
+# <meta charset="x"> y <meta http-equiv="Content-Type" content="...; charset=x">
+_META_CHARSET_RE = re.compile(
+    rb"<meta\b[^>]*?charset\s*=\s*[\"']?\s*([a-z0-9_.:-]+)",
+    re.IGNORECASE,
+)
+
 
 class HttpError(Exception):
     """Error de red o HTTP al hacer la petición."""
@@ -21,6 +53,113 @@ class ContentTooLargeError(HttpError):
     pass
 
 
+@dataclass
+class FetchResult:
+    """
+    Resultado de fetch_page: HTML, URL final y métricas de la descarga.
+
+    metrics:
+        dns_ms, connect_ms   -> None si la conexión se reutilizó o no hubo trace
+        ttfb_ms              -> desde el inicio hasta recibir los headers
+        download_ms          -> desde los headers hasta el último byte
+        total_ms             -> tiempo total
+        bytes                -> bytes del cuerpo recibidos
+        redirects            -> cantidad de redirecciones seguidas
+        connection_reused    -> True si se usó una conexión keep-alive
+        status               -> código HTTP final
+
+    Con stream_parse=True, html queda vacío y vienen scraping_data y
+    page_signals ya calculados.
+
+    validators trae el ETag / Last-Modified de la respuesta (para guardarlos
+    junto al resultado) y not_modified es True si un GET condicional
+    recibió 304.
+    """
+    html: str
+    url: str
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    scraping_data: Optional[Dict[str, Any]] = None
+    page_signals: Optional[Dict[str, Any]] = None
+    validators: Dict[str, str] = field(default_factory=dict)
+    not_modified: bool = False
+
+
+def response_validators(headers: Mapping[str, str]) -> Dict[str, str]:
+    """
+    Validadores HTTP de una respuesta: {"etag": ..., "last_modified": ...}
+    (sólo los que vinieron).
+    """
+    validators: Dict[str, str] = {}
+    etag = headers.get("ETag")
+    if etag:
+        validators["etag"] = etag
+    last_modified = headers.get("Last-Modified")
+    if last_modified:
+        validators["last_modified"] = last_modified
+    return validators
+
+
+def conditional_headers(validators: Optional[Mapping[str, str]]) -> Dict[str, str]:
+    """Headers If-None-Match / If-Modified-Since para revalidar."""
+    headers: Dict[str, str] = {}
+    if not validators:
+        return headers
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def build_trace_config() -> aiohttp.TraceConfig:
+    """
+    TraceConfig para el ClientSession que registra los tiempos de DNS y de
+    conexión en el dict pasado como `trace_request_ctx` de cada request.
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    def _timings(ctx: SimpleNamespace) -> Optional[Dict[str, Any]]:
+        timings = getattr(ctx, "trace_request_ctx", None)
+        return timings if isinstance(timings, dict) else None
+
+    async def on_dns_start(session, ctx, params) -> None:
+        ctx.dns_started = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params) -> None:
+        timings = _timings(ctx)
+        if timings is not None and hasattr(ctx, "dns_started"):
+            elapsed = (time.perf_counter() - ctx.dns_started) * 1000
+            timings["dns_ms"] = (timings.get("dns_ms") or 0.0) + elapsed
+
+    async def on_connection_start(session, ctx, params) -> None:
+        ctx.connection_started = time.perf_counter()
+
+    async def on_connection_end(session, ctx, params) -> None:
+        timings = _timings(ctx)
+        if timings is not None and hasattr(ctx, "connection_started"):
+            elapsed = (time.perf_counter() - ctx.connection_started) * 1000
+            timings["connect_ms"] = (timings.get("connect_ms") or 0.0) + elapsed
+            timings["connection_reused"] = False
+
+    async def on_connection_reused(session, ctx, params) -> None:
+        timings = _timings(ctx)
+        if timings is not None:
+            timings.setdefault("connection_reused", True)
+
+    async def on_redirect(session, ctx, params) -> None:
+        timings = _timings(ctx)
+        if timings is not None:
+            timings["redirects"] = timings.get("redirects", 0) + 1
+
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connection_start)
+    trace_config.on_connection_create_end.append(on_connection_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reused)
+    trace_config.on_request_redirect.append(on_redirect)
+    return trace_config
+
+
 async def fetch_html(
     url: str, 
     session: aiohttp.ClientSession,
@@ -41,10 +180,50 @@ async def fetch_html(
         HttpError en caso de problemas de red o HTTP.
         ContentTooLargeError si el contenido excede max_size_mb.
     """
+    result = await fetch_page(url, session=session, max_size_mb=max_size_mb)
+    return result.html, result.url
+
+
+async def fetch_page(
+    url: str,
+    session: aiohttp.ClientSession,
+    max_size_mb: float = 10.0,
+    stream_parse: bool = False,
+    validators: Optional[Mapping[str, str]] = None,
+) -> FetchResult:
+    """
+    Igual que fetch_html, pero además devuelve las métricas de la descarga
+    (ver FetchResult). Los tiempos de DNS/conexión sólo se completan si el
+    session se creó con build_trace_config().
+
+    Con stream_parse=True cada pedazo recibido se pasa a un
+    StreamingPageParser (con la URL final como base) y el resultado trae
+    scraping_data/page_signals en lugar del HTML.
+
+    Con validators se envían If-None-Match / If-Modified-Since; ante un 304
+    se devuelve un FetchResult vacío con not_modified=True.
+    """
     max_size_bytes = int(max_size_mb * 1024 * 1024)
-    
+    timings: Dict[str, Any] = {}
+    started = time.perf_counter()
+    request_headers = conditional_headers(validators)
+
     try:
-        async with session.get(url) as resp:
+        async with session.get(
+            url,
+            headers=request_headers or None,
+            trace_request_ctx=timings,
+        ) as resp:
+            headers_at = time.perf_counter()
+            if resp.status == 304 and request_headers:
+                metrics = _metrics(timings, started, headers_at, headers_at, 0, resp.status)
+                return FetchResult(
+                    html="",
+                    url=str(resp.url),
+                    metrics=metrics,
+                    validators=response_validators(resp.headers) or dict(validators or {}),
+                    not_modified=True,
+                )
             resp.raise_for_status()
             
             # Verificar Content-Length si está disponible
@@ -61,9 +240,24 @@ async def fetch_html(
                     pass  # Content-Length no es un número válido
             
             # Descargar con límite de tamaño
-            text = await _read_with_limit(resp, max_size_bytes)
-            
-            return text, str(resp.url)
+            parser: Optional[StreamingPageParser] = None
+            if stream_parse:
+                parser = StreamingPageParser(str(resp.url))
+                text, body_size = await _read_with_limit(resp, max_size_bytes, on_text=parser.feed)
+            else:
+                text, body_size = await _read_with_limit(resp, max_size_bytes)
+            finished_at = time.perf_counter()
+
+            metrics = _metrics(timings, started, headers_at, finished_at, body_size, resp.status)
+            result = FetchResult(
+                html=text,
+                url=str(resp.url),
+                metrics=metrics,
+                validators=response_validators(resp.headers),
+            )
+            if parser is not None:
+                result.scraping_data, result.page_signals = parser.close()
+            return result
 
     except ContentTooLargeError:
         raise  # Re-lanzar sin modificar
@@ -73,15 +267,48 @@ async def fetch_html(
         raise HttpError(f"Error HTTP al acceder a {url}: {exc}") from exc
 
 
+def _metrics(
+    timings: Dict[str, Any],
+    started: float,
+    headers_at: float,
+    finished_at: float,
+    body_size: int,
+    status: int,
+) -> Dict[str, Any]:
+    return {
+        "dns_ms": _round_ms(timings.get("dns_ms")),
+        "connect_ms": _round_ms(timings.get("connect_ms")),
+        "ttfb_ms": _round_ms((headers_at - started) * 1000),
+        "download_ms": _round_ms((finished_at - headers_at) * 1000),
+        "total_ms": _round_ms((finished_at - started) * 1000),
+        "bytes": body_size,
+        "redirects": timings.get("redirects", 0),
+        "connection_reused": timings.get("connection_reused"),
+        "status": status,
+    }
+
+
+def _round_ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
+
+
 async def _read_with_limit(
     response: aiohttp.ClientResponse, 
-    max_size: int
-) -> str:
+    max_size: int,
+    on_text: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, int]:
     """
     Lee el contenido de la respuesta con un límite de tamaño.
+    Devuelve (texto, bytes_leídos).
+
+    Si se pasa `on_text`, cada pedazo se decodifica apenas llega y se le
+    pasa a on_text; no se guarda nada y el texto devuelto es "".
     
     Lanza ContentTooLargeError si se excede el límite.
     """
+    if on_text is not None:
+        return "", await _stream_with_limit(response, max_size, on_text)
+
     chunks = []
     total_size = 0
     
@@ -98,20 +325,92 @@ async def _read_with_limit(
     # Decodificar todo el contenido
     full_content = b''.join(chunks)
     
-    # Intentar detectar la codificación
-    try:
-        encoding = response.get_encoding()
-    except RuntimeError:
-    # Cuando el cuerpo no fue leído completo, get_encoding()
-    # lanza RuntimeError. Usamos utf-8 por defecto y luego
-    # aplicamos los fallbacks manuales.
-        encoding = 'utf-8'
+    # Charset del Content-Type, si no el del <meta>, y si no utf-8
+    # (después se aplican los fallbacks manuales)
+    encoding = (
+        _header_charset(response)
+        or sniff_meta_charset(full_content[:CHARSET_SNIFF_BYTES])
+        or 'utf-8'
+    )
 
     try:
-        return full_content.decode(encoding)
+        return full_content.decode(encoding), total_size
     except (UnicodeDecodeError, LookupError):
     # Fallback a utf-8 y luego latin-1
         try:
-            return full_content.decode('utf-8')
+            return full_content.decode('utf-8'), total_size
         except UnicodeDecodeError:
-            return full_content.decode('latin-1', errors='replace')
+            return full_content.decode('latin-1', errors='replace'), total_size
+
+
+async def _stream_with_limit(
+    response: aiohttp.ClientResponse,
+    max_size: int,
+    on_text: Callable[[str], None],
+) -> int:
+    """
+    Variante de _read_with_limit que decodifica de forma incremental.
+
+    Usa el charset del Content-Type; si no hay, junta los primeros
+    CHARSET_SNIFF_BYTES bytes para buscar un <meta charset> antes de
+    empezar a decodificar (o utf-8). Como los pedazos ya entregados no se
+    pueden volver a decodificar, los bytes inválidos se reemplazan en lugar
+    de reintentar todo con latin-1.
+    """
+    encoding = _header_charset(response)
+    decoder = _incremental_decoder(encoding) if encoding else None
+    pending = b""  # comienzo del cuerpo, hasta decidir la codificación
+    total_size = 0
+
+    async for chunk in response.content.iter_chunked(8192):
+        total_size += len(chunk)
+
+        if total_size > max_size:
+            raise ContentTooLargeError(
+                f"El contenido excede el límite de {max_size / 1024 / 1024:.2f} MB"
+            )
+
+        if decoder is None:
+            pending += chunk
+            if len(pending) < CHARSET_SNIFF_BYTES:
+                continue
+            decoder = _incremental_decoder(sniff_meta_charset(pending) or "utf-8")
+            chunk, pending = pending, b""
+
+        on_text(decoder.decode(chunk))
+
+    if decoder is None:  # cuerpo más corto que CHARSET_SNIFF_BYTES
+        decoder = _incremental_decoder(sniff_meta_charset(pending) or "utf-8")
+        on_text(decoder.decode(pending))
+    on_text(decoder.decode(b"", final=True))
+    return total_size
+
+
+def sniff_meta_charset(head: bytes) -> Optional[str]:
+    """
+    Codificación declarada en un <meta> dentro de `head` (nombre normalizado
+    de codecs), o None si no hay o no se conoce. Un utf-16/32 declarado en
+    un documento que se pudo leer como ASCII es un error: se toma utf-8.
+    """
+    match = _META_CHARSET_RE.search(head)
+    if match is None:
+        return None
+    try:
+        name = codecs.lookup(match.group(1).decode("ascii")).name
+    except LookupError:
+        return None
+    return "utf-8" if name.startswith(("utf-16", "utf-32")) else name
+
+
+def _header_charset(response: aiohttp.ClientResponse) -> Optional[str]:
+    charset = getattr(response, "charset", None)
+    if isinstance(charset, str) and charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return None
+
+
+def _incremental_decoder(encoding: str) -> codecs.IncrementalDecoder:
+    return codecs.getincrementaldecoder(encoding)(errors="replace")
@@ -0,0 +1,347 @@
+"""
+cache.py
+Caché de resultados del Servidor A (Bonus Opción 2).
+
+Reemplaza al dict url -> (timestamp, resultado) que crecía sin límite:
+    - TTL por entrada; las vencidas se borran al consultarlas y además en
+      un barrido periódico en segundo plano.
+    - Presupuesto de memoria en bytes (estimado) con desalojo LRU.
+    - Contadores de hits, misses, vencidas y desalojos (ver stats()).
+    - Opción de no guardar los campos pesados (screenshot y thumbnails en
+      base64): se cachea el resto del resultado y esos campos quedan vacíos.
+    - Validadores HTTP (ETag / Last-Modified) por entrada: una entrada
+      vencida que los tiene se conserva un tiempo más (stale_retention) para
+      revalidarla con un GET condicional en lugar de reprocesar la página.
+    - Ventana stale-while-revalidate: una entrada vencida hace menos de
+      stale_window segundos se puede seguir sirviendo (get_stale) mientras
+      se refresca en segundo plano.
+
+Las claves son URLs normalizadas (normalize_url), así
+"HTTP://Example.com:80/#x" y "http://example.com/" comparten entrada.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+DEFAULT_SWEEP_INTERVAL_SECONDS = 60.0
+DEFAULT_STALE_RETENTION_SECONDS = 24 * 3600.0
+
+# Campos de processing_data que se pueden dejar fuera de la caché
+HEAVY_FIELDS = ("screenshot", "thumbnails")
+OMITTED_FIELDS_KEY = "omitted_fields"
+
+# Overhead aproximado por objeto al estimar tamaños
+_OBJECT_OVERHEAD = 64
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Forma canónica de una URL para usarla como clave: esquema y host en
+    minúsculas, sin puerto por defecto, path "/" si está vacío, parámetros
+    de la query ordenados y sin fragmento.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+
+    netloc = host
+    if parts.username or parts.password:
+        userinfo = parts.username or ""
+        if parts.password:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc += f":{port}"
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)), doseq=True)
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+@dataclass
+class _CacheEntry:
+    stored_at: float
+    expires_at: float
+    result: Dict[str, Any]
+    size: int
+    validators: Optional[Dict[str, str]] = None
+
+    def retained_until(self, stale_retention: float, stale_window: float = 0.0) -> float:
+        """Hasta cuándo se conserva la entrada (vencida o no)."""
+        if self.validators:
+            return self.expires_at + max(stale_retention, stale_window)
+        return self.expires_at + stale_window
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    Estimación barata (sin serializar) de los bytes que ocupa un resultado:
+    largo de strings/bytes más un overhead fijo por contenedor.
+    """
+    if isinstance(obj, (str, bytes, bytearray)):
+        return len(obj) + _OBJECT_OVERHEAD
+    if isinstance(obj, dict):
+        return _OBJECT_OVERHEAD + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return _OBJECT_OVERHEAD + sum(estimate_size(item) for item in obj)
+    return 16
+
+
+def strip_heavy_fields(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia de `result` sin screenshot ni thumbnails. La lista de campos
+    quitados queda en result[OMITTED_FIELDS_KEY].
+    """
+    processing = result.get("processing_data")
+    if not isinstance(processing, dict):
+        return result
+
+    omitted = [name for name in HEAVY_FIELDS if processing.get(name)]
+    if not omitted:
+        return result
+
+    stripped = dict(result)
+    stripped["processing_data"] = dict(processing)
+    for name in omitted:
+        stripped["processing_data"][name] = [] if name == "thumbnails" else None
+    stripped[OMITTED_FIELDS_KEY] = omitted
+    return stripped
+
+
+class ResultCache:
+    """
+    Caché LRU con TTL y presupuesto en bytes.
+
+    No es thread-safe: se usa desde el event loop del Servidor A.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        sweep_interval: float = DEFAULT_SWEEP_INTERVAL_SECONDS,
+        store_heavy_fields: bool = True,
+        stale_retention: float = DEFAULT_STALE_RETENTION_SECONDS,
+        stale_window: float = 0.0,
+    ) -> None:
+        self._ttl = max(0.0, float(ttl_seconds))
+        self._max_bytes = max(0, int(max_bytes))
+        self._sweep_interval = max(0.0, sweep_interval)
+        self._store_heavy_fields = store_heavy_fields
+        self._stale_retention = max(0.0, float(stale_retention))
+        self._stale_window = max(0.0, float(stale_window))
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._sweep_task: Optional[asyncio.Task] = None
+
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._revalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_bytes > 0
+
+    async def start(self) -> None:
+        """Arranca el barrido periódico de entradas vencidas."""
+        if self.enabled and self._sweep_interval > 0 and self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+            self._sweep_task = None
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el resultado cacheado y vigente para `key`, o None.
+        """
+        if not self.enabled:
+            return None
+        now = time.time() if now is None else now
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        if entry.expires_at <= now:
+            if self._retained_until(entry) <= now:
+                self._remove(key)
+                self._expired += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.result
+
+    def get_stale(
+        self,
+        key: str,
+        now: Optional[float] = None,
+        max_staleness: Optional[float] = None,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+        """
+        Devuelve (resultado, validadores) de una entrada conservada, o None.
+        No cuenta como hit ni como miss.
+
+        Sin max_staleness, sólo entradas con validadores (para revalidar).
+        Con max_staleness, cualquier entrada vencida hace menos de esos
+        segundos (para servirla mientras se refresca).
+        """
+        if not self.enabled:
+            return None
+        now = time.time() if now is None else now
+
+        entry = self._entries.get(key)
+        if entry is None or self._retained_until(entry) <= now:
+            return None
+        if max_staleness is None:
+            if not entry.validators:
+                return None
+        elif entry.expires_at + max_staleness <= now:
+            return None
+        return entry.result, entry.validators or {}
+
+    def refresh(
+        self,
+        key: str,
+        now: Optional[float] = None,
+        validators: Optional[Dict[str, str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Renueva el TTL de una entrada (por ejemplo, tras un 304 Not
+        Modified) y, si se pasan, reemplaza sus validadores. Devuelve el
+        resultado o None si la entrada ya no está.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.time() if now is None else now
+
+        entry.stored_at = now
+        entry.expires_at = now + self._ttl
+        if validators:
+            entry.validators = dict(validators)
+        self._entries.move_to_end(key)
+        self._revalidated += 1
+        return entry.result
+
+    def put(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        now: Optional[float] = None,
+        expires_at: Optional[float] = None,
+        validators: Optional[Dict[str, str]] = None,
+    ) -> bool:
+        """
+        Guarda `result` por ttl_seconds (o hasta `expires_at`, si se pasa),
+        junto con sus validadores HTTP (ver async_http.response_validators).
+        Devuelve False si no entra en el presupuesto (por ejemplo, un único
+        resultado más grande que max_bytes).
+        """
+        if not self.enabled:
+            return False
+        now = time.time() if now is None else now
+
+        if not self._store_heavy_fields:
+            result = strip_heavy_fields(result)
+
+        size = estimate_size(result)
+        if size > self._max_bytes:
+            logging.getLogger(__name__).debug("Resultado de %s no entra en la caché (%d bytes)", key, size)
+            self._remove(key)
+            return False
+
+        self._remove(key)
+        self._entries[key] = _CacheEntry(
+            stored_at=now,
+            expires_at=now + self._ttl if expires_at is None else expires_at,
+            result=result,
+            size=size,
+            validators=dict(validators) if validators else None,
+        )
+        self._total_bytes += size
+
+        while self._total_bytes > self._max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+        return True
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Borra las entradas vencidas (pasados stale_window y, si tienen
+        validadores, stale_retention) y devuelve cuántas fueron.
+        """
+        now = time.time() if now is None else now
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if self._retained_until(entry) <= now
+        ]
+        for key in expired:
+            self._remove(key)
+        self._expired += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self._max_bytes,
+            "ttl_seconds": self._ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+            "expired": self._expired,
+            "evictions": self._evictions,
+            "revalidated": self._revalidated,
+            "store_heavy_fields": self._store_heavy_fields,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _retained_until(self, entry: _CacheEntry) -> float:
+        return entry.retained_until(self._stale_retention, self._stale_window)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logging.getLogger(__name__).debug("Caché: %d entradas vencidas borradas", removed)
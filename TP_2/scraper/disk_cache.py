@@ -0,0 +1,443 @@
+"""
+disk_cache.py
+Caché persistente en disco (SQLite) para los resultados del Servidor A.
+
+La caché en memoria (cache.py) se pierde con cada reinicio y no se comparte
+entre varias instancias del Servidor A. Esta caché guarda los resultados en
+un archivo SQLite que pueden usar varios procesos del mismo host a la vez:
+
+    - Modo WAL + busy_timeout: lectores concurrentes y un escritor a la
+      vez sin errores de "database is locked".
+    - La clave es la URL normalizada (ver cache.normalize_url).
+    - Los campos pesados (screenshot, thumbnails) se guardan aparte, como
+      bytes PNG crudos (sin base64) en la tabla `blobs`.
+    - TTL por entrada (reloj de pared, compartido entre procesos), tope de
+      tamaño con desalojo por último acceso y compactación periódica
+      (borrado de vencidas + incremental_vacuum + checkpoint del WAL).
+    - Validadores HTTP (ETag / Last-Modified) y ventana stale-while-
+      revalidate: igual que en la caché en memoria, las vencidas se
+      conservan stale_window segundos (stale_retention si tienen
+      validadores) para servirlas mientras se refrescan o revalidarlas.
+
+SQLite es bloqueante: todas las operaciones corren en un único thread
+propio, así que desde asyncio se usan las variantes `*_async`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import concurrent.futures
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import DEFAULT_STALE_RETENTION_SECONDS, HEAVY_FIELDS, strip_heavy_fields
+
+DEFAULT_DISK_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+DEFAULT_COMPACT_INTERVAL_SECONDS = 300.0
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    stored_at   REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size        INTEGER NOT NULL,
+    result      TEXT NOT NULL,
+    validators  TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS blobs (
+    key      TEXT NOT NULL REFERENCES entries (key) ON DELETE CASCADE,
+    field    TEXT NOT NULL,
+    idx      INTEGER NOT NULL,
+    encoding TEXT NOT NULL,
+    data     BLOB NOT NULL,
+    PRIMARY KEY (key, field, idx)
+);
+"""
+
+
+class DiskCache:
+    """
+    Caché de resultados en un archivo SQLite compartible entre procesos.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float,
+        max_bytes: int = DEFAULT_DISK_CACHE_MAX_BYTES,
+        store_heavy_fields: bool = True,
+        compact_interval: float = DEFAULT_COMPACT_INTERVAL_SECONDS,
+        stale_retention: float = DEFAULT_STALE_RETENTION_SECONDS,
+        stale_window: float = 0.0,
+    ) -> None:
+        self.path = path
+        self._ttl = max(0.0, float(ttl_seconds))
+        self._max_bytes = max(0, int(max_bytes))
+        self._store_heavy_fields = store_heavy_fields
+        self._compact_interval = max(0.0, compact_interval)
+        self._stale_retention = max(0.0, float(stale_retention))
+        self._stale_window = max(0.0, float(stale_window))
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="disk-cache"
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+        self._compact_task: Optional[asyncio.Task] = None
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expired = 0
+        self._revalidated = 0
+
+    # ------------------------------------------------------------------
+    #  API asyncio
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        await self._run(self._connect)
+        if self._compact_interval > 0 and self._compact_task is None:
+            self._compact_task = asyncio.create_task(self._compact_loop())
+
+    async def close(self) -> None:
+        if self._compact_task is not None:
+            self._compact_task.cancel()
+            try:
+                await self._compact_task
+            except asyncio.CancelledError:
+                pass
+            self._compact_task = None
+        await self._run(self._close_conn)
+        self._executor.shutdown(wait=True)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.get, key)
+
+    async def lookup_async(self, key: str) -> Optional[Tuple[Dict[str, Any], float, Optional[Dict[str, str]]]]:
+        return await self._run(self.lookup, key)
+
+    async def lookup_stale_async(
+        self, key: str, max_staleness: Optional[float] = None
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+        return await self._run(self.lookup_stale, key, None, max_staleness)
+
+    async def put_async(
+        self, key: str, result: Dict[str, Any], validators: Optional[Dict[str, str]] = None
+    ) -> bool:
+        return await self._run(self.put, key, result, None, validators)
+
+    async def refresh_async(self, key: str, validators: Optional[Dict[str, str]] = None) -> bool:
+        return await self._run(self.refresh, key, None, validators)
+
+    async def compact_async(self) -> int:
+        return await self._run(self.compact)
+
+    async def stats_async(self) -> Dict[str, Any]:
+        return await self._run(self.stats)
+
+    # ------------------------------------------------------------------
+    #  API bloqueante (corre en el thread de la caché)
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el resultado vigente para `key` (con screenshot/thumbnails
+        de nuevo en base64), o None.
+        """
+        entry = self.lookup(key, now)
+        return entry[0] if entry is not None else None
+
+    def lookup(
+        self, key: str, now: Optional[float] = None
+    ) -> Optional[Tuple[Dict[str, Any], float, Optional[Dict[str, str]]]]:
+        """
+        Igual que get, pero devuelve (resultado, expires_at, validadores)
+        para que la caché en memoria no lo guarde más allá de su vencimiento.
+        """
+        conn = self._connect()
+        now = time.time() if now is None else now
+
+        row = conn.execute(
+            "SELECT expires_at, result, validators FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] <= now:
+            self._misses += 1
+            return None
+
+        result = self._load_result(conn, key, row[1], now)
+        self._hits += 1
+        return result, row[0], _load_validators(row[2])
+
+    def lookup_stale(
+        self,
+        key: str,
+        now: Optional[float] = None,
+        max_staleness: Optional[float] = None,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+        """
+        (resultado, validadores) de una entrada conservada, o None. Igual
+        que ResultCache.get_stale: sin max_staleness sólo las que se pueden
+        revalidar; con max_staleness, las vencidas hace menos de eso.
+        """
+        conn = self._connect()
+        now = time.time() if now is None else now
+
+        row = conn.execute(
+            "SELECT expires_at, result, validators FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        expires_at, body, raw_validators = row
+        if expires_at + self._retention(raw_validators is not None) <= now:
+            return None
+        if max_staleness is None:
+            if raw_validators is None:
+                return None
+        elif expires_at + max_staleness <= now:
+            return None
+        return self._load_result(conn, key, body, now), _load_validators(raw_validators) or {}
+
+    def refresh(
+        self,
+        key: str,
+        now: Optional[float] = None,
+        validators: Optional[Dict[str, str]] = None,
+    ) -> bool:
+        """
+        Renueva el TTL de `key` (tras un 304) y, si se pasan, sus
+        validadores. Devuelve False si la entrada ya no está.
+        """
+        conn = self._connect()
+        now = time.time() if now is None else now
+        encoded = json.dumps(validators) if validators else None
+        with conn:
+            updated = conn.execute(
+                "UPDATE entries SET stored_at = ?, expires_at = ?, last_access = ?, "
+                "validators = COALESCE(?, validators) WHERE key = ?",
+                (now, now + self._ttl, now, encoded, key),
+            ).rowcount
+        if updated:
+            self._revalidated += 1
+        return bool(updated)
+
+    def put(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        now: Optional[float] = None,
+        validators: Optional[Dict[str, str]] = None,
+    ) -> bool:
+        """
+        Guarda `result` (y sus validadores HTTP); si hace falta, desaloja
+        las entradas usadas hace más tiempo hasta volver a entrar en
+        max_bytes.
+        """
+        if self._ttl <= 0 or self._max_bytes <= 0:
+            return False
+        conn = self._connect()
+        now = time.time() if now is None else now
+
+        blobs = _heavy_blobs(result) if self._store_heavy_fields else []
+        body = json.dumps(strip_heavy_fields(result), ensure_ascii=False)
+        size = len(body.encode("utf-8")) + sum(len(blob[3]) for blob in blobs)
+        if size > self._max_bytes:
+            return False
+
+        # BEGIN IMMEDIATE: toma el lock de escritura al principio, así dos
+        # procesos no se pisan entre el cálculo del tamaño y el desalojo.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO entries (key, stored_at, expires_at, last_access, size, result, validators) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, now, now + self._ttl, now, size, body, json.dumps(validators) if validators else None),
+            )
+            conn.executemany(
+                "INSERT INTO blobs (key, field, idx, encoding, data) VALUES (?, ?, ?, ?, ?)",
+                [(key, *blob) for blob in blobs],
+            )
+            self._evictions += self._evict_over_budget(conn, keep=key)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """
+        Borra las entradas vencidas (pasados stale_window y, si tienen
+        validadores, stale_retention), devuelve al sistema las páginas libres y
+        vacía el WAL. Devuelve cuántas entradas se borraron.
+        """
+        conn = self._connect()
+        now = time.time() if now is None else now
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM entries WHERE expires_at "
+                "+ CASE WHEN validators IS NULL THEN ? ELSE ? END <= ?",
+                (self._retention(False), self._retention(True), now),
+            ).rowcount
+        self._expired += removed
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self._hits + self._misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self._max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else None,
+            "evictions": self._evictions,
+            "expired": self._expired,
+            "revalidated": self._revalidated,
+        }
+
+    # ------------------------------------------------------------------
+    #  Internos
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None,  # transacciones explícitas
+                check_same_thread=False,
+            )
+            # auto_vacuum sólo tiene efecto antes de crear las tablas
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "validators" not in columns:  # archivos creados por versiones anteriores
+                conn.execute("ALTER TABLE entries ADD COLUMN validators TEXT")
+            self._conn = conn
+        return self._conn
+
+    def _close_conn(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _retention(self, has_validators: bool) -> float:
+        """Cuánto se conserva una entrada después de vencer."""
+        if has_validators:
+            return max(self._stale_retention, self._stale_window)
+        return self._stale_window
+
+    def _load_result(self, conn: sqlite3.Connection, key: str, body: str, now: float) -> Dict[str, Any]:
+        blobs = conn.execute(
+            "SELECT field, idx, encoding, data FROM blobs WHERE key = ? ORDER BY field, idx",
+            (key,),
+        ).fetchall()
+        with conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        return _attach_blobs(json.loads(body), blobs)
+
+    def _evict_over_budget(self, conn: sqlite3.Connection, keep: str) -> int:
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        evicted = 0
+        if total <= self._max_bytes:
+            return 0
+        rows = conn.execute(
+            "SELECT key, size FROM entries WHERE key != ? ORDER BY last_access", (keep,)
+        ).fetchall()
+        for old_key, size in rows:
+            if total <= self._max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _compact_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._compact_interval)
+            try:
+                removed = await self.compact_async()
+                if removed:
+                    logging.getLogger(__name__).debug("Caché en disco: %d entradas vencidas borradas", removed)
+            except sqlite3.Error as exc:
+                logging.getLogger(__name__).warning("Error compactando la caché en disco: %s", exc)
+
+
+def _load_validators(raw: Optional[str]) -> Optional[Dict[str, str]]:
+    if not raw:
+        return None
+    try:
+        validators = json.loads(raw)
+    except ValueError:
+        return None
+    return validators if isinstance(validators, dict) else None
+
+
+def _heavy_blobs(result: Dict[str, Any]) -> List[Tuple[str, int, str, bytes]]:
+    """
+    (campo, índice, encoding, datos) de screenshot y thumbnails. Los base64
+    válidos se guardan decodificados; cualquier otra cosa, como texto.
+    """
+    processing = result.get("processing_data")
+    if not isinstance(processing, dict):
+        return []
+
+    blobs: List[Tuple[str, int, str, bytes]] = []
+    for field_name in HEAVY_FIELDS:
+        value = processing.get(field_name)
+        values = value if isinstance(value, list) else [value]
+        for idx, item in enumerate(values):
+            if not item or not isinstance(item, str):
+                continue
+            try:
+                blobs.append((field_name, idx, "b64", base64.b64decode(item, validate=True)))
+            except (binascii.Error, ValueError):
+                blobs.append((field_name, idx, "text", item.encode("utf-8")))
+    return blobs
+
+
+def _attach_blobs(result: Dict[str, Any], blobs: List[Tuple[str, int, str, bytes]]) -> Dict[str, Any]:
+    if not blobs:
+        return result
+
+    processing = result.setdefault("processing_data", {})
+    for field_name, idx, encoding, data in blobs:
+        if encoding == "b64":
+            value = base64.b64encode(data).decode("ascii")
+        else:
+            value = bytes(data).decode("utf-8")
+        if field_name == "thumbnails":
+            thumbs = processing.get("thumbnails") or []
+            thumbs.extend([None] * (idx + 1 - len(thumbs)))
+            thumbs[idx] = value
+            processing["thumbnails"] = thumbs
+        else:
+            processing[field_name] = value
+
+    omitted = [name for name in result.get("omitted_fields", []) if name not in {b[0] for b in blobs}]
+    if omitted:
+        result["omitted_fields"] = omitted
+    else:
+        result.pop("omitted_fields", None)
+    return result
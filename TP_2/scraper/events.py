@@ -0,0 +1,138 @@
+"""
+events.py
+Canal de eventos de las tareas para GET /events (Server-Sent Events).
+
+En lugar de consultar /status y /result una y otra vez, un cliente se
+suscribe a una o varias tareas, a un lote o a todas, y recibe cada cambio
+de estado (pending -> scraping -> processing -> completed) apenas ocurre.
+
+Cada suscriptor tiene una cola acotada: si un cliente lento la llena, se
+lo desconecta (overflow) en lugar de acumular eventos sin límite; el
+cliente puede volver a suscribirse y recibe de nuevo el estado actual.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+from typing import Any, Dict, Iterable, Optional, Set
+
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """
+    Suscripción a las tareas `task_ids`, al lote `batch_id` o, si no se
+    pasa ninguno, a todas las tareas.
+    """
+
+    def __init__(
+        self,
+        task_ids: Iterable[str] = (),
+        batch_id: Optional[str] = None,
+        queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE,
+    ) -> None:
+        self.task_ids: Set[str] = set(task_ids)
+        self.batch_id = batch_id
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max(1, queue_size))
+        # True si se la desconectó por no leer a tiempo
+        self.overflowed = False
+
+    @property
+    def wants_all(self) -> bool:
+        return not self.task_ids and self.batch_id is None
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class TaskEvents:
+    """
+    Reparte eventos de tareas entre los suscriptores interesados. Los
+    suscriptores se indexan por task_id y batch_id, así publicar cuesta
+    O(interesados) y no O(suscriptores).
+
+    No es thread-safe: se usa desde el event loop del Servidor A.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE) -> None:
+        self._queue_size = queue_size
+        self._by_task: Dict[str, Set[Subscription]] = {}
+        self._by_batch: Dict[str, Set[Subscription]] = {}
+        self._all: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+
+        self._published = 0
+        self._delivered = 0
+        self._overflows = 0
+
+    def subscribe(self, task_ids: Iterable[str] = (), batch_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(task_ids, batch_id, queue_size=self._queue_size)
+        if subscription.wants_all:
+            self._all.add(subscription)
+        for task_id in subscription.task_ids:
+            self._by_task.setdefault(task_id, set()).add(subscription)
+        if batch_id is not None:
+            self._by_batch.setdefault(batch_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._all.discard(subscription)
+        for task_id in subscription.task_ids:
+            _discard(self._by_task, task_id, subscription)
+        if subscription.batch_id is not None:
+            _discard(self._by_batch, subscription.batch_id, subscription)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """
+        Entrega `event` (con "task_id" y, si corresponde, "batch_id") a los
+        suscriptores interesados. Le agrega un "id" creciente.
+        """
+        self._published += 1
+        targets = set(self._all)
+        targets.update(self._by_task.get(event.get("task_id"), ()))
+        batch_id = event.get("batch_id")
+        if batch_id is not None:
+            targets.update(self._by_batch.get(batch_id, ()))
+        if not targets:
+            return
+
+        event = {"id": next(self._ids), **event}
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(event)
+                self._delivered += 1
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self._overflows += 1
+                self.unsubscribe(subscription)
+                # Despierta al lector para que cierre la conexión
+                _drain_one(subscription.queue)
+                subscription.queue.put_nowait({"event": "overflow"})
+
+    def stats(self) -> Dict[str, Any]:
+        subscribers = set(self._all)
+        for group in (self._by_task, self._by_batch):
+            for subscriptions in group.values():
+                subscribers.update(subscriptions)
+        return {
+            "subscribers": len(subscribers),
+            "published": self._published,
+            "delivered": self._delivered,
+            "overflows": self._overflows,
+        }
+
+
+def _discard(index: Dict[str, Set[Subscription]], key: str, subscription: Subscription) -> None:
+    subscriptions = index.get(key)
+    if subscriptions is not None:
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del index[key]
+
+
+def _drain_one(queue: "asyncio.Queue[Any]") -> None:
+    try:
+        queue.get_nowait()
+    except asyncio.QueueEmpty:
+        pass
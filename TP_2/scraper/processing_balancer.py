@@ -0,0 +1,323 @@
+"""
+processing_balancer.py
+Balanceo de carga entre varios Servidores B (procesamiento).
+
+Cada backend tiene su propio ProcessingConnectionPool. Para cada
+process_page se eligen dos backends sanos al azar y se usa el que tiene
+menos requests en vuelo ("power of two choices"): casi tan parejo como
+mirar todos, sin que todos los Servidores A elijan siempre el mismo.
+
+Detección de fallas (outlier detection pasiva + chequeo activo):
+    - Un error de conexión o un timeout cuenta como falla del backend; un
+      éxito reinicia la cuenta. Tras `eject_after` fallas seguidas, el
+      backend se expulsa por `eject_seconds` (el doble cada vez que vuelve
+      a fallar, hasta `MAX_EJECT_SECONDS`).
+    - Cumplido ese tiempo, un "ping" decide si vuelve: si responde, se lo
+      readmite; si no, sigue expulsado.
+    - Los errores de conexión se reintentan en otro backend (la página
+      todavía no se procesó); los timeouts no, para no duplicar trabajo.
+    - Si están todos expulsados se usa igual el que vuelve antes (mejor
+      intentar que fallar seguro).
+
+Un backend que responde "busy" (control de admisión del Servidor B) no
+está fallando: no suma fallas, pero se evita hasta su `retry_after` y la
+página se prueba en otro backend. Si todos están ocupados se devuelve la
+respuesta "busy" y el Servidor A degrada.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from common.protocol import BUSY_STATUS
+from scraper.processing_client import (
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+    DEFAULT_IDLE_TIMEOUT_SECONDS,
+    DEFAULT_POOL_SIZE,
+    HEALTH_CHECK_TIMEOUT_SECONDS,
+    PartialHandler,
+    ProcessingBusyError,
+    ProcessingConnectionPool,
+    busy_retry_after,
+)
+
+DEFAULT_EJECT_AFTER = 3
+DEFAULT_EJECT_SECONDS = 10.0
+MAX_EJECT_SECONDS = 300.0
+# Cuánto se evita un backend "busy" que no dijo retry_after
+DEFAULT_BUSY_SECONDS = 1.0
+_EWMA_ALPHA = 0.2
+
+
+class ProcessingBackend:
+    """Un Servidor B: su pool de conexiones y su estado de salud."""
+
+    def __init__(self, pool: ProcessingConnectionPool) -> None:
+        self.pool = pool
+        self.address = f"{pool.host}:{pool.port}"
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        # Expulsado hasta este instante (monotonic); 0 = sano
+        self.ejected_until = 0.0
+        self.eject_seconds = 0.0
+        # Respondió "busy": se lo evita hasta este instante (monotonic)
+        self.busy_until = 0.0
+
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.busy = 0
+        self.avg_seconds: Optional[float] = None
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > 0
+
+    def is_busy(self, now: float) -> bool:
+        return self.busy_until > now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "healthy": not self.ejected,
+            "outstanding": self.outstanding,
+            "open_connections": self.pool.open_connections,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "busy": self.busy,
+            "avg_seconds": round(self.avg_seconds, 3) if self.avg_seconds is not None else None,
+        }
+
+
+class ProcessingBalancer:
+    """
+    Reparte las requests al Servidor B entre `backends` ((host, puerto)).
+    Tiene la misma interfaz que ProcessingConnectionPool (start, close,
+    request, open_connections).
+
+    No es thread-safe: se usa desde el event loop del Servidor A.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[Tuple[str, int]],
+        pool_size: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+        eject_after: int = DEFAULT_EJECT_AFTER,
+        eject_seconds: float = DEFAULT_EJECT_SECONDS,
+    ) -> None:
+        if not backends:
+            raise ValueError("Hace falta al menos un servidor de procesamiento")
+        self._backends: List[ProcessingBackend] = [
+            ProcessingBackend(
+                ProcessingConnectionPool(
+                    host,
+                    port,
+                    size=pool_size,
+                    idle_timeout=idle_timeout,
+                    health_check_interval=health_check_interval,
+                    connect_timeout=connect_timeout,
+                )
+            )
+            for host, port in backends
+        ]
+        self._eject_after = max(1, int(eject_after))
+        self._eject_seconds = max(0.1, eject_seconds)
+        self._probe_task: Optional[asyncio.Task] = None
+        self._rng = random.Random()
+
+        self._retries = 0
+        self._panics = 0
+
+    @property
+    def backends(self) -> List[ProcessingBackend]:
+        return list(self._backends)
+
+    @property
+    def open_connections(self) -> int:
+        return sum(backend.pool.open_connections for backend in self._backends)
+
+    async def start(self) -> None:
+        for backend in self._backends:
+            await backend.pool.start()
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        for backend in self._backends:
+            await backend.pool.close()
+
+    async def request(
+        self,
+        payload: Dict[str, Any],
+        timeout: float,
+        on_partial: Optional[PartialHandler] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envía `payload` al backend elegido. Si no se puede conectar (o la
+        conexión se cae) o responde "busy", prueba con otro backend que no
+        se haya probado. Si todos responden "busy", devuelve esa respuesta.
+        """
+        tried: List[ProcessingBackend] = []
+        while True:
+            backend = self._choose(exclude=tried)
+            tried.append(backend)
+            last = len(tried) >= len(self._backends)
+            try:
+                response = await self._send(backend, payload, timeout, on_partial)
+            except ProcessingBusyError as exc:
+                self._mark_busy(backend, exc.retry_after)
+                if last:
+                    raise
+                self._retries += 1
+                continue
+            except (ConnectionError, OSError, asyncio.TimeoutError) as exc:
+                if isinstance(exc, asyncio.TimeoutError) or last:
+                    raise
+                self._retries += 1
+                logging.debug(
+                    "Servidor de procesamiento %s no disponible (%s); reintentando en otro",
+                    backend.address, exc,
+                )
+                continue
+
+            if response.get("status") != BUSY_STATUS:
+                return response
+            self._mark_busy(backend, busy_retry_after(response))
+            if last:
+                return response
+            self._retries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "push",
+            "backends": [backend.stats() for backend in self._backends],
+            "healthy": sum(1 for backend in self._backends if not backend.ejected),
+            "busy": sum(1 for backend in self._backends if backend.is_busy(time.monotonic())),
+            "retries": self._retries,
+            "panics": self._panics,
+        }
+
+    # ------------------------------------------------------------------
+    #  Internos
+    # ------------------------------------------------------------------
+
+    def _choose(self, exclude: Sequence[ProcessingBackend] = ()) -> ProcessingBackend:
+        candidates = [b for b in self._backends if b not in exclude]
+        healthy = [b for b in candidates if not b.ejected]
+        if not healthy:
+            # Todos expulsados: el que vuelve antes
+            self._panics += 1
+            return min(candidates, key=lambda b: b.ejected_until)
+        now = time.monotonic()
+        # Los que dijeron "busy" sólo si no queda otro (puede que ya se
+        # hayan liberado antes de su retry_after)
+        healthy = [b for b in healthy if not b.is_busy(now)] or [min(healthy, key=lambda b: b.busy_until)]
+        if len(healthy) == 1:
+            return healthy[0]
+        first, second = self._rng.sample(healthy, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+    async def _send(
+        self,
+        backend: ProcessingBackend,
+        payload: Dict[str, Any],
+        timeout: float,
+        on_partial: Optional[PartialHandler],
+    ) -> Dict[str, Any]:
+        backend.outstanding += 1
+        backend.requests += 1
+        started = time.monotonic()
+        try:
+            # El pool ya reintenta una vez si una conexión tibia estaba muerta
+            response = await backend.pool.request(payload, timeout=timeout, on_partial=on_partial)
+        except ProcessingBusyError:
+            raise  # está vivo, sólo lleno
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            self._record_failure(backend)
+            raise
+        finally:
+            backend.outstanding -= 1
+
+        if response.get("status") == BUSY_STATUS:
+            # Rechazo inmediato: no cuenta para el promedio ni como falla
+            backend.consecutive_failures = 0
+            return response
+        elapsed = time.monotonic() - started
+        if backend.avg_seconds is None:
+            backend.avg_seconds = elapsed
+        else:
+            backend.avg_seconds += _EWMA_ALPHA * (elapsed - backend.avg_seconds)
+        self._record_success(backend)
+        return response
+
+    def _record_success(self, backend: ProcessingBackend) -> None:
+        backend.consecutive_failures = 0
+        if backend.ejected:
+            self._readmit(backend)
+
+    def _record_failure(self, backend: ProcessingBackend) -> None:
+        now = time.monotonic()
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        # Ya expulsado: las requests que estaban en vuelo no suman tiempo
+        # afuera; eso lo decide el ping (_probe)
+        if not backend.ejected and backend.consecutive_failures >= self._eject_after:
+            backend.eject_seconds = self._eject_seconds
+            backend.ejected_until = now + backend.eject_seconds
+            backend.ejections += 1
+            logging.warning(
+                "Servidor de procesamiento %s expulsado por %.0f s tras %d fallas seguidas",
+                backend.address, backend.eject_seconds, backend.consecutive_failures,
+            )
+
+    def _mark_busy(self, backend: ProcessingBackend, retry_after: Optional[float]) -> None:
+        backend.busy += 1
+        seconds = DEFAULT_BUSY_SECONDS if retry_after is None else retry_after
+        backend.busy_until = time.monotonic() + seconds
+        logging.debug("Servidor de procesamiento %s ocupado por %.1f s", backend.address, seconds)
+
+    def _readmit(self, backend: ProcessingBackend) -> None:
+        backend.ejected_until = 0.0
+        backend.eject_seconds = 0.0
+        backend.consecutive_failures = 0
+        logging.info("Servidor de procesamiento %s readmitido", backend.address)
+
+    async def _probe_loop(self) -> None:
+        interval = max(0.1, min(1.0, self._eject_seconds / 2))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            due = [b for b in self._backends if b.ejected and b.ejected_until <= now]
+            if due:
+                await asyncio.gather(*(self._probe(backend) for backend in due))
+
+    async def _probe(self, backend: ProcessingBackend) -> None:
+        try:
+            response = await backend.pool.request(
+                {"action": "ping"}, timeout=HEALTH_CHECK_TIMEOUT_SECONDS
+            )
+            if response.get("status") != "ok":
+                raise ConnectionError(f"Health check fallido: {response!r}")
+        except (ConnectionError, OSError, asyncio.TimeoutError) as exc:
+            logging.debug("Servidor de procesamiento %s sigue sin responder: %s", backend.address, exc)
+            backend.failures += 1
+            backend.eject_seconds = min(MAX_EJECT_SECONDS, backend.eject_seconds * 2)
+            backend.ejected_until = time.monotonic() + backend.eject_seconds
+            return
+        self._readmit(backend)
@@ -0,0 +1,307 @@
+"""
+processing_broker.py
+Broker del Servidor A para el modo pull con los Servidores B.
+
+En modo push (ProcessingBalancer) el Servidor A elige un Servidor B y le
+manda la página aunque su pool de procesos esté saturado: el trabajo se
+acumula en la cola del ProcessPoolExecutor de B, que no tiene límite, y A
+no se entera. En modo pull se invierte la conexión:
+
+    - El Servidor A escucha en --processing-broker HOST:PUERTO.
+    - Cada Servidor B (server_processing.py --pull HOST:PUERTO) se conecta y
+      manda {"action": "register", "slots": N}: cuántas páginas puede
+      procesar a la vez.
+    - Cada process_page espera en la cola del broker (FIFO) hasta que algún
+      worker tenga un slot libre; va al que tiene más libres. La respuesta
+      final libera el slot y entra la siguiente página de la cola.
+
+Así nunca hay más trabajo en un B que el que puede hacer, los B rápidos
+piden más seguido que los lentos (aunque las páginas cuesten muy distinto)
+y el backpressure queda en un solo lugar, medible desde /stats.
+
+Sobre la conexión se usa el mismo protocolo que en modo push
+(ProcessingConnection: request_id, mensajes parciales, frame v2).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import time
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from common.protocol import read_message_async
+from scraper.processing_client import (
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    PartialHandler,
+    ProcessingConnection,
+)
+
+# Cuántas veces se reintenta una página si se cae el worker que la tenía
+MAX_REQUEUES = 1
+
+
+class BrokerWorker:
+    """Un Servidor B conectado al broker."""
+
+    def __init__(self, conn: ProcessingConnection, address: str, slots: int) -> None:
+        self.conn = conn
+        self.address = address
+        self.slots = slots
+        self.busy = 0
+        self.completed = 0
+        # Requests vencidas que el worker sigue procesando (ocupan slot)
+        self.abandoned = 0
+        self.connected_at = time.monotonic()
+
+    @property
+    def free(self) -> int:
+        return self.slots - self.busy
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "slots": self.slots,
+            "busy": self.busy,
+            "completed": self.completed,
+            "abandoned": self.abandoned,
+            "connected_seconds": round(time.monotonic() - self.connected_at, 1),
+        }
+
+
+class ProcessingBroker:
+    """
+    Cola de process_page repartida entre los Servidores B que se conectan.
+    Tiene la misma interfaz que ProcessingConnectionPool (start, close,
+    request, open_connections).
+
+    No es thread-safe: se usa desde el event loop del Servidor A.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        register_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self._register_timeout = register_timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._workers: List[BrokerWorker] = []
+        self._handlers: Set[asyncio.Task] = set()
+        # Requests esperando un slot, en orden de llegada
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+        self._dispatched = 0
+        self._requeued = 0
+        self._abandoned = 0
+        self._registered = 0
+        self._queue_seconds = 0.0
+
+    @property
+    def open_connections(self) -> int:
+        return len(self._workers)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def start(self) -> None:
+        if self._server is None:
+            self._server = await asyncio.start_server(self._on_connect, self.host, self.port)
+            logging.info("Broker de procesamiento escuchando en %s:%s", self.host, self.port)
+
+    async def close(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        for worker in list(self._workers):
+            await worker.conn.close()
+        if self._handlers:
+            # Los de workers registrados terminan solos al cerrarse la
+            # conexión; sólo quedan los que todavía no se registraron
+            _, pending = await asyncio.wait(set(self._handlers), timeout=1.0)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if server is not None:
+            await server.wait_closed()
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionError("Broker de procesamiento cerrado"))
+        self._waiters.clear()
+
+    async def request(
+        self,
+        payload: Dict[str, Any],
+        timeout: float,
+        on_partial: Optional[PartialHandler] = None,
+    ) -> Dict[str, Any]:
+        """
+        Espera un slot libre en algún worker y le manda `payload`. El
+        `timeout` cubre la espera en la cola y el procesamiento. Si el
+        worker se desconecta antes de responder, la página vuelve a la cola
+        (una vez).
+
+        Si vence el timeout (o se cancela) con la página ya en el worker,
+        el slot sigue ocupado hasta que llegue la respuesta tardía o se
+        corte la conexión: el worker todavía la está procesando.
+        """
+        deadline = time.monotonic() + timeout
+        requeues = 0
+        while True:
+            worker = await self._acquire(deadline - time.monotonic())
+            abandoned = False
+
+            def _partial(message: Dict[str, Any]) -> None:
+                if not abandoned and on_partial is not None:
+                    on_partial(message)
+
+            reply = asyncio.ensure_future(
+                worker.conn.request(payload, timeout=None, on_partial=_partial)
+            )
+            try:
+                response = await asyncio.wait_for(
+                    asyncio.shield(reply), timeout=max(0.0, deadline - time.monotonic())
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                abandoned = True
+                self._abandon(worker, reply)
+                raise
+            except ConnectionError:
+                self._release(worker)
+                if requeues >= MAX_REQUEUES or worker.conn.is_alive:
+                    raise
+                requeues += 1
+                self._requeued += 1
+                logging.warning("Worker %s desconectado; la página vuelve a la cola", worker.address)
+                continue
+            except BaseException:
+                self._release(worker)
+                raise
+            self._release(worker)
+            worker.completed += 1
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "pull",
+            "listen": f"{self.host}:{self.port}",
+            "workers": [worker.stats() for worker in self._workers],
+            "slots": sum(worker.slots for worker in self._workers),
+            "busy": sum(worker.busy for worker in self._workers),
+            "queued": self.queued,
+            "dispatched": self._dispatched,
+            "requeued": self._requeued,
+            "abandoned": self._abandoned,
+            "registered": self._registered,
+            "avg_queue_seconds": round(self._queue_seconds / self._dispatched, 3) if self._dispatched else None,
+        }
+
+    # ------------------------------------------------------------------
+    #  Slots
+    # ------------------------------------------------------------------
+
+    async def _acquire(self, timeout: float) -> BrokerWorker:
+        started = time.monotonic()
+        waiter: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._dispatch()
+        try:
+            worker = await asyncio.wait_for(waiter, timeout=max(0.0, timeout))
+        except BaseException:
+            # Timeout o cancelación justo cuando se le asignaba un slot
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release(waiter.result())
+            raise
+        self._queue_seconds += time.monotonic() - started
+        return worker
+
+    def _abandon(self, worker: BrokerWorker, reply: asyncio.Future) -> None:
+        """Libera el slot recién cuando el worker termina la página vencida."""
+        if reply.done():
+            if not reply.cancelled():
+                reply.exception()  # ya no la espera nadie
+            self._release(worker)
+            return
+        self._abandoned += 1
+        worker.abandoned += 1
+
+        def _done(future: asyncio.Future) -> None:
+            if not future.cancelled():
+                future.exception()
+            worker.abandoned -= 1
+            self._release(worker)
+
+        reply.add_done_callback(_done)
+
+    def _release(self, worker: BrokerWorker) -> None:
+        worker.busy -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Asigna slots libres a las requests que esperan, en orden."""
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()  # venció o se canceló esperando
+                continue
+            live = [w for w in self._workers if w.conn.is_alive and w.free > 0]
+            if not live:
+                return
+            worker = max(live, key=lambda w: w.free)
+            worker.busy += 1
+            self._dispatched += 1
+            self._waiters.popleft()
+            waiter.set_result(worker)
+
+    # ------------------------------------------------------------------
+    #  Conexiones de los workers
+    # ------------------------------------------------------------------
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        if task is not None:
+            self._handlers.add(task)
+        peer = writer.get_extra_info("peername")
+        address = f"{peer[0]}:{peer[1]}" if peer else "?"
+        conn = ProcessingConnection(self.host, self.port)
+        worker: Optional[BrokerWorker] = None
+        try:
+            register = await asyncio.wait_for(read_message_async(reader), self._register_timeout)
+            slots = int(register.get("slots") or 0) if register.get("action") == "register" else 0
+            if slots <= 0:
+                logging.warning("Conexión al broker sin registro válido desde %s: %r", address, register)
+                writer.close()
+                return
+
+            conn.attach(reader, writer)
+            # Mismo formato que en modo push (frame v2 si B lo soporta)
+            try:
+                await conn.negotiate(timeout=self._register_timeout)
+            except (asyncio.TimeoutError, ConnectionError) as exc:
+                logging.info("El worker %s no negoció el protocolo v2: %s", address, exc)
+            if not conn.is_alive:
+                return
+
+            worker = BrokerWorker(conn, address, slots)
+            self._workers.append(worker)
+            self._registered += 1
+            logging.info("Worker de procesamiento %s registrado con %d slots", address, slots)
+            self._dispatch()
+            await conn.wait_closed()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, OSError, ValueError) as exc:
+            logging.warning("Error registrando worker %s: %s", address, exc)
+        except asyncio.CancelledError:
+            pass  # close() del broker
+        finally:
+            if worker is not None:
+                self._workers.remove(worker)
+                logging.info("Worker de procesamiento %s desconectado", address)
+            await conn.close()
+            if not writer.is_closing():
+                writer.close()
+            if task is not None:
+                self._handlers.discard(task)
@@ -0,0 +1,371 @@
+"""
+processing_client.py
+Cliente del Servidor B (procesamiento) con pool de conexiones persistentes.
+
+En lugar de abrir una conexión TCP nueva por cada página, el Servidor A
+mantiene N conexiones "tibias" con el Servidor B y multiplexa varias
+requests sobre cada una. Cada mensaje lleva un `request_id` (ver
+common/protocol.py) y el Servidor B lo devuelve en la respuesta, así que
+las respuestas pueden llegar en cualquier orden.
+
+Además:
+    - Las conexiones ociosas más de `idle_timeout` segundos se cierran.
+    - Cada `health_check_interval` segundos se manda un "ping" por las
+      conexiones ociosas; si no responde, se descarta la conexión.
+    - Al abrir cada conexión se negocia el frame binario v2 con "hello"
+      (ver common/protocol.py). Si el Servidor B no lo conoce, se sigue con
+      JSON puro y no se vuelve a ofrecer en las conexiones siguientes.
+    - Una request puede recibir mensajes intermedios (status "partial", por
+      ejemplo una etapa del procesamiento ya terminada) antes de la
+      respuesta final; se entregan a `on_partial` sin completar la request.
+    - Un Servidor B saturado responde status "busy" (con `retry_after`) en
+      lugar de encolar la página; si lo hace al conectarse (demasiadas
+      conexiones), la conexión se descarta con ProcessingBusyError.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from common.protocol import (
+    BUSY_STATUS,
+    LEGACY_WIRE,
+    PROTOCOL_BINARY,
+    REQUEST_ID_KEY,
+    WireFormat,
+    hello_message,
+    read_message_async,
+    send_message_async,
+    wire_from_hello_reply,
+)
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_IDLE_TIMEOUT_SECONDS = 60.0
+DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS = 30.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5.0
+HEALTH_CHECK_TIMEOUT_SECONDS = 5.0
+# Status de los mensajes intermedios de una request (no la completan)
+PARTIAL_STATUS = "partial"
+
+PartialHandler = Callable[[Dict[str, Any]], None]
+
+
+class ProcessingBusyError(ConnectionError):
+    """El Servidor B rechazó la conexión por estar saturado."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def busy_retry_after(response: Dict[str, Any]) -> Optional[float]:
+    """`retry_after` de una respuesta "busy" (None si falta o es inválido)."""
+    try:
+        value = float(response.get("retry_after"))
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+class ProcessingConnection:
+    """
+    Una conexión persistente con el Servidor B.
+
+    Un único lector (`_read_loop`) recibe todas las respuestas y las
+    entrega a la request que espera ese `request_id`. Las escrituras se
+    serializan con un lock para no mezclar frames.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self._host = host
+        self._port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._partial_handlers: Dict[str, PartialHandler] = {}
+        self._closed = False
+        self.wire: WireFormat = LEGACY_WIRE
+        self.last_used = time.monotonic()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    @property
+    def is_alive(self) -> bool:
+        return not self._closed and self._writer is not None
+
+    async def connect(self, timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port),
+            timeout=timeout,
+        )
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    def attach(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Usa una conexión ya abierta (por ejemplo, la que abrió un Servidor B
+        en modo pull hacia el broker) en lugar de conectarse.
+        """
+        self._reader, self._writer = reader, writer
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def wait_closed(self) -> None:
+        """Espera a que la conexión se cierre (del lado que sea)."""
+        if self._reader_task is not None:
+            await asyncio.wait({self._reader_task})
+
+    async def negotiate(self, timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS) -> WireFormat:
+        """
+        Ofrece el protocolo v2 con "hello" y deja en `self.wire` el formato
+        acordado (JSON puro si el peer no lo soporta).
+        """
+        reply = await self.request(hello_message(), timeout=timeout)
+        if reply.get("status") == BUSY_STATUS:
+            await self.close()
+            raise ProcessingBusyError(
+                reply.get("error") or "Servidor de procesamiento ocupado",
+                busy_retry_after(reply),
+            )
+        self.wire = wire_from_hello_reply(reply)
+        return self.wire
+
+    async def request(
+        self,
+        payload: Dict[str, Any],
+        timeout: Optional[float],
+        on_partial: Optional[PartialHandler] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envía `payload` con un request_id nuevo y espera su respuesta (sin
+        límite si `timeout` es None). Los mensajes intermedios se pasan a
+        `on_partial` (si no se pasa, se descartan).
+        """
+        if not self.is_alive or self._writer is None:
+            raise ConnectionError("Conexión con el servidor de procesamiento cerrada")
+
+        request_id = uuid.uuid4().hex
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        if on_partial is not None:
+            self._partial_handlers[request_id] = on_partial
+        self.last_used = time.monotonic()
+
+        message = dict(payload)
+        message[REQUEST_ID_KEY] = request_id
+
+        try:
+            async with self._write_lock:
+                await send_message_async(self._writer, message, self.wire)
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(request_id, None)
+            self._partial_handlers.pop(request_id, None)
+            self.last_used = time.monotonic()
+
+    async def _read_loop(self) -> None:
+        assert self._reader is not None
+        error: BaseException = ConnectionError("Conexión cerrada por el servidor de procesamiento")
+        try:
+            while True:
+                response = await read_message_async(self._reader)
+                request_id = response.get(REQUEST_ID_KEY)
+                if request_id and response.get("status") == PARTIAL_STATUS:
+                    handler = self._partial_handlers.get(request_id)
+                    if handler is not None:
+                        try:
+                            handler(response)
+                        except Exception:  # noqa: BLE001
+                            logging.exception("Error manejando mensaje parcial")
+                    continue
+                future = self._pending.get(request_id) if request_id else None
+
+                # Servidor B viejo (sin request_id): responde una sola request
+                # por conexión, así que si hay una única pendiente es esa.
+                if future is None and request_id is None and len(self._pending) == 1:
+                    future = next(iter(self._pending.values()))
+
+                if future is None:
+                    logging.debug("Respuesta descartada (request_id=%r)", request_id)
+                    continue
+                if not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError) as exc:
+            error = ConnectionError(f"Conexión con el servidor de procesamiento perdida: {exc}")
+        finally:
+            self._closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):  # noqa: BLE001
+                pass
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+class ProcessingConnectionPool:
+    """
+    Pool de hasta `size` conexiones persistentes con un Servidor B.
+
+    Cada request va a la conexión viva con menos requests en vuelo; si todas
+    están ocupadas y todavía hay lugar en el pool, se abre una nueva.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        size: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self._size = max(1, int(size))
+        self._idle_timeout = max(0.0, idle_timeout)
+        self._health_check_interval = max(0.0, health_check_interval)
+        self._connect_timeout = connect_timeout
+        self._connections: List[ProcessingConnection] = []
+        self._connect_lock = asyncio.Lock()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        # Se apaga si el Servidor B no entiende "hello" (peer viejo)
+        self._negotiate = True
+
+    async def start(self) -> None:
+        """
+        Arranca la tarea de mantenimiento (idle timeout + health checks).
+        Las conexiones se abren a demanda.
+        """
+        intervals = [i for i in (self._idle_timeout, self._health_check_interval) if i > 0]
+        if intervals and self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance(min(intervals)))
+
+    async def close(self) -> None:
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+        connections, self._connections = self._connections, []
+        for conn in connections:
+            await conn.close()
+
+    async def request(
+        self,
+        payload: Dict[str, Any],
+        timeout: float,
+        retries: int = 1,
+        on_partial: Optional[PartialHandler] = None,
+    ) -> Dict[str, Any]:
+        """
+        Envía `payload` por alguna conexión del pool y devuelve la respuesta.
+
+        Si la conexión se cae (por ejemplo, el Servidor B se reinició y el
+        socket quedó "tibio" pero muerto), se reintenta sobre otra conexión.
+        Los timeouts no se reintentan.
+        """
+        attempt = 0
+        while True:
+            conn = await self._acquire()
+            try:
+                return await conn.request(payload, timeout=timeout, on_partial=on_partial)
+            except ConnectionError:
+                await self._discard(conn)
+                if attempt >= retries:
+                    raise
+                attempt += 1
+
+    @property
+    def open_connections(self) -> int:
+        return sum(1 for conn in self._connections if conn.is_alive)
+
+    async def _acquire(self) -> ProcessingConnection:
+        self._connections = [conn for conn in self._connections if conn.is_alive]
+        idle = [conn for conn in self._connections if conn.in_flight == 0]
+        if idle:
+            return idle[0]
+
+        async with self._connect_lock:
+            self._connections = [conn for conn in self._connections if conn.is_alive]
+            if len(self._connections) < self._size:
+                conn = ProcessingConnection(self.host, self.port)
+                await conn.connect(timeout=self._connect_timeout)
+                if self._negotiate:
+                    try:
+                        await self._negotiate_wire(conn)
+                    except BaseException:
+                        await conn.close()
+                        raise
+                self._connections.append(conn)
+                return conn
+
+        if not self._connections:
+            raise ConnectionError("No hay conexiones disponibles con el servidor de procesamiento")
+        return min(self._connections, key=lambda conn: conn.in_flight)
+
+    async def _negotiate_wire(self, conn: ProcessingConnection) -> None:
+        try:
+            wire = await conn.negotiate(timeout=self._connect_timeout)
+        except ProcessingBusyError:
+            raise  # B entiende el protocolo; sólo está lleno
+        except (asyncio.TimeoutError, ConnectionError) as exc:
+            # Un peer viejo de una request por conexión cierra después del
+            # hello: la request siguiente reintenta con una conexión nueva.
+            logging.info("El servidor de procesamiento no negoció el protocolo v2: %s", exc)
+            self._negotiate = False
+            return
+        if wire.version != PROTOCOL_BINARY:
+            self._negotiate = False
+
+    async def _discard(self, conn: ProcessingConnection) -> None:
+        if conn in self._connections:
+            self._connections.remove(conn)
+        await conn.close()
+
+    async def _maintenance(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for conn in list(self._connections):
+                if not conn.is_alive:
+                    await self._discard(conn)
+                    continue
+                if conn.in_flight > 0:
+                    continue
+                idle_for = now - conn.last_used
+                if self._idle_timeout > 0 and idle_for >= self._idle_timeout:
+                    logging.debug("Cerrando conexión ociosa con %s:%s", self.host, self.port)
+                    await self._discard(conn)
+                elif self._health_check_interval > 0 and idle_for >= self._health_check_interval:
+                    await self._health_check(conn)
+
+    async def _health_check(self, conn: ProcessingConnection) -> None:
+        try:
+            response = await conn.request({"action": "ping"}, timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+            if response.get("status") != "ok":
+                raise ConnectionError(f"Health check fallido: {response!r}")
+        except (asyncio.TimeoutError, ConnectionError, OSError) as exc:
+            logging.warning("Health check fallido con %s:%s: %s", self.host, self.port, exc)
+            await self._discard(conn)
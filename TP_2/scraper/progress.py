@@ -0,0 +1,99 @@
+"""
+progress.py
+Resultados progresivos del Servidor A.
+
+scraping_data está listo mucho antes que el procesamiento del Servidor B
+(screenshot, thumbnails, etc.). Un ProgressiveResult acompaña a cada
+scraping en curso y va registrando cada sección apenas se completa:
+
+    ("scraping",   {"url", "timestamp", "scraping_data"})
+    ("processing", {"stage": "screenshot", "processing_data": {...}})
+    ("processing", {"stage": "thumbnails", "error": "timeout"})
+
+Los eventos sólo se agregan (nunca se modifican), así cada lector recorre
+la lista desde el índice que ya vio y espera con wait() los siguientes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+# Secciones de processing_data que produce el Servidor B
+PROCESSING_SECTIONS = ("screenshot", "performance", "thumbnails", "advanced")
+
+
+class ProgressiveResult:
+    """
+    Secciones de un resultado a medida que se completan.
+
+    No es thread-safe: se usa desde el event loop del Servidor A.
+    """
+
+    def __init__(self) -> None:
+        self.events: List[Tuple[str, Dict[str, Any]]] = []
+        self.finished = False
+        self._changed = asyncio.Event()
+
+    def set_scraping(self, url: str, timestamp: str, scraping_data: Dict[str, Any]) -> None:
+        self._append("scraping", {"url": url, "timestamp": timestamp, "scraping_data": scraping_data})
+
+    def add_stage(
+        self,
+        stage: str,
+        processing_data: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        data: Dict[str, Any] = {"stage": stage}
+        if processing_data is not None:
+            data["processing_data"] = processing_data
+        else:
+            data["error"] = error or "error"
+        self._append("processing", data)
+
+    def finish(self) -> None:
+        self.finished = True
+        self._notify()
+
+    async def wait(self, seen: int) -> None:
+        """Espera a que haya más de `seen` eventos o a que termine."""
+        while len(self.events) <= seen and not self.finished:
+            await self._changed.wait()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Resultado parcial con la forma del final: url, timestamp,
+        scraping_data (si ya está) y las secciones de processing_data ya
+        terminadas. "pending_sections" lista las que faltan.
+        """
+        partial: Dict[str, Any] = {}
+        processing: Dict[str, Any] = {}
+        stage_errors: Dict[str, str] = {}
+        for kind, data in self.events:
+            if kind == "scraping":
+                partial.update(data)
+            elif "processing_data" in data:
+                processing.update(data["processing_data"])
+            else:
+                stage_errors[data["stage"]] = data["error"]
+
+        partial["processing_data"] = processing
+        if stage_errors:
+            partial["stage_errors"] = stage_errors
+        partial["pending_sections"] = [
+            name
+            for name in (("scraping_data",) + PROCESSING_SECTIONS)
+            if name not in partial and name not in processing and name not in stage_errors
+        ]
+        return partial
+
+    def _append(self, kind: str, data: Dict[str, Any]) -> None:
+        if self.finished:
+            return
+        self.events.append((kind, data))
+        self._notify()
+
+    def _notify(self) -> None:
+        # Despierta a los que esperan y arma un Event nuevo para la próxima
+        self._changed.set()
+        self._changed = asyncio.Event()
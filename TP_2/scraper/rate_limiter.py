@@ -0,0 +1,194 @@
+"""
+rate_limiter.py
+Rate limiting por dominio para el Servidor A (Bonus Opción 2).
+
+Usa GCRA (Generic Cell Rate Algorithm), equivalente a un token bucket pero
+con un solo número por dominio: el "TAT" (theoretical arrival time), el
+instante en que el bucket vuelve a estar lleno. Cada request lo avanza un
+intervalo de emisión (60 / rate segundos); se permite mientras el TAT no se
+adelante a `now` más que la tolerancia de ráfaga. Cada actualización es O(1).
+
+Dos modos:
+    - "reject": si no hay lugar se lanza RateLimitExceeded con retry_after.
+    - "queue":  la request reserva el próximo turno libre del dominio y
+      espera hasta entonces (orden de llegada, así que la cola de cada
+      dominio es FIFO). Si el turno queda a más de max_wait segundos, se
+      rechaza igual que en "reject".
+
+Los dominios inactivos (bucket lleno otra vez) se olvidan solos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+RATE_LIMIT_MODES = ("reject", "queue")
+DEFAULT_RATE_LIMIT_MODE = "reject"
+DEFAULT_MAX_WAIT_SECONDS = 30.0
+
+
+class RateLimitExceeded(Exception):
+    """No hay lugar para otra request al dominio (ni esperando max_wait)."""
+
+    def __init__(self, domain: str, retry_after: float) -> None:
+        super().__init__(
+            f"Rate limit excedido para dominio {domain!r}: reintentar en {retry_after:.1f} s"
+        )
+        self.domain = domain
+        self.retry_after = retry_after
+
+
+class DomainRateLimiter:
+    """
+    Limitador GCRA por dominio: `rate_per_minute` requests por minuto con
+    ráfagas de hasta `burst` (default: rate_per_minute, como la ventana de
+    un minuto que había antes).
+
+    No es thread-safe: se usa desde el event loop del Servidor A.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: Optional[int] = None,
+        mode: str = DEFAULT_RATE_LIMIT_MODE,
+        max_wait: float = DEFAULT_MAX_WAIT_SECONDS,
+    ) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute debe ser > 0")
+        if mode not in RATE_LIMIT_MODES:
+            raise ValueError(f"Modo de rate limit desconocido: {mode!r}")
+
+        self._interval = 60.0 / rate_per_minute
+        self._burst = max(1, int(burst if burst is not None else rate_per_minute))
+        # Cuánto puede adelantarse el TAT respecto de `now` (ráfaga)
+        self._tolerance = self._interval * self._burst
+        self._mode = mode
+        self._max_wait = max(0.0, max_wait)
+
+        # dominio -> TAT, en orden de última actualización (para olvidar
+        # los inactivos empezando por los más viejos)
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+
+        self._allowed = 0
+        self._delayed = 0
+        self._rejected = 0
+        self._waiting = 0
+        self._total_wait = 0.0
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    def try_acquire(self, domain: str, now: Optional[float] = None) -> float:
+        """
+        Intenta tomar un lugar ya. Devuelve 0 si se tomó, o los segundos a
+        esperar para que haya uno (sin reservarlo).
+        """
+        now = time.monotonic() if now is None else now
+        wait = self._reserve(domain, now, max_wait=0.0)
+        if wait is None:
+            self._rejected += 1
+            return self._wait_for(domain, now)
+        self._allowed += 1
+        return 0.0
+
+    async def acquire(self, domain: str) -> float:
+        """
+        Toma un lugar para `domain` según el modo. Devuelve los segundos que
+        se esperó (0 si hubo lugar enseguida).
+
+        Lanza RateLimitExceeded si no hay lugar (modo "reject") o si habría
+        que esperar más de max_wait (modo "queue").
+        """
+        now = time.monotonic()
+        max_wait = self._max_wait if self._mode == "queue" else 0.0
+        wait = self._reserve(domain, now, max_wait=max_wait)
+        if wait is None:
+            self._rejected += 1
+            raise RateLimitExceeded(domain, self._wait_for(domain, now))
+
+        self._allowed += 1
+        if wait <= 0:
+            return 0.0
+
+        self._delayed += 1
+        self._waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self._release(domain, now + wait)
+            raise
+        finally:
+            self._waiting -= 1
+        self._total_wait += wait
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self._mode,
+            "rate_per_minute": round(60.0 / self._interval, 3),
+            "burst": self._burst,
+            "max_wait_seconds": self._max_wait,
+            "domains": len(self._tat),
+            "allowed": self._allowed,
+            "delayed": self._delayed,
+            "rejected": self._rejected,
+            "waiting": self._waiting,
+            "avg_wait_seconds": round(self._total_wait / self._delayed, 3) if self._delayed else None,
+        }
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def __contains__(self, domain: str) -> bool:
+        return domain in self._tat
+
+    # ------------------------------------------------------------------
+    #  Internos
+    # ------------------------------------------------------------------
+
+    def _reserve(self, domain: str, now: float, max_wait: float) -> Optional[float]:
+        """
+        Reserva el próximo lugar de `domain` si se puede usar dentro de
+        `max_wait` segundos. Devuelve cuánto hay que esperar, o None.
+        """
+        self._forget_idle(now)
+
+        tat = max(self._tat.get(domain, now), now)
+        # El lugar se puede usar cuando el TAT quede dentro de la tolerancia
+        wait = max(0.0, tat + self._interval - self._tolerance - now)
+        if wait > max_wait:
+            return None
+
+        self._tat[domain] = tat + self._interval
+        self._tat.move_to_end(domain)
+        return wait
+
+    def _release(self, domain: str, slot_at: float) -> None:
+        """
+        Devuelve un lugar reservado que no se usó (la request se canceló
+        esperando), si sigue siendo el último reservado del dominio.
+        """
+        tat = self._tat.get(domain)
+        if tat is not None and abs(tat - (slot_at + self._tolerance)) < 1e-9:
+            self._tat[domain] = tat - self._interval
+
+    def _wait_for(self, domain: str, now: float) -> float:
+        tat = max(self._tat.get(domain, now), now)
+        return max(0.0, tat + self._interval - self._tolerance - now)
+
+    def _forget_idle(self, now: float) -> None:
+        """
+        Olvida los dominios con el bucket lleno (TAT en el pasado). Como
+        están ordenados por última actualización, alcanza con mirar el
+        principio: el costo es O(1) amortizado.
+        """
+        while self._tat:
+            domain, tat = next(iter(self._tat.items()))
+            if tat > now:
+                break
+            del self._tat[domain]
@@ -0,0 +1,102 @@
+"""
+single_flight.py
+Deduplicación de trabajos en curso ("single-flight") para el Servidor A.
+
+Si llegan varios pedidos por la misma URL mientras el primero todavía se
+está scrapeando, la caché da miss para todos y cada uno lanzaría su propia
+descarga y su propio trabajo en el Servidor B. Con SingleFlight el primer
+pedido (el "líder") arranca el trabajo y los siguientes se suman a él y
+esperan el mismo resultado (o la misma excepción).
+
+El trabajo corre en su propia asyncio.Task: si un cliente cancela su pedido
+(por ejemplo, cierra la conexión) los demás siguen esperando sin problema.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight:
+    task: "asyncio.Task[Any]"
+    # Objetos que los pedidos asocian al trabajo (por ejemplo, sus TaskInfo).
+    # La lista es la misma que recibe la factory, así ve a los que se suman tarde.
+    participants: List[Any] = field(default_factory=list)
+    waiters: int = 1
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una sola ejecución.
+
+    No es thread-safe: se usa desde el event loop del Servidor A.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[List[Any]], Awaitable[T]],
+        participant: Optional[Any] = None,
+    ) -> T:
+        """
+        Ejecuta `factory(participants)` para `key`, o se suma a la ejecución
+        que ya esté en curso con esa clave. `participant` (opcional) se
+        agrega a la lista de participantes que recibe la factory.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            participants: List[Any] = []
+            task = asyncio.ensure_future(factory(participants))
+            flight = _Flight(task=task, participants=participants)
+            self._flights[key] = flight
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+            self._leaders += 1
+        else:
+            flight.waiters += 1
+            self._coalesced += 1
+
+        if participant is not None:
+            flight.participants.append(participant)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            # También si este pedido se cancela: deja de esperar aunque el
+            # trabajo siga para los demás
+            flight.waiters -= 1
+
+    def participants(self, key: str) -> List[Any]:
+        """Participantes del trabajo en curso para `key` (vacío si no hay)."""
+        flight = self._flights.get(key)
+        return list(flight.participants) if flight is not None else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "waiting": sum(flight.waiters for flight in self._flights.values()),
+            "leaders": self._leaders,
+            "coalesced": self._coalesced,
+        }
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._flights.get(key) is not None and self._flights[key].task is task:
+            del self._flights[key]
+        # Si todos los que esperaban se cancelaron, nadie lee la excepción:
+        # la marcamos como leída para que asyncio no la reporte.
+        if not task.cancelled():
+            task.exception()
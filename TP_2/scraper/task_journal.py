@@ -0,0 +1,294 @@
+"""
+task_journal.py
+Journal persistente de la cola de tareas del Servidor A (/tasks).
+
+Sin journal, las tareas viven sólo en memoria: un reinicio pierde las
+pendientes y los resultados que los clientes todavía no pidieron. El
+journal es un archivo JSONL de sólo-agregado:
+
+    {"op": "task",   "id": ..., "url": ..., "status": "pending", ...}   alta (o estado completo)
+    {"op": "status", "id": ..., "status": "completed", "result": {...}}  fin de la tarea
+    {"op": "batch",  "id": ..., "task_ids": [...], ...}                  lote
+
+    - append() sólo guarda el registro en un buffer (microsegundos); un
+      flusher en segundo plano lo escribe y hace fsync cada flush_interval
+      segundos, agrupando todos los registros de ese intervalo en un único
+      fsync. Un crash pierde, como mucho, ese último intervalo.
+    - La serialización y el disco van en un thread propio: el event loop
+      no se bloquea.
+    - Al arrancar, replay() reconstruye el estado de cada tarea y lote; una
+      última línea cortada por un crash se ignora.
+    - Cuando el archivo crece a más del doble de su tamaño tras la última
+      compactación, se reescribe con una foto del estado actual (snapshot)
+      en un archivo temporal que reemplaza al original con os.replace.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.05
+DEFAULT_COMPACT_MIN_BYTES = 16 * 1024 * 1024  # 16 MB
+
+Record = Dict[str, Any]
+
+
+def replay(path: str) -> Tuple[Dict[str, Record], Dict[str, Record], int]:
+    """
+    Lee el journal y devuelve (tareas, lotes, líneas_inválidas). Tareas y
+    lotes quedan en orden de alta, con el último estado registrado.
+    """
+    tasks: Dict[str, Record] = {}
+    batches: Dict[str, Record] = {}
+    corrupt = 0
+    if not os.path.exists(path):
+        return tasks, batches, corrupt
+
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+                op = record.pop("op")
+                record_id = record["id"]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                corrupt += 1  # típicamente, la última línea de un crash
+                continue
+
+            if op == "task":
+                tasks[record_id] = record
+            elif op == "status":
+                if record_id in tasks:
+                    tasks[record_id].update(record)
+            elif op == "batch":
+                batches[record_id] = record
+            else:
+                corrupt += 1
+    return tasks, batches, corrupt
+
+
+class TaskJournal:
+    """
+    Journal JSONL con escrituras agrupadas (group commit) y compactación.
+
+    `snapshot` devuelve los registros que describen el estado actual
+    completo (se usa para compactar). No es thread-safe: append() se llama
+    desde el event loop del Servidor A.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        compact_min_bytes: int = DEFAULT_COMPACT_MIN_BYTES,
+        snapshot: Optional[Callable[[], List[Record]]] = None,
+    ) -> None:
+        self.path = path
+        self._flush_interval = max(0.001, flush_interval)
+        self._compact_min_bytes = max(0, int(compact_min_bytes))
+        self._snapshot = snapshot
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="task-journal"
+        )
+        self._file: Optional[Any] = None
+        self._buffer: List[Record] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+        self._bytes = 0
+        self._compacted_bytes = 0
+        self._appended = 0
+        self._written = 0
+        self._flushes = 0
+        self._fsync_seconds = 0.0
+        self._compactions = 0
+        self._replayed = 0
+        self._corrupt = 0
+
+    async def load(self) -> Tuple[Dict[str, Record], Dict[str, Record]]:
+        """Replay del archivo (en el thread del journal)."""
+        tasks, batches, corrupt = await self._run(replay, self.path)
+        self._replayed = len(tasks)
+        self._corrupt = corrupt
+        if corrupt:
+            logging.getLogger(__name__).warning(
+                "Journal %s: %d líneas inválidas ignoradas", self.path, corrupt
+            )
+        return tasks, batches
+
+    async def start(self, compact: bool = True) -> None:
+        """
+        Abre el archivo para agregar y arranca el flusher. Con `compact`, lo
+        reescribe primero con el estado actual (descarta lo ya olvidado).
+        """
+        if compact and self._snapshot is not None and os.path.exists(self.path):
+            await self.compact()
+        else:
+            await self._run(self._open)
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        await self._run(self._close_file)
+        self._executor.shutdown(wait=True)
+
+    def append(self, record: Record) -> None:
+        """
+        Agrega un registro; queda en disco en el próximo flush. El dict no
+        se copia: no debe modificarse después.
+        """
+        self._buffer.append(record)
+        self._appended += 1
+
+    async def flush(self) -> None:
+        """
+        Escribe y hace fsync de todo lo agregado hasta ahora. Si falla
+        (disco lleno, error de E/S), los registros vuelven al comienzo del
+        buffer para el próximo intento y se relanza el OSError.
+        """
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        started = time.perf_counter()
+        try:
+            written = await self._run(self._write, records)
+        except BaseException:
+            self._buffer = records + self._buffer
+            raise
+        self._fsync_seconds += time.perf_counter() - started
+        self._bytes += written
+        self._written += len(records)
+        self._flushes += 1
+
+    async def compact(self) -> None:
+        """
+        Reescribe el journal con snapshot(): los registros pendientes del
+        buffer ya están reflejados en la foto, así que se descartan.
+        """
+        if self._snapshot is None:
+            return
+        records = self._snapshot()
+        pending, self._buffer = self._buffer, []
+        try:
+            self._bytes = self._compacted_bytes = await self._run(self._rewrite, records)
+        except BaseException:
+            # El archivo viejo sigue ahí: lo pendiente se escribe en el próximo flush
+            self._buffer = pending + self._buffer
+            raise
+        self._compactions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "bytes": self._bytes,
+            "appended": self._appended,
+            "written": self._written,
+            "buffered": len(self._buffer),
+            "flushes": self._flushes,
+            "avg_flush_ms": round(1000 * self._fsync_seconds / self._flushes, 3) if self._flushes else None,
+            "compactions": self._compactions,
+            "replayed_tasks": self._replayed,
+            "corrupt_lines": self._corrupt,
+        }
+
+    # ------------------------------------------------------------------
+    #  Internos (corren en el thread del journal)
+    # ------------------------------------------------------------------
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+                if self._bytes > max(self._compact_min_bytes, 2 * self._compacted_bytes):
+                    await self.compact()
+            except OSError as exc:
+                logging.getLogger(__name__).error("Error escribiendo el journal %s: %s", self.path, exc)
+
+    def _open(self) -> None:
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._bytes = self._file.tell()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, records: Iterable[Record]) -> int:
+        self._open()
+        data = b"".join(_encode(record) for record in records)
+        size = self._file.tell()
+        try:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            self._discard_partial_write(size)
+            raise
+        return len(data)
+
+    def _discard_partial_write(self, size: int) -> None:
+        """
+        Tras un error a mitad de escritura: cierra el archivo (descarta lo
+        que quedó en el buffer de Python) y lo recorta a `size`, para que el
+        reintento no quede pegado a una línea cortada. Se reabre en el
+        próximo _write.
+        """
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        try:
+            os.truncate(self.path, size)
+        except OSError:
+            pass
+
+    def _rewrite(self, records: Iterable[Record]) -> int:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            for record in records:
+                fh.write(_encode(record))
+            fh.flush()
+            os.fsync(fh.fileno())
+            size = fh.tell()
+        self._close_file()
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path)
+        self._open()
+        return size
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+
+def _encode(record: Record) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _fsync_dir(path: str) -> None:
+    """fsync del directorio, para que el os.replace sobreviva a un corte."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
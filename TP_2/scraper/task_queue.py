@@ -0,0 +1,182 @@
+"""
+task_queue.py
+Cola de tareas con prioridades y un pool fijo de workers (Bonus Opción 1).
+
+Antes cada POST /tasks lanzaba su propia corrutina con asyncio.create_task:
+una ráfaga de pedidos creaba miles de corrutinas esperando en el semáforo.
+Ahora:
+    - Las tareas esperan en una cola de prioridad acotada (max_pending);
+      si está llena, submit() lanza TaskQueueFull con un retry_after
+      estimado a partir de la duración promedio de las tareas.
+    - Un número fijo de workers saca tareas de la cola (mayor prioridad
+      primero; a igual prioridad, orden de llegada) y ejecuta el handler.
+    - cancel() saca una tarea de la cola o cancela la que está corriendo.
+
+La cola sólo maneja IDs: el estado de cada tarea lo guarda quien la usa.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+DEFAULT_QUEUE_SIZE = 10000
+# Duración supuesta de una tarea hasta tener mediciones (para retry_after)
+_INITIAL_TASK_SECONDS = 1.0
+_EWMA_ALPHA = 0.2
+
+
+class TaskQueueFull(Exception):
+    """La cola llegó a max_pending tareas esperando."""
+
+    def __init__(self, pending: int, retry_after: float) -> None:
+        super().__init__(f"Cola de tareas llena ({pending} pendientes)")
+        self.pending = pending
+        self.retry_after = retry_after
+
+
+class TaskQueue:
+    """
+    Cola de prioridad acotada con `workers` corrutinas fijas que ejecutan
+    `handler(task_id)`.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str], Awaitable[None]],
+        workers: int,
+        max_pending: int = DEFAULT_QUEUE_SIZE,
+    ) -> None:
+        self._handler = handler
+        self._worker_count = max(1, int(workers))
+        self._max_pending = max(1, int(max_pending))
+
+        # (-prioridad, orden de llegada, task_id). Las canceladas se dejan en
+        # el heap y se saltean al sacarlas; _queued tiene las vigentes.
+        self._queue: "asyncio.PriorityQueue[tuple]" = asyncio.PriorityQueue()
+        self._queued: Set[str] = set()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+
+        self._avg_task_seconds = _INITIAL_TASK_SECONDS
+        self._submitted = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._finished = 0
+
+    async def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"task-worker-{n}")
+                for n in range(self._worker_count)
+            ]
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._queued)
+
+    @property
+    def free_slots(self) -> int:
+        return max(0, self._max_pending - len(self._queued))
+
+    def submit(self, task_id: str, priority: int = 0) -> None:
+        """
+        Encola `task_id`. Mayor `priority` sale antes. Lanza TaskQueueFull
+        si ya hay max_pending tareas esperando.
+        """
+        if len(self._queued) >= self._max_pending:
+            self._rejected += 1
+            raise TaskQueueFull(len(self._queued), self.retry_after())
+
+        if self._queue.qsize() >= 2 * self._max_pending:
+            self._drop_cancelled()
+        self._queue.put_nowait((-priority, next(self._seq), task_id))
+        self._queued.add(task_id)
+        self._submitted += 1
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        Saca `task_id` de la cola o cancela su ejecución. Devuelve False si
+        no estaba ni esperando ni corriendo.
+        """
+        if task_id in self._queued:
+            self._queued.discard(task_id)
+            self._cancelled += 1
+            return True
+        running = self._running.get(task_id)
+        if running is not None and not running.done():
+            running.cancel()
+            self._cancelled += 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """
+        Segundos estimados hasta que se libere lugar en la cola: un worker
+        termina, en promedio, cada avg_task_seconds / workers.
+        """
+        return max(1.0, self._avg_task_seconds / self._worker_count)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self._worker_count,
+            "max_pending": self._max_pending,
+            "pending": len(self._queued),
+            "running": len(self._running),
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "cancelled": self._cancelled,
+            "finished": self._finished,
+            "avg_task_seconds": round(self._avg_task_seconds, 3),
+        }
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._queued or task_id in self._running
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, task_id = await self._queue.get()
+            if task_id not in self._queued:
+                continue  # cancelada mientras esperaba
+            self._queued.discard(task_id)
+
+            started = time.monotonic()
+            run = asyncio.create_task(self._handler(task_id))
+            self._running[task_id] = run
+            try:
+                # asyncio.wait no propaga la cancelación de `run` (cancel()),
+                # sólo la del propio worker (close()).
+                await asyncio.wait({run})
+            except asyncio.CancelledError:
+                run.cancel()
+                raise
+            finally:
+                self._running.pop(task_id, None)
+
+            if not run.cancelled() and run.exception() is not None:
+                logging.getLogger(__name__).error(
+                    "Error no manejado en la tarea %s", task_id, exc_info=run.exception()
+                )
+            self._finished += 1
+            elapsed = time.monotonic() - started
+            self._avg_task_seconds += _EWMA_ALPHA * (elapsed - self._avg_task_seconds)
+
+    def _drop_cancelled(self) -> None:
+        """Rearma el heap sin las entradas de tareas canceladas."""
+        live = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item[2] in self._queued:
+                live.append(item)
+        for item in live:
+            self._queue.put_nowait(item)
@@ -6,129 +6,744 @@ Servidor de Procesamiento Distribuido (Parte B + Bonus Opción 3).
 
 - socketserver + multiprocessing (ProcessPoolExecutor)
 - Opera como servidor TCP que recibe requests desde el Servidor A
-- Tareas en pool de procesos:
-    * Captura de screenshot
-    * Análisis de rendimiento
-    * Procesamiento de imágenes (thumbnails)
-    * Análisis avanzado (tecnologías, SEO, JSON-LD, accesibilidad)
+- Cada etapa corre como un job independiente y en paralelo:
+    * Captura de screenshot                  (pool de procesos)
+    * Análisis de rendimiento                (pool de threads, es de red)
+    * Procesamiento de imágenes (thumbnails) (descarga asyncio + resize en procesos)
+    * Análisis avanzado (tecnologías, SEO, JSON-LD, accesibilidad) (pool de procesos)
+- Timeout por etapa: si una falla, se devuelve el resto (resultado parcial)
+- Si el request trae "partial": true, cada etapa se envía apenas termina
+  (mensajes con status "partial") y la respuesta final sólo trae el estado
+- Modo pull (--pull HOST:PUERTO): en lugar de escuchar, se conecta al
+  broker del Servidor A, anuncia cuántas páginas puede procesar a la vez
+  ("slots") y recibe trabajo sólo cuando tiene lugar
+- Control de admisión: como mucho --max-inflight páginas procesándose y
+  --max-queued esperando; las demás reciben enseguida {"status": "busy"}
+  con un retry_after, en lugar de esperar hasta el timeout del Servidor A
+- Frontend asyncio (--frontend asyncio): las conexiones se atienden en un
+  único event loop en lugar de un thread por conexión (socketserver)
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import concurrent.futures
 import logging
 import multiprocessing
 import socket
 import socketserver
-from typing import Any, Dict
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
 
-from common.protocol import read_message, send_message
-from processor.screenshot import generate_screenshot
-from processor.performance import analyze_performance
-from processor.image_processor import generate_thumbnails
+from common.addresses import parse_address
+from common.protocol import (
+    BUSY_STATUS,
+    DEFAULT_MAX_FRAME_BYTES,
+    LEGACY_WIRE,
+    FrameTooLargeError,
+    REQUEST_ID_KEY,
+    WireFormat,
+    accept_hello,
+    encode_frame,
+    read_message,
+    read_message_async,
+    send_message,
+    send_message_async,
+)
+from processor.browser_pool import DEFAULT_MAX_PAGES_PER_BROWSER, DRIVER_CHOICES, DRIVER_CHROME
+from processor.screenshot import capture_screenshot_png, init_worker_browser
+from processor.performance import MODE_REUSE, PERFORMANCE_MODES, analyze_performance
+from processor.image_fetcher import (
+    DEFAULT_MAX_IMAGE_BYTES,
+    DEFAULT_PER_HOST_LIMIT,
+    ImageFetcher,
+)
+from processor.image_processor import (
+    DEFAULT_THUMB_FORMAT,
+    DEFAULT_THUMB_QUALITY,
+    THUMB_FORMATS,
+    ThumbnailOptions,
+    select_image_urls,
+    thumbnails_from_blobs,
+)
 from processor.advanced_analysis import analyze_advanced
 
+DEFAULT_IO_THREADS = 8
+# Límites por defecto del control de admisión (por proceso del pool)
+DEFAULT_INFLIGHT_PER_PROCESS = 2
+DEFAULT_QUEUED_PER_PROCESS = 4
+DEFAULT_MAX_CONNECTIONS = 128
+# Con el frontend asyncio una conexión no cuesta un thread
+DEFAULT_MAX_CONNECTIONS_ASYNC = 10000
+# Cola de conexiones pendientes de accept (la de socketserver es 5: un
+# pico de conexiones del Servidor A la desborda y el kernel las corta)
+LISTEN_BACKLOG = 1024
+FRONTEND_THREADS = "threads"
+FRONTEND_ASYNCIO = "asyncio"
+FRONTEND_CHOICES = (FRONTEND_THREADS, FRONTEND_ASYNCIO)
+# Espera entre reconexiones al broker del Servidor A (modo pull)
+PULL_RETRY_MIN_SECONDS = 1.0
+PULL_RETRY_MAX_SECONDS = 30.0
 
-def process_page_task(
-    url: str,
-    scraping_data: Dict[str, Any],
-    html: str = "",
-) -> Dict[str, Any]:
+
+# ----------------------------------------------------------------------
+#  Etapas del procesamiento de una página
+# ----------------------------------------------------------------------
+#
+# Cada etapa se manda como un job independiente: las que usan CPU van al
+# pool de procesos, las que esperan red van a un pool de threads y las que
+# combinan red asíncrona + CPU (thumbnails) corren como corrutina en un
+# event loop de fondo. Así la latencia de una página es la de la etapa más
+# lenta y no la suma de todas.
+
+PROCESS_EXECUTOR = "process"
+THREAD_EXECUTOR = "thread"
+ASYNC_EXECUTOR = "async"
+
+
+class BackgroundLoop:
     """
-    Función que se ejecuta en un PROCESO del pool.
+    Event loop de asyncio corriendo en un thread aparte, para las etapas
+    asíncronas (descarga de imágenes con aiohttp).
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="io-loop", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def submit(self, coro: Any) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
 
-    Hace:
-      - screenshot de la página
-      - análisis de rendimiento
-      - generación de thumbnails de imágenes
-      - análisis avanzado (Bonus Opción 3)
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+
+@dataclass
+class StageContext:
+    """
+    Dónde corren las etapas: pool de procesos, pool de threads y (para las
+    etapas asíncronas) el event loop de fondo con su descargador de imágenes.
     """
-    screenshot_b64 = generate_screenshot(url)
-    performance_data = analyze_performance(url)
-    thumbnails = generate_thumbnails(url, scraping_data)
-    advanced_data = analyze_advanced(url, scraping_data, html)
+    process_pool: concurrent.futures.Executor
+    thread_pool: concurrent.futures.Executor
+    io_loop: Optional[BackgroundLoop] = None
+    image_fetcher: Optional[ImageFetcher] = None
+    thumbnail_options: ThumbnailOptions = field(default_factory=ThumbnailOptions)
+
+
+@dataclass
+class StageResult:
+    """
+    Resultado de una etapa que además aporta claves extra a processing_data
+    (por ejemplo, estadísticas de los thumbnails).
+    """
+    value: Any
+    extras: Dict[str, Any] = field(default_factory=dict)
+
+
+# Cada etapa recibe el "job" de la página: un dict con url, scraping_data,
+# page_signals, html, fetch_metrics y performance_mode (ver _build_page_job).
 
+
+# screenshot y thumbnails devuelven bytes crudos: por una conexión v2
+# viajan como adjuntos y con un cliente viejo se mandan en base64.
+
+
+def _screenshot_stage(job: Dict[str, Any]) -> Any:
+    return capture_screenshot_png(job["url"])
+
+
+def _performance_stage(job: Dict[str, Any]) -> Any:
+    return analyze_performance(
+        job["url"],
+        fetch_metrics=job.get("fetch_metrics"),
+        mode=job.get("performance_mode", MODE_REUSE),
+    )
+
+
+async def _thumbnails_stage(job: Dict[str, Any], context: StageContext) -> Any:
+    # Descarga asíncrona en el event loop; al pool de procesos sólo van los
+    # bytes para decodificar y redimensionar.
+    image_urls = select_image_urls(job["scraping_data"])
+    if not image_urls or context.image_fetcher is None:
+        return []
+
+    blobs = await context.image_fetcher.fetch_many(image_urls)
+    if not blobs:
+        return []
+
+    future = context.process_pool.submit(
+        thumbnails_from_blobs, blobs, context.thumbnail_options, True
+    )
+    thumbs, stats = await asyncio.wrap_future(future)
+    return StageResult(thumbs, {"thumbnail_stats": stats})
+
+
+def _advanced_stage(job: Dict[str, Any]) -> Any:
+    # Con page_signals es sólo armar dicts; el HTML se parsea únicamente si
+    # el Servidor A es viejo y no manda señales.
+    return analyze_advanced(
+        job["url"],
+        job["scraping_data"],
+        job["html"],
+        signals=job.get("page_signals"),
+    )
+
+
+def _empty_processing_data() -> Dict[str, Any]:
     return {
-        "screenshot": screenshot_b64,
-        "performance": performance_data,
-        "thumbnails": thumbnails,
-        "advanced": advanced_data,
+        "screenshot": None,
+        "performance": None,
+        "thumbnails": [],
+        "advanced": None,
     }
 
 
-class ProcessingRequestHandler(socketserver.BaseRequestHandler):
+@dataclass(frozen=True)
+class PageStage:
     """
-    Handler para cada conexión entrante desde el Servidor A.
+    Una etapa del procesamiento: nombre (clave en processing_data),
+    función a ejecutar, en qué pool corre y timeout por defecto.
+
+    Las etapas "process"/"thread" reciben el job; las "async" son corrutinas
+    que reciben (job, context).
     """
+    name: str
+    func: Callable[..., Any]
+    executor: str
+    timeout: float
 
-    def handle(self) -> None:  # type: ignore[override]
-        logger = logging.getLogger(__name__)
 
+PAGE_STAGES: Tuple[PageStage, ...] = (
+    PageStage("screenshot", _screenshot_stage, PROCESS_EXECUTOR, 25.0),
+    PageStage("performance", _performance_stage, THREAD_EXECUTOR, 20.0),
+    PageStage("thumbnails", _thumbnails_stage, ASYNC_EXECUTOR, 20.0),
+    PageStage("advanced", _advanced_stage, THREAD_EXECUTOR, 15.0),
+)
+
+
+def _build_page_job(request_obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Arma el job de una página a partir del mensaje process_page, validando
+    los tipos de cada campo.
+    """
+    scraping_data = request_obj.get("scraping_data", {}) or {}
+    if not isinstance(scraping_data, dict):
+        scraping_data = {}
+
+    page_signals = request_obj.get("page_signals")
+    if not isinstance(page_signals, dict):
+        page_signals = None
+
+    html = request_obj.get("html", "") or ""
+    if not isinstance(html, str):
+        html = ""
+
+    fetch_metrics = request_obj.get("fetch_metrics")
+    if not isinstance(fetch_metrics, dict):
+        fetch_metrics = None
+
+    performance_mode = request_obj.get("performance_mode", MODE_REUSE)
+    if performance_mode not in PERFORMANCE_MODES:
+        performance_mode = MODE_REUSE
+
+    return {
+        "url": request_obj.get("url"),
+        "scraping_data": scraping_data,
+        "page_signals": page_signals,
+        "html": html,
+        "fetch_metrics": fetch_metrics,
+        "performance_mode": performance_mode,
+    }
+
+
+def _submit_stage(
+    stage: PageStage,
+    job: Dict[str, Any],
+    context: StageContext,
+) -> concurrent.futures.Future:
+    if stage.executor == PROCESS_EXECUTOR:
+        return context.process_pool.submit(stage.func, job)
+    if stage.executor == THREAD_EXECUTOR:
+        return context.thread_pool.submit(stage.func, job)
+
+    if context.io_loop is None:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_exception(RuntimeError("No hay event loop para etapas asíncronas"))
+        return future
+    return context.io_loop.submit(stage.func(job, context))
+
+
+def run_page_stages(
+    job: Dict[str, Any],
+    context: StageContext,
+    stages: Sequence[PageStage] = PAGE_STAGES,
+    timeouts: Optional[Mapping[str, float]] = None,
+    on_stage: Optional[Callable[[str, Optional[Dict[str, Any]], Optional[str]], None]] = None,
+    submitted: Optional[List[concurrent.futures.Future]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Lanza todas las etapas a la vez y junta sus resultados.
+
+    Cada etapa tiene su propio timeout (contado desde que se lanzó). Si una
+    etapa falla o se pasa de tiempo, su clave queda con el valor vacío y se
+    informa en el segundo elemento del resultado:
+
+        (processing_data, stage_errors)   # stage_errors: {etapa: mensaje}
+
+    Si se pasa `on_stage`, se llama apenas termina cada etapa (en orden de
+    finalización) con (nombre, claves aportadas a processing_data, None) o
+    (nombre, None, error).
+
+    Si se pasa `submitted`, se le agregan los futures lanzados a los pools:
+    una etapa que se pasó de tiempo pero ya había arrancado sigue corriendo
+    (cancel() no la frena) y quien llama puede esperar a que termine.
+    """
+    timeouts = timeouts or {}
+    started = time.monotonic()
+
+    futures: Dict[concurrent.futures.Future, PageStage] = {}
+    deadlines: Dict[str, float] = {}
+    for stage in stages:
+        future = _submit_stage(stage, job, context)
+        futures[future] = stage
+        if submitted is not None:
+            submitted.append(future)
+        deadlines[stage.name] = started + timeouts.get(stage.name, stage.timeout)
+
+    collector = _StageCollector(job, on_stage)
+    pending = set(futures)
+    while pending:
+        next_deadline = min(deadlines[futures[future].name] for future in pending)
+        done, pending = concurrent.futures.wait(
+            pending,
+            timeout=max(0.0, next_deadline - time.monotonic()),
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        for future in done:
+            collector.finish_from(futures[future], future)
+
+        now = time.monotonic()
+        for future in [future for future in pending if deadlines[futures[future].name] <= now]:
+            # Si todavía no arrancó, no la corremos; si ya arrancó, se descarta
+            future.cancel()
+            pending.discard(future)
+            collector.finish(futures[future], None, "timeout")
+
+    return collector.processing_data, collector.stage_errors
+
+
+async def run_page_stages_async(
+    job: Dict[str, Any],
+    context: StageContext,
+    stages: Sequence[PageStage] = PAGE_STAGES,
+    timeouts: Optional[Mapping[str, float]] = None,
+    on_stage: Optional[Callable[[str, Optional[Dict[str, Any]], Optional[str]], None]] = None,
+    submitted: Optional[List[concurrent.futures.Future]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Igual que run_page_stages, pero para esperar desde un event loop: las
+    etapas corren en los mismos pools y acá sólo se esperan sus futures
+    (asyncio.wrap_future), sin ocupar un thread por página. `on_stage` se
+    llama desde el loop.
+    """
+    timeouts = timeouts or {}
+    started = time.monotonic()
+
+    futures: Dict[asyncio.Future, PageStage] = {}
+    deadlines: Dict[str, float] = {}
+    for stage in stages:
+        pool_future = _submit_stage(stage, job, context)
+        if submitted is not None:
+            submitted.append(pool_future)
+        futures[asyncio.wrap_future(pool_future)] = stage
+        deadlines[stage.name] = started + timeouts.get(stage.name, stage.timeout)
+
+    collector = _StageCollector(job, on_stage)
+    pending = set(futures)
+    try:
+        while pending:
+            next_deadline = min(deadlines[futures[future].name] for future in pending)
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(0.0, next_deadline - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for future in done:
+                collector.finish_from(futures[future], future)
+
+            now = time.monotonic()
+            for future in [future for future in pending if deadlines[futures[future].name] <= now]:
+                future.cancel()  # cancela también el future del pool
+                pending.discard(future)
+                collector.finish(futures[future], None, "timeout")
+    except asyncio.CancelledError:
+        for future in pending:
+            future.cancel()
+        raise
+
+    return collector.processing_data, collector.stage_errors
+
+
+class _StageCollector:
+    """Junta los resultados de las etapas de una página a medida que terminan."""
+
+    def __init__(
+        self,
+        job: Dict[str, Any],
+        on_stage: Optional[Callable[[str, Optional[Dict[str, Any]], Optional[str]], None]],
+    ) -> None:
+        self.job = job
+        self.on_stage = on_stage
+        self.processing_data = _empty_processing_data()
+        self.stage_errors: Dict[str, str] = {}
+
+    def finish_from(self, stage: PageStage, future: Any) -> None:
+        """Registra el resultado de un future terminado (concurrent o asyncio)."""
         try:
-            request_obj = read_message(self.request)
+            result = future.result()
         except Exception as exc:  # noqa: BLE001
-            logger.exception("Error leyendo mensaje del servidor A: %s", exc)
+            logging.getLogger(__name__).warning(
+                "Etapa %s falló para %s: %s", stage.name, self.job.get("url"), exc
+            )
+            self.finish(stage, None, str(exc) or exc.__class__.__name__)
             return
+        if isinstance(result, StageResult):
+            self.finish(stage, {stage.name: result.value, **result.extras}, None)
+        else:
+            self.finish(stage, {stage.name: result}, None)
 
-        action = request_obj.get("action")
-        if action != "process_page":
-            response = {
-                "status": "error",
-                "error": f"Acción desconocida: {action!r}",
-                "processing_data": {
-                    "screenshot": None,
-                    "performance": None,
-                    "thumbnails": [],
-                    "advanced": None,
-                },
-            }
+    def finish(self, stage: PageStage, values: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        if values is not None:
+            self.processing_data.update(values)
+        else:
+            self.stage_errors[stage.name] = error or "error"
+        if self.on_stage is not None:
             try:
-                send_message(self.request, response)
+                self.on_stage(stage.name, values, error)
             except Exception:  # noqa: BLE001
-                logger.exception("Error enviando respuesta de error al servidor A")
-            return
+                logging.getLogger(__name__).exception("Error notificando la etapa %s", stage.name)
 
-        url = request_obj.get("url")
-        scraping_data = request_obj.get("scraping_data", {}) or {}
-        if not isinstance(scraping_data, dict):
-            scraping_data = {}
 
-        html = request_obj.get("html", "") or ""
-        if not isinstance(html, str):
-            html = ""
+def _page_response(
+    processing_data: Dict[str, Any],
+    stage_errors: Dict[str, str],
+    progressive: bool,
+    stage_count: int = len(PAGE_STAGES),
+) -> Dict[str, Any]:
+    """Respuesta final de un process_page a partir del resultado de las etapas."""
+    if len(stage_errors) < stage_count:
+        # Resultado completo o parcial
+        response: Dict[str, Any] = {
+            "status": "success",
+            "processing_data": processing_data,
+        }
+        if stage_errors:
+            response["stage_errors"] = stage_errors
+    else:
+        response = {
+            "status": "error",
+            "error": "; ".join(f"{name}: {msg}" for name, msg in stage_errors.items()),
+            "processing_data": processing_data,
+            "stage_errors": stage_errors,
+        }
+    if progressive:
+        response.pop("processing_data", None)
+    return response
 
-        server = self.server  # type: ignore[attr-defined]
-        process_pool: concurrent.futures.ProcessPoolExecutor = getattr(
-            server, "process_pool"
-        )
 
-        # Enviar el trabajo al POOL de procesos
-        future = process_pool.submit(process_page_task, url, scraping_data, html)
+def _failed_page_response(exc: Exception) -> Dict[str, Any]:
+    """Respuesta de un process_page cuando las etapas ni siquiera se pudieron correr."""
+    return {
+        "status": "error",
+        "error": str(exc),
+        "processing_data": _empty_processing_data(),
+    }
+
+
+def _stage_message(name: str, values: Optional[Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+    """Mensaje "partial" con el resultado de una etapa (modo progresivo)."""
+    message: Dict[str, Any] = {"status": "partial", "stage": name}
+    if values is not None:
+        message["processing_data"] = values
+    else:
+        message["error"] = error
+    return message
 
+
+# ----------------------------------------------------------------------
+#  Control de admisión
+# ----------------------------------------------------------------------
+
+
+def _when_all_done(futures: Sequence[concurrent.futures.Future], callback: Callable[[], None]) -> None:
+    """
+    Llama a `callback` una vez, cuando terminaron todos los futures (ya
+    mismo si no hay ninguno). Puede correr en el thread de un pool.
+    """
+    futures = list(futures)
+    if not futures:
+        callback()
+        return
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _one_done(_future: concurrent.futures.Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(_one_done)
+
+
+class AdmissionControl:
+    """
+    Limita las páginas en proceso (`max_inflight`) y las que esperan turno
+    (`max_queued`). Con todo lleno, try_enter() devuelve False y el handler
+    responde "busy" sin encolar nada: la cola interna del
+    ProcessPoolExecutor ya no crece sin límite ante un pico.
+
+    Thread-safe: la usan los threads de cada conexión y de cada página.
+    """
+
+    def __init__(self, max_inflight: int, max_queued: int) -> None:
+        self.max_inflight = max(1, int(max_inflight))
+        self.max_queued = max(0, int(max_queued))
+        self._slots = threading.Semaphore(self.max_inflight)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected = 0
+        # Duración promedio de una página (EWMA), para estimar retry_after
+        self._avg_seconds = 1.0
+
+    def try_enter(self) -> bool:
+        """Reserva un lugar (en proceso o en la cola) si queda alguno."""
+        with self._lock:
+            if self._inflight + self._queued >= self.max_inflight + self.max_queued:
+                self._rejected += 1
+                return False
+            self._queued += 1
+            self._admitted += 1
+            return True
+
+    def run(self, func: Callable[[], Any], jobs: Optional[List[concurrent.futures.Future]] = None) -> Any:
+        """
+        Espera turno y ejecuta `func`. Debe llamarse una vez por cada
+        try_enter() exitoso.
+
+        `jobs` es la lista donde func deja los futures que lanza a los pools
+        (ver run_page_stages): el turno se libera recién cuando terminaron
+        todos. Una etapa que se pasó de tiempo sigue ocupando su worker, y
+        si se admitiera otra página en su lugar la cola del pool volvería a
+        crecer sin límite.
+        """
+        self._slots.acquire()
+        started = self.begin()
         try:
-            processing_data = future.result()
-            response = {
-                "status": "success",
-                "processing_data": processing_data,
+            return func()
+        finally:
+            _when_all_done(jobs or (), lambda: self._release(started))
+
+    def _release(self, started: float) -> None:
+        self.end(started)
+        self._slots.release()
+
+    def cancel_queued(self) -> None:
+        """Una página que esperaba turno se cancela antes de empezar."""
+        with self._lock:
+            self._queued -= 1
+
+    def begin(self) -> float:
+        """
+        La página pasa de la cola a proceso (quien llama ya tiene su turno:
+        el frontend asyncio usa su propio asyncio.Semaphore de
+        `max_inflight`). Devuelve el instante de inicio para end().
+        """
+        with self._lock:
+            self._queued -= 1
+            self._inflight += 1
+        return time.monotonic()
+
+    def end(self, started: float) -> None:
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._inflight -= 1
+            self._avg_seconds += 0.2 * (elapsed - self._avg_seconds)
+
+    def retry_after(self) -> float:
+        """Segundos estimados hasta que se libere un lugar."""
+        with self._lock:
+            waiting = self._queued + 1
+            return round(max(0.5, self._avg_seconds * waiting / self.max_inflight), 1)
+
+    def busy_response(self) -> Dict[str, Any]:
+        return {
+            "status": BUSY_STATUS,
+            "error": "Servidor de procesamiento ocupado",
+            "retry_after": self.retry_after(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "inflight": self._inflight,
+                "queued": self._queued,
+                "max_inflight": self.max_inflight,
+                "max_queued": self.max_queued,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
             }
+
+
+class ProcessingRequestHandler(socketserver.BaseRequestHandler):
+    """
+    Handler para cada conexión entrante desde el Servidor A.
+
+    La conexión es persistente: se leen mensajes hasta que el Servidor A la
+    cierre. Cada `process_page` se atiende en su propio thread, así que
+    varias requests pueden estar en vuelo a la vez sobre el mismo socket
+    (multiplexado por `request_id`). Las escrituras se serializan con un lock.
+
+    Si el cliente manda "hello", las respuestas siguientes van en frame
+    binario v2 (screenshots y thumbnails como bytes crudos, ver
+    common/protocol.py); si no, en JSON puro con base64 como siempre.
+    """
+
+    def setup(self) -> None:
+        self._send_lock = threading.Lock()
+        # Formato para enviar: JSON puro hasta que el cliente negocie v2
+        self._wire: WireFormat = LEGACY_WIRE
+
+    def handle(self) -> None:  # type: ignore[override]
+        logger = logging.getLogger(__name__)
+        workers: list[threading.Thread] = []
+
+        while True:
+            try:
+                request_obj = read_message(self.request, self.server.max_frame_bytes)  # type: ignore[attr-defined]
+            except ConnectionError:
+                break  # el Servidor A cerró la conexión
+            except FrameTooLargeError as exc:
+                # No se puede saltear el frame sin leerlo: se corta la conexión
+                logger.warning("Cerrando conexión con %s: %s", self.client_address, exc)
+                break
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Error leyendo mensaje del servidor A: %s", exc)
+                break
+
+            request_id = request_obj.get(REQUEST_ID_KEY)
+            action = request_obj.get("action")
+
+            admission: Optional[AdmissionControl] = getattr(self.server, "admission", None)
+
+            if action == "ping":
+                pong: Dict[str, Any] = {"status": "ok"}
+                if admission is not None:
+                    pong["load"] = admission.stats()
+                self._reply(request_id, pong)
+                continue
+
+            if action == "hello":
+                reply, wire = accept_hello(request_obj)
+                # La respuesta al hello va en JSON puro; después, lo negociado
+                self._reply(request_id, reply)
+                self._wire = wire
+                continue
+
+            if action != "process_page":
+                self._reply(
+                    request_id,
+                    {
+                        "status": "error",
+                        "error": f"Acción desconocida: {action!r}",
+                        "processing_data": _empty_processing_data(),
+                    },
+                )
+                continue
+
+            if admission is not None and not admission.try_enter():
+                # Lleno: que el Servidor A pruebe otro backend o degrade
+                self._reply(request_id, admission.busy_response())
+                continue
+
+            worker = threading.Thread(
+                target=self._process_page if admission is None else self._admitted_page,
+                args=(request_id, request_obj),
+                daemon=True,
+            )
+            worker.start()
+            workers.append(worker)
+            workers = [w for w in workers if w.is_alive()]
+
+        # Si el peer sólo cerró su lado de escritura, terminamos de responder
+        for worker in workers:
+            worker.join()
+
+    def _admitted_page(self, request_id: Any, request_obj: Dict[str, Any]) -> None:
+        jobs: List[concurrent.futures.Future] = []
+        self.server.admission.run(  # type: ignore[attr-defined]
+            lambda: self._process_page(request_id, request_obj, jobs), jobs
+        )
+
+    def _process_page(
+        self,
+        request_id: Any,
+        request_obj: Dict[str, Any],
+        submitted: Optional[List[concurrent.futures.Future]] = None,
+    ) -> None:
+        logger = logging.getLogger(__name__)
+
+        job = _build_page_job(request_obj)
+        server = self.server  # type: ignore[attr-defined]
+
+        # Modo parcial: cada etapa se envía apenas termina (mismo request_id,
+        # status "partial") y la respuesta final ya no repite los datos.
+        progressive = bool(request_obj.get("partial"))
+
+        def _send_stage(name: str, values: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+            self._reply(request_id, _stage_message(name, values, error))
+
+        try:
+            processing_data, stage_errors = run_page_stages(
+                job,
+                server.stage_context,
+                timeouts=server.stage_timeouts,
+                on_stage=_send_stage if progressive else None,
+                submitted=submitted,
+            )
         except Exception as exc:  # noqa: BLE001
             logger.exception("Error procesando página en el pool: %s", exc)
-            response = {
-                "status": "error",
-                "error": str(exc),
-                "processing_data": {
-                    "screenshot": None,
-                    "performance": None,
-                    "thumbnails": [],
-                    "advanced": None,
-                },
-            }
+            response = _failed_page_response(exc)
+        else:
+            response = _page_response(processing_data, stage_errors, progressive)
 
+        self._reply(request_id, response)
+
+    def _reply(self, request_id: Any, response: Dict[str, Any]) -> None:
+        if request_id is not None:
+            response[REQUEST_ID_KEY] = request_id
         try:
-            send_message(self.request, response)
+            with self._send_lock:
+                send_message(self.request, response, self._wire)
         except Exception:  # noqa: BLE001
-            logger.exception("Error enviando respuesta al servidor A")
+            logging.getLogger(__name__).exception("Error enviando respuesta al servidor A")
 
 
 class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
@@ -139,23 +754,80 @@ class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
 
     daemon_threads = True
     allow_reuse_address = True
+    request_queue_size = LISTEN_BACKLOG
 
 
 class ProcessingTCPServer(ThreadingTCPServer):
     """
-    Servidor base que guarda una referencia al process_pool.
+    Servidor base que guarda referencias a dónde corren las etapas (procesos
+    para CPU, threads y event loop para red) y a los timeouts por etapa.
     """
 
     def __init__(
         self,
         server_address,
         RequestHandlerClass,
-        process_pool: concurrent.futures.ProcessPoolExecutor,
+        process_pool: concurrent.futures.Executor,
+        thread_pool: Optional[concurrent.futures.Executor] = None,
+        stage_timeouts: Optional[Mapping[str, float]] = None,
+        io_loop: Optional[BackgroundLoop] = None,
+        image_fetcher: Optional[ImageFetcher] = None,
+        thumbnail_options: Optional[ThumbnailOptions] = None,
+        max_frame_bytes: int = DEFAULT_MAX_FRAME_BYTES,
         bind_and_activate: bool = True,
+        admission: Optional[AdmissionControl] = None,
+        max_connections: int = 0,
     ) -> None:
         self.process_pool = process_pool
+        self.max_frame_bytes = max_frame_bytes
+        self.admission = admission
+        # 0 = sin límite de conexiones simultáneas
+        self.max_connections = max(0, int(max_connections))
+        self._connections = 0
+        self._connections_lock = threading.Lock()
+        self.rejected_connections = 0
+        self.stage_context = StageContext(
+            process_pool=process_pool,
+            thread_pool=thread_pool or process_pool,
+            io_loop=io_loop,
+            image_fetcher=image_fetcher,
+            thumbnail_options=thumbnail_options or ThumbnailOptions(),
+        )
+        self.stage_timeouts = dict(stage_timeouts or {})
         super().__init__(server_address, RequestHandlerClass, bind_and_activate)
 
+    def process_request(self, request, client_address) -> None:
+        """
+        Con --max-connections, una conexión de más recibe un "busy" y se
+        cierra enseguida: cada conexión es un thread, y sin tope un pico de
+        clientes los agota.
+        """
+        with self._connections_lock:
+            accepted = not self.max_connections or self._connections < self.max_connections
+            if accepted:
+                self._connections += 1
+            else:
+                self.rejected_connections += 1
+        if accepted:
+            super().process_request(request, client_address)
+            return
+
+        try:
+            request.settimeout(0.5)
+            send_message(request, {
+                "status": BUSY_STATUS,
+                "error": "Demasiadas conexiones al servidor de procesamiento",
+                "retry_after": 1.0,
+            })
+        except OSError:
+            pass
+        socketserver.TCPServer.shutdown_request(self, request)
+
+    def shutdown_request(self, request) -> None:
+        with self._connections_lock:
+            self._connections -= 1
+        super().shutdown_request(request)
+
 
 class ProcessingTCPServerIPv6(ProcessingTCPServer):
     """
@@ -165,6 +837,358 @@ class ProcessingTCPServerIPv6(ProcessingTCPServer):
     address_family = socket.AF_INET6
 
 
+class PullWorker:
+    """
+    Modo pull: el Servidor B se conecta al broker del Servidor A en lugar de
+    esperar conexiones.
+
+    Al conectarse manda {"action": "register", "slots": N}; el broker le
+    manda como mucho N process_page a la vez y cada respuesta final libera
+    un slot. Así el trabajo se queda en la cola del Servidor A (y no en la
+    cola del ProcessPoolExecutor) hasta que haya un worker libre.
+
+    Sobre la conexión se habla el mismo protocolo que en modo push: se
+    reutiliza ProcessingRequestHandler, que sólo necesita de `server` los
+    atributos stage_context, stage_timeouts y max_frame_bytes.
+    """
+
+    def __init__(
+        self,
+        broker_address: Tuple[str, int],
+        slots: int,
+        stage_context: StageContext,
+        stage_timeouts: Optional[Mapping[str, float]] = None,
+        max_frame_bytes: int = DEFAULT_MAX_FRAME_BYTES,
+    ) -> None:
+        self.broker_address = broker_address
+        self.slots = max(1, int(slots))
+        self.stage_context = stage_context
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self.max_frame_bytes = max_frame_bytes
+        self._stopped = threading.Event()
+
+    def serve_forever(self) -> None:
+        """Atiende al broker y se reconecta (con backoff) si se corta."""
+        logger = logging.getLogger(__name__)
+        delay = PULL_RETRY_MIN_SECONDS
+        while not self._stopped.is_set():
+            try:
+                sock = socket.create_connection(self.broker_address, timeout=10)
+            except OSError as exc:
+                logger.warning(
+                    "No se pudo conectar al broker %s:%s (%s); reintento en %.0f s",
+                    *self.broker_address, exc, delay,
+                )
+                self._stopped.wait(delay)
+                delay = min(PULL_RETRY_MAX_SECONDS, delay * 2)
+                continue
+
+            delay = PULL_RETRY_MIN_SECONDS
+            sock.settimeout(None)
+            logger.info(
+                "Conectado al broker %s:%s con %d slots", *self.broker_address, self.slots
+            )
+            try:
+                send_message(sock, {"action": "register", "slots": self.slots})
+                # Atiende mensajes hasta que el broker cierre la conexión
+                ProcessingRequestHandler(sock, self.broker_address, self)
+            except OSError as exc:
+                logger.warning("Conexión con el broker perdida: %s", exc)
+            finally:
+                sock.close()
+            if not self._stopped.is_set():
+                self._stopped.wait(PULL_RETRY_MIN_SECONDS)
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+
+
+# ----------------------------------------------------------------------
+#  Frontend asyncio (--frontend asyncio)
+# ----------------------------------------------------------------------
+
+
+class AsyncProcessingServer:
+    """
+    Variante del servidor B que atiende todas las conexiones en un único
+    event loop, sin un thread por conexión (ThreadingMixIn) ni por página.
+
+    Con muchas conexiones casi ociosas (varios Servidores A, cada uno con
+    su pool) el costo es un StreamReader y unas pocas corrutinas por
+    conexión en lugar de un thread bloqueado en read_message. Las etapas
+    siguen corriendo en los mismos pools (run_page_stages_async): el loop
+    sólo espera sus futures.
+
+    Habla el mismo protocolo que ProcessingRequestHandler (request_id,
+    hello/v2, partial, busy). No es thread-safe: todo corre en su loop.
+    """
+
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        stage_context: StageContext,
+        stage_timeouts: Optional[Mapping[str, float]] = None,
+        max_frame_bytes: int = DEFAULT_MAX_FRAME_BYTES,
+        admission: Optional[AdmissionControl] = None,
+        max_connections: int = 0,
+        stages: Sequence[PageStage] = PAGE_STAGES,
+    ) -> None:
+        self.host, self.port = server_address
+        self.stage_context = stage_context
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self.max_frame_bytes = max_frame_bytes
+        self.admission = admission
+        # 0 = sin límite de conexiones simultáneas
+        self.max_connections = max(0, int(max_connections))
+        self.stages = tuple(stages)
+        self.rejected_connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set[asyncio.Task] = set()
+        # Turnos de max_inflight; se crea en start(), dentro del loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def connections(self) -> int:
+        return len(self._handlers)
+
+    @property
+    def server_address(self) -> Tuple[str, int]:
+        if self._server is None or not self._server.sockets:
+            return self.host, self.port
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self) -> None:
+        if self.admission is not None:
+            self._slots = asyncio.Semaphore(self.admission.max_inflight)
+        self._server = await asyncio.start_server(
+            self._on_connect, self.host, self.port, reuse_address=True, backlog=LISTEN_BACKLOG
+        )
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if server is not None:
+            await server.wait_closed()
+
+    # ------------------------------------------------------------------
+    #  Conexiones
+    # ------------------------------------------------------------------
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.max_connections and len(self._handlers) >= self.max_connections:
+            self.rejected_connections += 1
+            try:
+                writer.write(encode_frame({
+                    "status": BUSY_STATUS,
+                    "error": "Demasiadas conexiones al servidor de procesamiento",
+                    "retry_after": 1.0,
+                }))
+                await asyncio.wait_for(writer.drain(), 0.5)
+            except (asyncio.TimeoutError, ConnectionError, OSError):
+                pass
+            writer.close()
+            return
+
+        task = asyncio.current_task()
+        assert task is not None
+        self._handlers.add(task)
+        try:
+            await _AsyncConnection(self, reader, writer).serve()
+        except asyncio.CancelledError:
+            pass  # close() del servidor
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+
+class _AsyncConnection:
+    """Una conexión del Servidor A en el frontend asyncio."""
+
+    def __init__(
+        self,
+        server: AsyncProcessingServer,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        peer = writer.get_extra_info("peername")
+        self.client_address = peer[:2] if peer else None
+        # Formato para enviar: JSON puro hasta que el cliente negocie v2
+        self.wire: WireFormat = LEGACY_WIRE
+        # Páginas admitidas (try_enter) que todavía esperan turno
+        self._queued_pages: Set[asyncio.Task] = set()
+
+    async def serve(self) -> None:
+        logger = logging.getLogger(__name__)
+        server = self.server
+        admission = server.admission
+        pages: Set[asyncio.Task] = set()
+
+        try:
+            while True:
+                try:
+                    request_obj = await read_message_async(self.reader, server.max_frame_bytes)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break  # el Servidor A cerró la conexión
+                except FrameTooLargeError as exc:
+                    logger.warning("Cerrando conexión con %s: %s", self.client_address, exc)
+                    break
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("Error leyendo mensaje del servidor A: %s", exc)
+                    break
+
+                request_id = request_obj.get(REQUEST_ID_KEY)
+                action = request_obj.get("action")
+
+                if action == "ping":
+                    pong: Dict[str, Any] = {"status": "ok"}
+                    if admission is not None:
+                        pong["load"] = admission.stats()
+                    await self._reply(request_id, pong)
+                    continue
+
+                if action == "hello":
+                    reply, wire = accept_hello(request_obj)
+                    await self._reply(request_id, reply)
+                    self.wire = wire
+                    continue
+
+                if action != "process_page":
+                    await self._reply(
+                        request_id,
+                        {
+                            "status": "error",
+                            "error": f"Acción desconocida: {action!r}",
+                            "processing_data": _empty_processing_data(),
+                        },
+                    )
+                    continue
+
+                if admission is not None and not admission.try_enter():
+                    await self._reply(request_id, admission.busy_response())
+                    continue
+
+                page = asyncio.create_task(self._process_page(request_id, request_obj))
+                pages.add(page)
+                page.add_done_callback(pages.discard)
+                if admission is not None:
+                    # El callback corre aunque la tarea se cancele antes de
+                    # arrancar (el cliente se fue): si no llegó a begin(),
+                    # su lugar en la cola se devuelve acá
+                    self._queued_pages.add(page)
+                    page.add_done_callback(self._leave_queue)
+
+            # Si el peer sólo cerró su lado de escritura, terminamos de responder
+            if pages:
+                await asyncio.gather(*pages, return_exceptions=True)
+        finally:
+            for page in pages:
+                page.cancel()
+
+    async def _process_page(self, request_id: Any, request_obj: Dict[str, Any]) -> None:
+        admission = self.server.admission
+        if admission is None:
+            await self._run_page(request_id, request_obj)
+            return
+
+        slots = self.server._slots
+        assert slots is not None
+        await slots.acquire()
+        self._queued_pages.discard(asyncio.current_task())
+        started = admission.begin()
+        loop = asyncio.get_running_loop()
+        submitted: List[concurrent.futures.Future] = []
+
+        def _release() -> None:
+            admission.end(started)
+            slots.release()
+
+        def _release_from_pool() -> None:
+            try:
+                loop.call_soon_threadsafe(_release)
+            except RuntimeError:
+                pass  # el loop ya se cerró
+
+        try:
+            await self._run_page(request_id, request_obj, submitted)
+        finally:
+            # Como en AdmissionControl.run: el turno sigue tomado mientras
+            # una etapa vencida siga corriendo en el pool
+            _when_all_done(submitted, _release_from_pool)
+
+    def _leave_queue(self, page: asyncio.Task) -> None:
+        if page in self._queued_pages:
+            self._queued_pages.discard(page)
+            self.server.admission.cancel_queued()  # type: ignore[union-attr]
+
+    async def _run_page(
+        self,
+        request_id: Any,
+        request_obj: Dict[str, Any],
+        submitted: Optional[List[concurrent.futures.Future]] = None,
+    ) -> None:
+        server = self.server
+        job = _build_page_job(request_obj)
+        progressive = bool(request_obj.get("partial"))
+
+        def _send_stage(name: str, values: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+            # on_stage no es corrutina: se escribe en el acto (queda en orden
+            # antes de la respuesta final, que es la que hace el drain)
+            message = _stage_message(name, values, error)
+            message[REQUEST_ID_KEY] = request_id
+            self.writer.write(encode_frame(message, self.wire))
+
+        try:
+            processing_data, stage_errors = await run_page_stages_async(
+                job,
+                server.stage_context,
+                stages=server.stages,
+                timeouts=server.stage_timeouts,
+                on_stage=_send_stage if progressive else None,
+                submitted=submitted,
+            )
+        except Exception as exc:  # noqa: BLE001
+            logging.getLogger(__name__).exception("Error procesando página en el pool: %s", exc)
+            response = _failed_page_response(exc)
+        else:
+            response = _page_response(processing_data, stage_errors, progressive, len(server.stages))
+
+        await self._reply(request_id, response)
+
+    async def _reply(self, request_id: Any, response: Dict[str, Any]) -> None:
+        if request_id is not None:
+            response[REQUEST_ID_KEY] = request_id
+        # write() es síncrono: los mensajes no se intercalan aunque varias
+        # páginas respondan a la vez; sólo el drain puede esperar
+        try:
+            await send_message_async(self.writer, response, self.wire)
+        except (ConnectionError, OSError):
+            pass  # el Servidor A se fue; lo detecta el lector
+        except Exception:  # noqa: BLE001
+            logging.getLogger(__name__).exception("Error enviando respuesta al servidor A")
+
+
+async def _serve_async(server: AsyncProcessingServer) -> None:
+    await server.start()
+    logging.info("Frontend asyncio escuchando en %s:%s", *server.server_address)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Servidor de Procesamiento Distribuido"
@@ -172,15 +1196,27 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "-i",
         "--ip",
-        required=True,
-        help="Dirección de escucha (IPv4 o IPv6)",
+        help="Dirección de escucha (IPv4 o IPv6); obligatoria salvo con --pull",
     )
     parser.add_argument(
         "-p",
         "--port",
-        required=True,
         type=int,
-        help="Puerto de escucha",
+        help="Puerto de escucha; obligatorio salvo con --pull",
+    )
+    parser.add_argument(
+        "--pull",
+        default=None,
+        metavar="HOST:PUERTO",
+        help="Modo pull: conectarse al broker del servidor de scraping "
+        "(--processing-broker) y pedirle trabajo en lugar de escuchar",
+    )
+    parser.add_argument(
+        "--pull-slots",
+        type=int,
+        default=0,
+        help="Páginas a la vez que se piden al broker en modo pull "
+        "(default: cantidad de procesos)",
     )
     parser.add_argument(
         "-n",
@@ -189,7 +1225,135 @@ def parse_args() -> argparse.Namespace:
         default=0,
         help="Número de procesos en el pool (default: CPU count)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        default=DEFAULT_IO_THREADS,
+        help=f"Threads para las etapas de red: rendimiento y thumbnails (default: {DEFAULT_IO_THREADS})",
+    )
+    parser.add_argument(
+        "--stage-timeout",
+        action="append",
+        default=[],
+        metavar="ETAPA=SEGUNDOS",
+        help="Timeout de una etapa, ej: --stage-timeout screenshot=10 (se puede repetir). "
+        "Etapas: " + ", ".join(f"{st.name} ({st.timeout:g}s)" for st in PAGE_STAGES),
+    )
+    parser.add_argument(
+        "--screenshot-driver",
+        choices=DRIVER_CHOICES,
+        default=DRIVER_CHROME,
+        help="Navegador para screenshots: chrome (Selenium), fake (sin Chrome, "
+        "para pruebas) o none (siempre placeholder). Default: chrome",
+    )
+    parser.add_argument(
+        "--browser-max-pages",
+        type=int,
+        default=DEFAULT_MAX_PAGES_PER_BROWSER,
+        help="Páginas por navegador antes de reciclarlo "
+        f"(default: {DEFAULT_MAX_PAGES_PER_BROWSER})",
+    )
+    parser.add_argument(
+        "--image-host-concurrency",
+        type=int,
+        default=DEFAULT_PER_HOST_LIMIT,
+        help="Descargas de imágenes simultáneas por host "
+        f"(default: {DEFAULT_PER_HOST_LIMIT})",
+    )
+    parser.add_argument(
+        "--max-image-size",
+        type=float,
+        default=DEFAULT_MAX_IMAGE_BYTES / (1024 * 1024),
+        help="Tamaño máximo de cada imagen a descargar, en MB "
+        f"(default: {DEFAULT_MAX_IMAGE_BYTES // (1024 * 1024)})",
+    )
+    parser.add_argument(
+        "--thumb-format",
+        type=str.upper,
+        choices=THUMB_FORMATS,
+        default=DEFAULT_THUMB_FORMAT,
+        help=f"Formato de los thumbnails (default: {DEFAULT_THUMB_FORMAT})",
+    )
+    parser.add_argument(
+        "--thumb-quality",
+        type=int,
+        default=DEFAULT_THUMB_QUALITY,
+        help=f"Calidad 1-100 para thumbnails JPEG/WEBP (default: {DEFAULT_THUMB_QUALITY})",
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=0,
+        help="Páginas procesándose a la vez; las demás esperan en la cola "
+        f"(default: {DEFAULT_INFLIGHT_PER_PROCESS} por proceso)",
+    )
+    parser.add_argument(
+        "--max-queued",
+        type=int,
+        default=-1,
+        help="Páginas esperando turno antes de responder \"busy\" "
+        f"(default: {DEFAULT_QUEUED_PER_PROCESS} por proceso)",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=None,
+        help="Conexiones simultáneas del servidor de scraping; 0 = sin límite "
+        f"(default: {DEFAULT_MAX_CONNECTIONS}, o {DEFAULT_MAX_CONNECTIONS_ASYNC} con --frontend asyncio)",
+    )
+    parser.add_argument(
+        "--frontend",
+        choices=FRONTEND_CHOICES,
+        default=FRONTEND_THREADS,
+        help="Cómo se atienden las conexiones: threads (un thread por conexión, "
+        "socketserver) o asyncio (todas en un event loop). Default: threads",
+    )
+    parser.add_argument(
+        "--max-frame-size",
+        type=float,
+        default=DEFAULT_MAX_FRAME_BYTES / (1024 * 1024),
+        help="Tamaño máximo de un mensaje recibido del servidor de scraping, en MB "
+        f"(default: {DEFAULT_MAX_FRAME_BYTES // (1024 * 1024)})",
+    )
+    args = parser.parse_args()
+    try:
+        args.stage_timeout = _parse_stage_timeouts(args.stage_timeout)
+        if args.pull:
+            args.pull = parse_address(args.pull)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not args.pull and (args.ip is None or args.port is None):
+        parser.error("-i/--ip y -p/--port son obligatorios (salvo con --pull)")
+    if args.max_connections is None:
+        args.max_connections = (
+            DEFAULT_MAX_CONNECTIONS_ASYNC if args.frontend == FRONTEND_ASYNCIO else DEFAULT_MAX_CONNECTIONS
+        )
+    return args
+
+
+def _parse_stage_timeouts(values: Sequence[str]) -> Dict[str, float]:
+    known = {stage.name for stage in PAGE_STAGES}
+    timeouts: Dict[str, float] = {}
+    for value in values:
+        name, sep, seconds = value.partition("=")
+        if not sep or name not in known:
+            raise ValueError(f"--stage-timeout inválido: {value!r}")
+        try:
+            timeouts[name] = float(seconds)
+        except ValueError:
+            raise ValueError(f"--stage-timeout inválido: {value!r}") from None
+    return timeouts
+
+
+def _prewarm_process_pool(pool: concurrent.futures.ProcessPoolExecutor, num_procs: int) -> None:
+    """
+    Fuerza la creación de los workers (y de sus navegadores, vía initializer)
+    antes de aceptar conexiones, así la primera página no paga el arranque.
+    Además los workers se crean antes del socket de escucha y no lo heredan.
+    """
+    futures = [pool.submit(int) for _ in range(num_procs)]
+    concurrent.futures.wait(futures)
 
 
 def main() -> None:
@@ -202,27 +1366,122 @@ def main() -> None:
 
     num_procs = args.processes or (multiprocessing.cpu_count() or 1)
 
-    # Elegir clase de servidor según si la IP es IPv4 o IPv6
-    if ":" in args.ip:
-        ServerClass = ProcessingTCPServerIPv6
+    if args.pull:
+        logging.info(
+            "Iniciando servidor de procesamiento en modo pull hacia %s:%s con %d procesos y %d threads",
+            *args.pull,
+            num_procs,
+            args.threads,
+        )
     else:
-        ServerClass = ProcessingTCPServer
+        logging.info(
+            "Iniciando servidor de procesamiento en %s:%s con %d procesos y %d threads",
+            args.ip,
+            args.port,
+            num_procs,
+            args.threads,
+        )
 
-    server_address = (args.ip, args.port)
+    process_pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_procs,
+        initializer=init_worker_browser,
+        initargs=(args.screenshot_driver, args.browser_max_pages),
+    )
 
-    logging.info(
-        "Iniciando servidor de procesamiento en %s:%s con %d procesos",
-        args.ip,
-        args.port,
-        num_procs,
+    io_loop = BackgroundLoop()
+    image_fetcher = ImageFetcher(
+        per_host_limit=args.image_host_concurrency,
+        max_bytes=int(args.max_image_size * 1024 * 1024),
+    )
+    thumbnail_options = ThumbnailOptions(
+        format=args.thumb_format,
+        quality=max(1, min(100, args.thumb_quality)),
     )
+    max_frame_bytes = int(args.max_frame_size * 1024 * 1024)
 
-    with concurrent.futures.ProcessPoolExecutor(max_workers=num_procs) as pool:
-        with ServerClass(server_address, ProcessingRequestHandler, process_pool=pool) as server:
-            try:
-                server.serve_forever()
-            except KeyboardInterrupt:
-                logging.info("Servidor detenido por KeyboardInterrupt")
+    with process_pool as pool, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.threads)) as io_pool:
+        _prewarm_process_pool(pool, num_procs)
+        io_loop.start()
+        try:
+            if args.pull:
+                worker = PullWorker(
+                    args.pull,
+                    slots=args.pull_slots or num_procs,
+                    stage_context=StageContext(
+                        process_pool=pool,
+                        thread_pool=io_pool,
+                        io_loop=io_loop,
+                        image_fetcher=image_fetcher,
+                        thumbnail_options=thumbnail_options,
+                    ),
+                    stage_timeouts=args.stage_timeout,
+                    max_frame_bytes=max_frame_bytes,
+                )
+                try:
+                    worker.serve_forever()
+                except KeyboardInterrupt:
+                    logging.info("Servidor detenido por KeyboardInterrupt")
+                return
+
+            admission = AdmissionControl(
+                max_inflight=args.max_inflight or DEFAULT_INFLIGHT_PER_PROCESS * num_procs,
+                max_queued=args.max_queued if args.max_queued >= 0 else DEFAULT_QUEUED_PER_PROCESS * num_procs,
+            )
+            logging.info(
+                "Control de admisión: %d páginas en proceso, %d en cola, %s conexiones",
+                admission.max_inflight,
+                admission.max_queued,
+                args.max_connections or "sin límite de",
+            )
+
+            if args.frontend == FRONTEND_ASYNCIO:
+                async_server = AsyncProcessingServer(
+                    (args.ip, args.port),
+                    StageContext(
+                        process_pool=pool,
+                        thread_pool=io_pool,
+                        io_loop=io_loop,
+                        image_fetcher=image_fetcher,
+                        thumbnail_options=thumbnail_options,
+                    ),
+                    stage_timeouts=args.stage_timeout,
+                    max_frame_bytes=max_frame_bytes,
+                    admission=admission,
+                    max_connections=args.max_connections,
+                )
+                try:
+                    asyncio.run(_serve_async(async_server))
+                except KeyboardInterrupt:
+                    logging.info("Servidor detenido por KeyboardInterrupt")
+                return
+
+            # Elegir clase de servidor según si la IP es IPv4 o IPv6
+            if ":" in args.ip:
+                ServerClass = ProcessingTCPServerIPv6
+            else:
+                ServerClass = ProcessingTCPServer
+
+            with ServerClass(
+                (args.ip, args.port),
+                ProcessingRequestHandler,
+                process_pool=pool,
+                thread_pool=io_pool,
+                stage_timeouts=args.stage_timeout,
+                io_loop=io_loop,
+                image_fetcher=image_fetcher,
+                thumbnail_options=thumbnail_options,
+                max_frame_bytes=max_frame_bytes,
+                admission=admission,
+                max_connections=args.max_connections,
+            ) as server:
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    logging.info("Servidor detenido por KeyboardInterrupt")
+        finally:
+            io_loop.submit(image_fetcher.close()).result(timeout=5)
+            io_loop.stop()
 
 
 if __name__ == "__main__":
@@ -19,51 +19,152 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import base64
+import json
 import logging
+import math
+import sqlite3
 import time
 import uuid
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import aiohttp
 from aiohttp import web
 
-from scraper.async_http import fetch_html, HttpError
-from scraper.html_parser import extract_page_data
-from common.protocol import send_message_async, read_message_async
-
-# Dirección del servidor de procesamiento (Parte B)
+from scraper.async_http import build_trace_config, fetch_page, HttpError
+from scraper.cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_STALE_RETENTION_SECONDS,
+    ResultCache,
+    normalize_url,
+    strip_heavy_fields,
+)
+from scraper.disk_cache import DEFAULT_DISK_CACHE_MAX_BYTES, DiskCache
+from scraper.rate_limiter import (
+    DEFAULT_MAX_WAIT_SECONDS,
+    DEFAULT_RATE_LIMIT_MODE,
+    RATE_LIMIT_MODES,
+    DomainRateLimiter,
+    RateLimitExceeded,
+)
+from scraper.events import Subscription, TaskEvents
+from scraper.progress import ProgressiveResult
+from scraper.single_flight import SingleFlight
+from scraper.task_journal import DEFAULT_FLUSH_INTERVAL_SECONDS, TaskJournal
+from scraper.task_queue import DEFAULT_QUEUE_SIZE, TaskQueue, TaskQueueFull
+from common.addresses import parse_address
+from common.protocol import BUSY_STATUS
+from common.html_parser import extract_page_bundle
+from processor.performance import MODE_REUSE, PERFORMANCE_MODES
+from scraper.processing_balancer import (
+    DEFAULT_EJECT_AFTER,
+    DEFAULT_EJECT_SECONDS,
+    ProcessingBalancer,
+)
+from scraper.processing_broker import ProcessingBroker
+from scraper.processing_client import (
+    DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+    DEFAULT_IDLE_TIMEOUT_SECONDS,
+    DEFAULT_POOL_SIZE,
+    ProcessingBusyError,
+)
+
+# Dirección del servidor de procesamiento (Parte B) si no se pasa
+# --processing-server
 PROCESSING_SERVER_IP = "127.0.0.1"
 PROCESSING_SERVER_PORT = 9000
 
 SCRAPING_TIMEOUT_SECONDS = 30
 DEFAULT_CACHE_TTL_SECONDS = 3600  # 1 hora
 DEFAULT_MAX_HTML_SIZE_MB = 10.0
+DEFAULT_TASK_RETENTION_SECONDS = 3600.0  # tareas terminadas: 1 hora
+DEFAULT_MAX_FINISHED_TASKS = 10000
+DEFAULT_BATCH_MAX_URLS = 10000  # URLs por POST /tasks/batch
+SSE_HEARTBEAT_SECONDS = 15.0  # comentario ": ping" en /events si no hay eventos
+
+# Cómo mide rendimiento el Servidor B:
+#   reuse -> usa los tiempos medidos por A al descargar la página
+#   cold  -> descarga la página de nuevo para medir (más tráfico)
+DEFAULT_PERFORMANCE_MODE = MODE_REUSE
+
+# Cómo se parsea el HTML descargado:
+#   stream -> eventos lxml mientras llegan los pedazos (memoria acotada)
+#   soup   -> HTML completo en memoria y árbol BeautifulSoup
+HTML_PARSERS = ("stream", "soup")
+DEFAULT_HTML_PARSER = "stream"
 
 class ScrapingError(Exception):
     """Error de alto nivel durante el scraping."""
     pass
 
 
+class QueueFullError(ScrapingError):
+    """La cola de tareas está llena (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitError(ScrapingError):
+    """Se superó el rate limit del dominio (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 @dataclass
 class TaskInfo:
     """
     Representa una tarea en la cola (Bonus Opción 1).
 
     status:
-        - pending
+        - pending     (en la cola)
         - scraping
         - processing
         - completed
         - failed
+        - cancelled   (DELETE /tasks/{task_id})
+
+    priority: mayor valor sale antes de la cola (default 0).
     """
     url: str
     status: str = "pending"
     created_at: datetime = field(default_factory=datetime.utcnow)
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    priority: int = 0
+    finished_at: Optional[datetime] = None
+    batch_id: Optional[str] = None
+    task_id: str = ""
+    # Secciones ya listas mientras corre (GET /result/{id}?partial=1)
+    progress: Optional[ProgressiveResult] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+
+# Estados finales de una tarea (se conservan hasta --task-retention)
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+@dataclass
+class BatchInfo:
+    """
+    Lote de tareas creado con POST /tasks/batch. Sólo guarda los IDs: el
+    estado de cada una está en su TaskInfo.
+    """
+    task_ids: List[str]
+    rejected: int = 0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    # Tareas del lote que todavía no se olvidaron (ver _prune_tasks)
+    remaining: int = 0
 
 
 class ScraperService:
@@ -71,50 +172,207 @@ class ScraperService:
     Servicio de scraping que encapsula:
     - Cliente HTTP asíncrono (aiohttp)
     - Límite de concurrencia (semáforo)
-    - Comunicación con el servidor de procesamiento (Parte B)
+    - Comunicación con el servidor de procesamiento (Parte B) mediante un
+      pool de conexiones persistentes
     - Rate limiting por dominio (Opción 2)
-    - Caché de resultados con TTL (Opción 2)
+    - Caché de resultados con TTL (Opción 2), en memoria y opcionalmente
+      en disco (SQLite)
     - Cola de tareas con IDs (Opción 1)
+    - Deduplicación de scrapings concurrentes de la misma URL (single-flight)
     """
 
     def __init__(
         self,
         workers: int,
         rate_limit_per_minute: Optional[int] = None,
+        rate_limit_burst: Optional[int] = None,
+        rate_limit_mode: str = DEFAULT_RATE_LIMIT_MODE,
+        rate_limit_max_wait: float = DEFAULT_MAX_WAIT_SECONDS,
         cache_ttl_seconds: int = DEFAULT_CACHE_TTL_SECONDS,
         max_html_size_mb: float = DEFAULT_MAX_HTML_SIZE_MB,
+        processing_pool_size: int = DEFAULT_POOL_SIZE,
+        processing_idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+        processing_health_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+        performance_mode: str = DEFAULT_PERFORMANCE_MODE,
+        html_parser: str = DEFAULT_HTML_PARSER,
+        cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        cache_heavy_fields: bool = True,
+        disk_cache_path: Optional[str] = None,
+        disk_cache_max_bytes: int = DEFAULT_DISK_CACHE_MAX_BYTES,
+        cache_stale_retention: float = DEFAULT_STALE_RETENTION_SECONDS,
+        stale_while_revalidate: float = 0.0,
+        task_workers: Optional[int] = None,
+        task_queue_size: int = DEFAULT_QUEUE_SIZE,
+        task_retention_seconds: float = DEFAULT_TASK_RETENTION_SECONDS,
+        max_finished_tasks: int = DEFAULT_MAX_FINISHED_TASKS,
+        task_journal_path: Optional[str] = None,
+        task_journal_flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        processing_servers: Optional[List[Tuple[str, int]]] = None,
+        processing_eject_after: int = DEFAULT_EJECT_AFTER,
+        processing_eject_seconds: float = DEFAULT_EJECT_SECONDS,
+        processing_broker: Optional[Tuple[str, int]] = None,
     ) -> None:
         self._workers = max(1, int(workers))
         self._semaphore = asyncio.Semaphore(self._workers)
         self._session: Optional[aiohttp.ClientSession] = None
         self._max_html_size_mb = max_html_size_mb
+        self._performance_mode = performance_mode
+        self._stream_parse = html_parser == "stream"
+
+        # Conexiones persistentes con uno o más Servidores B, con balanceo
+        # de carga y expulsión de los que fallan. En modo pull, en cambio,
+        # los Servidores B se conectan al broker y piden trabajo.
+        self._processing_pool: Union[ProcessingBalancer, ProcessingBroker]
+        if processing_broker is not None:
+            self._processing_pool = ProcessingBroker(*processing_broker)
+        else:
+            self._processing_pool = ProcessingBalancer(
+                processing_servers or [(PROCESSING_SERVER_IP, PROCESSING_SERVER_PORT)],
+                pool_size=processing_pool_size,
+                idle_timeout=processing_idle_timeout,
+                health_check_interval=processing_health_interval,
+                eject_after=processing_eject_after,
+                eject_seconds=processing_eject_seconds,
+            )
 
-        # Rate limiting
-        self._rate_limit_per_minute = rate_limit_per_minute if rate_limit_per_minute and rate_limit_per_minute > 0 else None
-        # dominio -> lista de timestamps (segundos) de las últimas requests "reales"
-        self._domain_requests: Dict[str, list[float]] = {}
+        # Rate limiting por dominio (GCRA); None = sin límite
+        self._rate_limiter: Optional[DomainRateLimiter] = None
+        if rate_limit_per_minute and rate_limit_per_minute > 0:
+            self._rate_limiter = DomainRateLimiter(
+                rate_limit_per_minute,
+                burst=rate_limit_burst,
+                mode=rate_limit_mode,
+                max_wait=rate_limit_max_wait,
+            )
 
-        # Caché: url -> (timestamp, resultado_json)
-        self._cache_ttl_seconds = max(0, cache_ttl_seconds)
-        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # Caché: url -> resultado_json (LRU con TTL y presupuesto en bytes)
+        self._cache = ResultCache(
+            ttl_seconds=max(0, cache_ttl_seconds),
+            max_bytes=cache_max_bytes,
+            store_heavy_fields=cache_heavy_fields,
+            stale_retention=cache_stale_retention,
+            stale_window=max(0.0, stale_while_revalidate),
+        )
+        # Scrapings en curso por URL normalizada (single-flight) y sus
+        # secciones ya terminadas (resultados progresivos)
+        self._inflight = SingleFlight()
+        self._progress: Dict[str, ProgressiveResult] = {}
+
+        # Revalidaciones condicionales: 304 (sin reprocesar) vs. página cambiada
+        self._revalidation = {"not_modified": 0, "modified": 0}
+
+        # Stale-while-revalidate: /scrape devuelve al instante un resultado
+        # vencido hace menos de estos segundos y lo refresca en segundo plano
+        self._stale_window = max(0.0, stale_while_revalidate)
+        self._background: Dict[str, asyncio.Task] = {}
+        self._swr_stats = {"served": 0, "refreshes": 0, "refresh_failures": 0}
+
+        # Segundo nivel opcional en disco, compartido entre reinicios e
+        # instancias del Servidor A en el mismo host
+        self._disk_cache: Optional[DiskCache] = None
+        if disk_cache_path and cache_ttl_seconds > 0:
+            self._disk_cache = DiskCache(
+                disk_cache_path,
+                ttl_seconds=cache_ttl_seconds,
+                max_bytes=disk_cache_max_bytes,
+                store_heavy_fields=cache_heavy_fields,
+                stale_retention=cache_stale_retention,
+                stale_window=max(0.0, stale_while_revalidate),
+            )
 
-        # Cola de tareas
+        # Cola de tareas: prioridad + pool fijo de workers (ver scraper/task_queue.py).
+        # Las tareas terminadas se conservan hasta task_retention_seconds o
+        # hasta que haya más de max_finished_tasks (se borran las más viejas).
         self._tasks: Dict[str, TaskInfo] = {}
+        self._task_queue = TaskQueue(
+            self._run_task,
+            workers=task_workers or self._workers,
+            max_pending=task_queue_size,
+        )
+        self._task_retention = max(0.0, task_retention_seconds)
+        self._max_finished_tasks = max(0, int(max_finished_tasks))
+        # task_id -> instante (monotonic) en que terminó, en orden de fin
+        self._finished_tasks: "OrderedDict[str, float]" = OrderedDict()
+        # Lotes (POST /tasks/batch)
+        self._batches: Dict[str, BatchInfo] = {}
+        # Cambios de estado de las tareas para GET /events (SSE)
+        self._events = TaskEvents()
+
+        # Journal opcional en disco: las tareas (pendientes y resultados)
+        # sobreviven a un reinicio del Servidor A
+        self._journal: Optional[TaskJournal] = None
+        # Con --cache-skip-heavy tampoco se escriben screenshot ni thumbnails
+        self._journal_heavy_fields = cache_heavy_fields
+        if task_journal_path:
+            self._journal = TaskJournal(
+                task_journal_path,
+                flush_interval=task_journal_flush_interval,
+                snapshot=self._journal_snapshot,
+            )
+        # True durante close(): las tareas que se cortan no cuentan como canceladas
+        self._closing = False
 
     async def start(self) -> None:
         """
-        Inicializa el ClientSession con timeout global de scraping.
+        Inicializa el ClientSession con timeout global de scraping y el pool
+        de conexiones con el Servidor B.
         Debe llamarse al arrancar el servidor.
         """
         timeout = aiohttp.ClientTimeout(total=SCRAPING_TIMEOUT_SECONDS)
-        self._session = aiohttp.ClientSession(timeout=timeout)
+        self._session = aiohttp.ClientSession(
+            timeout=timeout,
+            trace_configs=[build_trace_config()],
+        )
+        await self._processing_pool.start()
+        await self._cache.start()
+        if self._disk_cache is not None:
+            await self._disk_cache.start()
+        if self._journal is not None:
+            await self._restore_tasks()
+        await self._task_queue.start()
 
     async def close(self) -> None:
         """
-        Cierra el ClientSession al apagar el servidor.
+        Cierra el ClientSession y el pool de conexiones al apagar el servidor.
         """
+        self._closing = True
+        await self._task_queue.close()
+        if self._journal is not None:
+            await self._journal.close()
+        for task in list(self._background.values()):
+            task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background.values(), return_exceptions=True)
         if self._session is not None:
             await self._session.close()
+        await self._processing_pool.close()
+        await self._cache.close()
+        if self._disk_cache is not None:
+            await self._disk_cache.close()
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Métricas internas para GET /stats.
+        """
+        stats: Dict[str, Any] = {
+            "cache": self._cache.stats(),
+            "tasks": {**self._task_queue.stats(), "stored": len(self._tasks), "batches": len(self._batches)},
+            "single_flight": self._inflight.stats(),
+            "events": self._events.stats(),
+            "processing": self._processing_pool.stats(),
+            "revalidation": dict(self._revalidation),
+            "rate_limit": self._rate_limiter.stats() if self._rate_limiter is not None else None,
+            "stale_while_revalidate": {
+                "window_seconds": self._stale_window,
+                "refreshing": len(self._background),
+                **self._swr_stats,
+            },
+        }
+        if self._disk_cache is not None:
+            stats["disk_cache"] = await self._disk_cache.stats_async()
+        if self._journal is not None:
+            stats["task_journal"] = self._journal.stats()
+        return stats
 
     # ------------------------------------------------------------------
     #  MODO SIN COLA (endpoint /scrape) - Parte A clásica
@@ -124,64 +382,427 @@ class ScraperService:
         """
         Punto de entrada principal "sin cola": recibe una URL y devuelve
         el JSON completo con scraping_data + processing_data.
+
+        Con stale-while-revalidate, un resultado vencido hace poco se
+        devuelve enseguida con "stale": true (y se refresca en segundo plano).
         """
-        result = await self._run_pipeline(url, job=None)
+        result = await self._run_pipeline(url, job=None, allow_stale=True)
         return result
 
+    async def stream_url(self, url: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Como handle_url, pero devuelve el resultado por secciones a medida
+        que se completan (GET /scrape?stream=1):
+
+            {"section": "scraping", "url", "timestamp", "scraping_data"}
+            {"section": "processing", "stage": "screenshot", "processing_data": {...}}
+            ...
+            {"section": "done", "status": "success", "processing_status": "..."}
+
+        Si el resultado sale de la caché, las secciones llegan todas juntas.
+        """
+        progress_ready: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        def _on_progress(progress: ProgressiveResult) -> None:
+            if not progress_ready.done():
+                progress_ready.set_result(progress)
+
+        pipeline = asyncio.ensure_future(
+            self._run_pipeline(url, job=None, allow_stale=True, on_progress=_on_progress)
+        )
+        progress: Optional[ProgressiveResult] = None
+        seen = 0
+        sent_sections = set()
+        try:
+            while True:
+                if progress is None and progress_ready.done():
+                    progress = progress_ready.result()
+                if progress is not None:
+                    for kind, data in progress.events[seen:]:
+                        seen += 1
+                        if kind == "scraping":
+                            sent_sections.add("scraping_data")
+                        else:
+                            sent_sections.update(data.get("processing_data") or {data["stage"]: None})
+                        yield {"section": kind, **data}
+                if pipeline.done():
+                    break
+
+                waiter = asyncio.ensure_future(
+                    progress.wait(seen) if progress is not None else asyncio.shield(progress_ready)
+                )
+                try:
+                    await asyncio.wait({pipeline, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    waiter.cancel()
+
+            result = pipeline.result()
+        finally:
+            if not pipeline.done():
+                pipeline.cancel()  # el scraping compartido sigue (single-flight)
+
+        # Lo que no llegó por secciones (caché, stale, 304): desde el resultado
+        if "scraping_data" not in sent_sections:
+            yield {
+                "section": "scraping",
+                "url": result.get("url"),
+                "timestamp": result.get("timestamp"),
+                "scraping_data": result.get("scraping_data"),
+            }
+        remaining = {
+            key: value
+            for key, value in (result.get("processing_data") or {}).items()
+            if key not in sent_sections
+        }
+        if remaining:
+            yield {"section": "processing", "processing_data": remaining}
+        done: Dict[str, Any] = {
+            "section": "done",
+            "status": result.get("status"),
+            "processing_status": result.get("processing_status"),
+        }
+        if result.get("stale"):
+            done["stale"] = True
+        yield done
+
     # ------------------------------------------------------------------
     #  MODO CON COLA (Bonus opción 1)
     # ------------------------------------------------------------------
 
-    def create_task(self, url: str) -> str:
+    def create_task(self, url: str, priority: int = 0) -> str:
         """
-        Crea una nueva tarea en estado 'pending' y lanza el procesamiento
-        en segundo plano usando asyncio.create_task.
+        Crea una nueva tarea en estado 'pending' y la pone en la cola; la
+        toma el primer worker libre (mayor prioridad primero).
 
-        Devuelve el task_id.
+        Devuelve el task_id. Lanza QueueFullError si la cola está llena.
         """
         self._validate_url(url)
+        self._prune_tasks()
 
         task_id = uuid.uuid4().hex
-        task = TaskInfo(url=url)
+        try:
+            self._task_queue.submit(task_id, priority=priority)
+        except TaskQueueFull as exc:
+            raise QueueFullError(str(exc), retry_after=exc.retry_after) from exc
+        task = TaskInfo(url=url, priority=priority, task_id=task_id)
         self._tasks[task_id] = task
-
-        # Lanzamos la corrutina que hará el trabajo real
-        asyncio.create_task(self._run_task(task_id))
+        self._events.publish(self.task_event(task))
+        if self._journal is not None:
+            self._journal.append(_task_record(task, self._journal_heavy_fields))
 
         return task_id
 
+    def create_batch(self, entries: List[Tuple[str, int]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Crea una tarea por cada (url, prioridad) de `entries`. Las URLs
+        inválidas no se encolan y quedan con su error en el resultado.
+
+        Dentro del lote las tareas se encolan alternando dominios (round
+        robin): los workers reparten el trabajo entre sitios en vez de
+        esperar el rate limit de uno solo, y cada sitio recibe sus requests
+        de a una, reutilizando las conexiones keep-alive.
+
+        Devuelve (batch_id, items) con un item por entrada, en el orden
+        recibido: {"url", "task_id"} o {"url", "error"}. Lanza
+        QueueFullError (sin encolar nada) si el lote no entra en la cola y
+        ScrapingError si ninguna URL es válida.
+        """
+        self._prune_tasks()
+
+        items: List[Dict[str, Any]] = []
+        valid: List[Tuple[int, str, int]] = []
+        for index, (url, priority) in enumerate(entries):
+            items.append({"url": url})
+            try:
+                self._validate_url(url)
+            except ScrapingError as exc:
+                items[index]["error"] = str(exc)
+                continue
+            valid.append((index, url, priority))
+
+        if not valid:
+            raise ScrapingError("El lote no tiene ninguna URL válida")
+        if len(valid) > self._task_queue.free_slots:
+            retry_after = self._task_queue.retry_after() * max(1, len(valid) - self._task_queue.free_slots)
+            raise QueueFullError(
+                f"El lote ({len(valid)} tareas) no entra en la cola "
+                f"({self._task_queue.free_slots} lugares libres)",
+                retry_after=retry_after,
+            )
+
+        batch_id = uuid.uuid4().hex
+        task_ids: List[str] = []
+        for index, url, priority in _interleave_by_domain(valid):
+            task_id = uuid.uuid4().hex
+            self._task_queue.submit(task_id, priority=priority)
+            task = TaskInfo(url=url, priority=priority, batch_id=batch_id, task_id=task_id)
+            self._tasks[task_id] = task
+            items[index]["task_id"] = task_id
+            task_ids.append(task_id)
+            self._events.publish(self.task_event(task))
+            if self._journal is not None:
+                self._journal.append(_task_record(task, self._journal_heavy_fields))
+
+        self._batches[batch_id] = BatchInfo(
+            task_ids=[item["task_id"] for item in items if "task_id" in item],
+            rejected=len(items) - len(task_ids),
+            remaining=len(task_ids),
+        )
+        if self._journal is not None:
+            self._journal.append(_batch_record(batch_id, self._batches[batch_id]))
+        return batch_id, items
+
+    def get_batch_info(self, batch_id: str) -> Optional[Tuple[BatchInfo, List[Optional[TaskInfo]]]]:
+        """
+        Devuelve el lote y sus tareas, en el orden recibido (None para las
+        ya olvidadas), o None si el lote no existe.
+        """
+        self._prune_tasks()
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+        return batch, [self._tasks.get(task_id) for task_id in batch.task_ids]
+
+    def cancel_task(self, task_id: str) -> Optional[TaskInfo]:
+        """
+        Cancela una tarea pendiente o en curso. Devuelve la tarea (con su
+        estado final si ya había terminado) o None si no existe.
+        """
+        task = self.get_task_info(task_id)
+        if task is None or task.finished:
+            return task
+
+        self._task_queue.cancel(task_id)
+        # Si estaba corriendo, _run_task recibe la cancelación; el estado
+        # se marca ya para que /status lo refleje enseguida.
+        self._finish_task(task_id, task, "cancelled")
+        return task
+
     async def _run_task(self, task_id: str) -> None:
         """
         Corrutina que ejecuta el pipeline completo para una tarea, actualizando
-        su estado en cada fase.
+        su estado en cada fase. La ejecutan los workers de la cola.
 
-        Estados: pending -> scraping -> processing -> completed/failed
+        Estados: pending -> scraping -> processing -> completed/failed/cancelled
         """
         task = self._tasks.get(task_id)
-        if task is None:
-            return  # puede haber sido borrada, etc.
+        if task is None or task.finished:
+            return  # puede haber sido borrada o cancelada, etc.
 
         try:
             await self._run_pipeline(task.url, job=task)
+        except asyncio.CancelledError:
+            # Al apagar, la tarea queda sin terminar en el journal y se
+            # vuelve a encolar en el próximo arranque
+            if not self._closing:
+                self._finish_task(task_id, task, "cancelled")
+            raise
         except (ScrapingError, HttpError) as exc:
-            task.status = "failed"
             task.error = str(exc)
+            self._finish_task(task_id, task, "failed")
         except Exception as exc:  # noqa: BLE001
             logging.exception("Error inesperado procesando tarea %s", task_id)
-            task.status = "failed"
             task.error = str(exc)
+            self._finish_task(task_id, task, "failed")
+        else:
+            self._finish_task(task_id, task, "completed")
 
     def get_task_info(self, task_id: str) -> Optional[TaskInfo]:
+        self._prune_tasks()
         return self._tasks.get(task_id)
 
+    def subscribe_events(
+        self,
+        task_ids: List[str],
+        batch_id: Optional[str] = None,
+    ) -> Optional[Tuple[Subscription, List[TaskInfo]]]:
+        """
+        Suscribe a los eventos de `task_ids`, del lote `batch_id` o (sin
+        ninguno) de todas las tareas. Devuelve la suscripción y el estado
+        actual de las tareas pedidas, o None si no existe ninguna.
+
+        La suscripción se crea antes de leer el estado, así no se pierde un
+        cambio que ocurra entre medio (a lo sumo llega repetido).
+        """
+        self._prune_tasks()
+        if batch_id is not None:
+            if batch_id not in self._batches:
+                return None
+            subscription = self._events.subscribe(batch_id=batch_id)
+            batch_tasks = (self._tasks.get(task_id) for task_id in self._batches[batch_id].task_ids)
+            return subscription, [task for task in batch_tasks if task is not None]
+
+        if task_ids:
+            snapshot = [self._tasks[task_id] for task_id in dict.fromkeys(task_ids) if task_id in self._tasks]
+            if not snapshot:
+                return None
+            return self._events.subscribe(task_ids=[task.task_id for task in snapshot]), snapshot
+
+        return self._events.subscribe(), []
+
+    def unsubscribe_events(self, subscription: Subscription) -> None:
+        self._events.unsubscribe(subscription)
+
+    def _set_task_status(self, task: TaskInfo, status: str) -> None:
+        """
+        Único lugar donde cambia el estado de una tarea: además de
+        actualizarlo, lo publica a los suscriptores de /events.
+        """
+        if task.status == status:
+            return
+        task.status = status
+        self._events.publish(self.task_event(task))
+
+    def _set_status(self, jobs: List[TaskInfo], status: str) -> None:
+        for job in jobs:
+            if not job.finished:  # por ejemplo, cancelada mientras esperaba
+                self._set_task_status(job, status)
+
+    def _finish_task(self, task_id: str, task: TaskInfo, status: str) -> None:
+        if task.finished and task_id in self._finished_tasks:
+            return
+        task.finished_at = datetime.utcnow()
+        task.progress = None
+        self._set_task_status(task, status)
+        self._finished_tasks[task_id] = time.monotonic()
+        if self._journal is not None:
+            record = {"op": "status", "id": task_id, "status": status, "finished_at": task.finished_at.isoformat()}
+            if task.error:
+                record["error"] = task.error
+            if status == "completed":
+                record["result"] = _journal_result(task.result, self._journal_heavy_fields)
+            self._journal.append(record)
+        self._prune_tasks()
+
+    async def _restore_tasks(self) -> None:
+        """
+        Reconstruye tareas y lotes desde el journal: las terminadas vuelven
+        con su resultado (y la antigüedad que tenían para --task-retention);
+        las que no habían terminado se vuelven a encolar como pendientes.
+        """
+        assert self._journal is not None
+        records, batch_records = await self._journal.load()
+
+        now_wall = datetime.utcnow()
+        now_mono = time.monotonic()
+        finished: List[Tuple[datetime, str]] = []
+        requeued = failed = 0
+        for task_id, record in records.items():
+            task = TaskInfo(
+                url=record["url"],
+                status=record.get("status", "pending"),
+                created_at=_parse_datetime(record.get("created_at")) or now_wall,
+                result=record.get("result"),
+                error=record.get("error"),
+                priority=int(record.get("priority", 0)),
+                finished_at=_parse_datetime(record.get("finished_at")),
+                batch_id=record.get("batch_id"),
+                task_id=task_id,
+            )
+            self._tasks[task_id] = task
+            if task.finished:
+                finished.append((task.finished_at or now_wall, task_id))
+                continue
+
+            task.status = "pending"
+            try:
+                self._task_queue.submit(task_id, priority=task.priority)
+                requeued += 1
+            except TaskQueueFull:
+                task.status = "failed"
+                task.error = "La cola estaba llena al recuperar la tarea tras un reinicio"
+                task.finished_at = now_wall
+                finished.append((now_wall, task_id))
+                failed += 1
+
+        for finished_at, task_id in sorted(finished):
+            age = max(0.0, (now_wall - finished_at).total_seconds())
+            self._finished_tasks[task_id] = now_mono - age
+
+        for batch_id, record in batch_records.items():
+            task_ids = [task_id for task_id in record.get("task_ids", []) if task_id in self._tasks]
+            if task_ids:
+                self._batches[batch_id] = BatchInfo(
+                    task_ids=list(record.get("task_ids", [])),
+                    rejected=int(record.get("rejected", 0)),
+                    created_at=_parse_datetime(record.get("created_at")) or now_wall,
+                    remaining=len(task_ids),
+                )
+
+        self._prune_tasks()
+        if records:
+            logging.info(
+                "Journal %s: %d tareas recuperadas (%d reencoladas, %d sin lugar en la cola)",
+                self._journal.path, len(records), requeued, failed,
+            )
+        # Arranca reescribiendo el journal con el estado recuperado
+        await self._journal.start()
+
+    def _journal_snapshot(self) -> List[Dict[str, Any]]:
+        """Estado completo de tareas y lotes, para compactar el journal."""
+        records = [_task_record(task, self._journal_heavy_fields) for task in self._tasks.values()]
+        records.extend(_batch_record(batch_id, batch) for batch_id, batch in self._batches.items())
+        return records
+
+    @staticmethod
+    def task_event(task: TaskInfo) -> Dict[str, Any]:
+        """Estado de una tarea tal como se publica en /events."""
+        event: Dict[str, Any] = {
+            "task_id": task.task_id,
+            "status": task.status,
+            "url": task.url,
+            "priority": task.priority,
+        }
+        if task.batch_id is not None:
+            event["batch_id"] = task.batch_id
+        if task.finished_at is not None:
+            event["finished_at"] = task.finished_at.replace(microsecond=0).isoformat() + "Z"
+        if task.status == "failed" and task.error:
+            event["error"] = task.error
+        if task.status == "completed":
+            event["result"] = task.result
+        return event
+
+    def _prune_tasks(self, now: Optional[float] = None) -> None:
+        """
+        Olvida las tareas terminadas hace más de task_retention_seconds y,
+        si hay más de max_finished_tasks, las más viejas.
+        """
+        now = time.monotonic() if now is None else now
+        while self._finished_tasks:
+            task_id, finished_at = next(iter(self._finished_tasks.items()))
+            if (
+                len(self._finished_tasks) <= self._max_finished_tasks
+                and finished_at + self._task_retention > now
+            ):
+                break
+            del self._finished_tasks[task_id]
+            task = self._tasks.pop(task_id, None)
+
+            # Un lote se olvida cuando ya no queda ninguna de sus tareas
+            batch = self._batches.get(task.batch_id) if task is not None and task.batch_id else None
+            if batch is not None:
+                batch.remaining -= 1
+                if batch.remaining <= 0:
+                    del self._batches[task.batch_id]
+
     # ------------------------------------------------------------------
     #  LÓGICA COMÚN: pipeline scraping + procesamiento (A+B)
     # ------------------------------------------------------------------
 
-    async def _run_pipeline(self, url: str, job: Optional[TaskInfo]) -> Dict[str, Any]:
+    async def _run_pipeline(
+        self,
+        url: str,
+        job: Optional[TaskInfo],
+        allow_stale: bool = False,
+        on_progress: Optional[Callable[[ProgressiveResult], None]] = None,
+    ) -> Dict[str, Any]:
         """
-        Ejecuta todo el pipeline:
+        Ejecuta todo el pipeline (`on_progress`, si se pasa, recibe el
+        ProgressiveResult del scraping para seguir sus secciones):
             - Cache lookup
+            - Stale-while-revalidate (si allow_stale y está configurado)
+            - Single-flight (se suma a un scraping en curso de la misma URL)
             - Rate limiting (si no hay caché)
             - Scraping HTML
             - Parsing
@@ -192,47 +813,145 @@ class ScraperService:
         if self._session is None:
             raise RuntimeError("ScraperService no inicializado. Falta llamar a start().")
 
-        now_ts = time.time()
-        cache_key = url
+        cache_key = normalize_url(url)
+
+        # 1) Caché (Opción 2): memoria y, si está configurada, disco
+        cached_result = await self._lookup_cache(cache_key)
+        if cached_result is not None:
+            if job is not None:
+                job.result = cached_result
+            return cached_result
+
+        if allow_stale and self._stale_window > 0:
+            stale = await self._lookup_stale(cache_key, max_staleness=self._stale_window)
+            if stale is not None:
+                self._swr_stats["served"] += 1
+                self._refresh_in_background(url, cache_key)
+                return {**stale[0], "stale": True}
+
+        # 2) Single-flight: si ya hay un scraping en curso de la misma URL
+        #    (normalizada), nos sumamos a él en lugar de lanzar otro.
+        if job is not None:
+            peers = [peer for peer in self._inflight.participants(cache_key) if not peer.finished]
+            if peers:
+                self._set_status([job], peers[0].status)
+
+        result = await self._join_flight(url, cache_key, job, on_progress)
+
+        if job is not None:
+            job.result = result
+
+        return result
+
+    async def _join_flight(
+        self,
+        url: str,
+        cache_key: str,
+        job: Optional[TaskInfo] = None,
+        on_progress: Optional[Callable[[ProgressiveResult], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Lanza el scraping de `url` o se suma al que ya esté en curso. Las
+        secciones que se van completando quedan en un ProgressiveResult
+        compartido por todos los que esperan ese scraping.
+        """
+        progress = self._progress.get(cache_key)
+        if progress is None or progress.finished:
+            progress = self._progress[cache_key] = ProgressiveResult()
+        if job is not None:
+            job.progress = progress
+        if on_progress is not None:
+            on_progress(progress)
+
+        try:
+            return await self._inflight.run(
+                cache_key,
+                lambda jobs: self._run_flight(url, cache_key, jobs, progress),
+                participant=job,
+            )
+        finally:
+            # Por si se sumó a un trabajo que terminaba y nadie va a cerrarlo
+            if cache_key not in self._inflight and self._progress.get(cache_key) is progress:
+                del self._progress[cache_key]
+
+    async def _run_flight(
+        self,
+        url: str,
+        cache_key: str,
+        jobs: List[TaskInfo],
+        progress: ProgressiveResult,
+    ) -> Dict[str, Any]:
+        """Trabajo compartido del single-flight: cierra `progress` al terminar."""
+        try:
+            return await self._scrape_and_process(url, cache_key, jobs, progress)
+        finally:
+            progress.finish()
+            if self._progress.get(cache_key) is progress:
+                del self._progress[cache_key]
 
-        # 1) Caché (Opción 2)
-        if self._cache_ttl_seconds > 0:
-            cached = self._cache.get(cache_key)
-            if cached is not None:
-                ts, cached_result = cached
-                if (now_ts - ts) < self._cache_ttl_seconds:
-                    # Resultado cacheado válido
-                    if job is not None:
-                        job.status = "completed"
-                        job.result = cached_result
-                    return cached_result
+    async def _scrape_and_process(
+        self,
+        url: str,
+        cache_key: str,
+        jobs: List[TaskInfo],
+        progress: Optional[ProgressiveResult] = None,
+    ) -> Dict[str, Any]:
+        """
+        Scraping + procesamiento de una URL sin resultado en caché. Corre una
+        sola vez por URL en curso; `jobs` son las tareas de la cola que
+        esperan este resultado (puede crecer mientras corre). Si se pasa
+        `progress`, cada sección se registra ahí apenas termina.
+        """
+        # Resultado vencido con ETag/Last-Modified: se revalida con un GET
+        # condicional y, si no cambió (304), no se reprocesa.
+        stale = await self._lookup_stale(cache_key)
 
-        # 2) Rate limiting (Opción 2) -> solo si NO usamos caché
-        self._check_rate_limit(url)
+        # Rate limiting (Opción 2) -> solo si NO usamos caché
+        await self._acquire_rate_limit(url)
 
         started_at = datetime.utcnow()
+        timestamp = started_at.replace(microsecond=0).isoformat() + "Z"
 
         async with self._semaphore:
             # 3) Scraping HTML
-            if job is not None:
-                job.status = "scraping"
-
-            html, final_url = await fetch_html(url, session=self._session,max_size_mb=self._max_html_size_mb)
-
-            # 4) Parsing HTML
-            scraping_data = extract_page_data(html, base_url=final_url)
+            self._set_status(jobs, "scraping")
+
+            fetched = await fetch_page(
+                url,
+                session=self._session,
+                max_size_mb=self._max_html_size_mb,
+                stream_parse=self._stream_parse,
+                validators=stale[1] if stale is not None else None,
+            )
+            if fetched.not_modified and stale is not None:
+                self._revalidation["not_modified"] += 1
+                await self._refresh_cache(cache_key, stale[0], fetched.validators)
+                return stale[0]
+            if stale is not None:
+                self._revalidation["modified"] += 1
+            final_url = fetched.url
+
+            # 4) Parsing HTML (una sola pasada: datos + señales para el análisis avanzado).
+            #    En modo stream ya se hizo durante la descarga.
+            if fetched.scraping_data is not None and fetched.page_signals is not None:
+                scraping_data, page_signals = fetched.scraping_data, fetched.page_signals
+            else:
+                scraping_data, page_signals = extract_page_bundle(fetched.html, base_url=final_url)
+
+            if progress is not None:
+                progress.set_scraping(final_url, timestamp, scraping_data)
 
             # 5) Procesamiento pesado en Servidor B
-            if job is not None:
-                job.status = "processing"
+            self._set_status(jobs, "processing")
 
             processing_data, processing_status = await self._request_processing_server(
                 final_url,
                 scraping_data,
-                html,
+                page_signals,
+                fetch_metrics=fetched.metrics,
+                on_stage=progress.add_stage if progress is not None else None,
             )
 
-        timestamp = started_at.replace(microsecond=0).isoformat() + "Z"
         status = "success"
 
         result: Dict[str, Any] = {
@@ -244,15 +963,94 @@ class ScraperService:
             "processing_status": processing_status,
         }
 
-        # Guardar en caché (Opción 2)
-        if self._cache_ttl_seconds > 0:
-            self._cache[cache_key] = (now_ts, result)
+        # Guardar en caché (Opción 2). Un "busy" es pasajero: cachearlo
+        # dejaría la página sin procesar durante todo el TTL
+        if processing_status != BUSY_STATUS:
+            await self._store_cache(cache_key, result, fetched.validators)
+        return result
 
-        if job is not None:
-            job.status = "completed"
-            job.result = result
+    async def _lookup_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        cached_result = self._cache.get(cache_key)
+        if cached_result is not None or self._disk_cache is None:
+            return cached_result
 
-        return result
+        try:
+            entry = await self._disk_cache.lookup_async(cache_key)
+        except sqlite3.Error as exc:
+            logging.warning("Error leyendo la caché en disco: %s", exc)
+            return None
+        if entry is None:
+            return None
+
+        cached_result, expires_at, validators = entry
+        self._cache.put(cache_key, cached_result, expires_at=expires_at, validators=validators)
+        return cached_result
+
+    def _refresh_in_background(self, url: str, cache_key: str) -> None:
+        """
+        Lanza el refresco de `url` sin esperarlo (si ya hay uno en curso
+        para la misma URL, no hace nada).
+        """
+        if cache_key in self._background or cache_key in self._inflight:
+            return
+
+        async def _refresh() -> None:
+            try:
+                await self._join_flight(url, cache_key)
+                self._swr_stats["refreshes"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                self._swr_stats["refresh_failures"] += 1
+                logging.warning("No se pudo refrescar %s en segundo plano: %s", url, exc)
+
+        task = asyncio.create_task(_refresh())
+        self._background[cache_key] = task
+        task.add_done_callback(lambda _: self._background.pop(cache_key, None))
+
+    async def _lookup_stale(
+        self, cache_key: str, max_staleness: Optional[float] = None
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+        stale = self._cache.get_stale(cache_key, max_staleness=max_staleness)
+        if stale is not None or self._disk_cache is None:
+            return stale
+        try:
+            return await self._disk_cache.lookup_stale_async(cache_key, max_staleness)
+        except sqlite3.Error as exc:
+            logging.warning("Error leyendo la caché en disco: %s", exc)
+            return None
+
+    async def _store_cache(
+        self,
+        cache_key: str,
+        result: Dict[str, Any],
+        validators: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self._cache.put(cache_key, result, validators=validators)
+        if self._disk_cache is not None:
+            try:
+                await self._disk_cache.put_async(cache_key, result, validators)
+            except sqlite3.Error as exc:
+                logging.warning("Error escribiendo la caché en disco: %s", exc)
+
+    async def _refresh_cache(
+        self,
+        cache_key: str,
+        result: Dict[str, Any],
+        validators: Optional[Dict[str, str]],
+    ) -> None:
+        """
+        Tras un 304: renueva el TTL del resultado en los dos niveles (si la
+        entrada ya no estaba en memoria, por ejemplo porque vino del disco,
+        se vuelve a guardar).
+        """
+        if self._cache.refresh(cache_key, validators=validators) is None:
+            self._cache.put(cache_key, result, validators=validators)
+        if self._disk_cache is not None:
+            try:
+                await self._disk_cache.refresh_async(cache_key, validators)
+            except sqlite3.Error as exc:
+                logging.warning("Error escribiendo la caché en disco: %s", exc)
 
     # ------------------------------------------------------------------
     #  Rate limiting y validación URL
@@ -266,36 +1064,23 @@ class ScraperService:
         if parsed.scheme not in ("http", "https") or not parsed.netloc:
             raise ScrapingError(f"URL inválida: {url!r}")
 
-    def _check_rate_limit(self, url: str) -> None:
+    async def _acquire_rate_limit(self, url: str) -> None:
         """
-        Aplica rate limiting por dominio (Opción 2).
-        Máximo N requests/minuto al mismo dominio.
+        Aplica rate limiting por dominio (Opción 2): máximo N requests/minuto
+        al mismo dominio. Según el modo, rechaza o espera turno (ver
+        scraper/rate_limiter.py).
         """
-        if self._rate_limit_per_minute is None or self._rate_limit_per_minute <= 0:
+        if self._rate_limiter is None:
             return
 
-        parsed = urlparse(url)
-        domain = parsed.netloc
+        domain = urlparse(url).netloc
         if not domain:
             return
 
-        now = time.time()
-        one_minute_ago = now - 60.0
-
-        timestamps = self._domain_requests.setdefault(domain, [])
-
-        # Limpiar timestamps viejos (> 1 minuto)
-        while timestamps and timestamps[0] < one_minute_ago:
-            timestamps.pop(0)
-
-        if len(timestamps) >= self._rate_limit_per_minute:
-            raise ScrapingError(
-                f"Rate limit excedido para dominio {domain!r}: "
-                f"{len(timestamps)} requests en el último minuto"
-            )
-
-        # Registramos la nueva request real (sin caché)
-        timestamps.append(now)
+        try:
+            await self._rate_limiter.acquire(domain)
+        except RateLimitExceeded as exc:
+            raise RateLimitError(str(exc), retry_after=exc.retry_after) from exc
 
     # ------------------------------------------------------------------
     #  Comunicación con Servidor B (asyncio + sockets)
@@ -305,19 +1090,32 @@ class ScraperService:
         self,
         url: str,
         scraping_data: Dict[str, Any],
-        html: str,
+        page_signals: Dict[str, Any],
+        fetch_metrics: Optional[Dict[str, Any]] = None,
+        on_stage: Optional[Callable[..., None]] = None,
     ) -> tuple[Dict[str, Any], str]:
         """
-        Se comunica con el servidor de procesamiento (Parte B) usando
-        sockets TCP asíncronos (asyncio.open_connection).
+        Se comunica con el servidor de procesamiento (Parte B) usando una de
+        las conexiones persistentes del pool (ver scraper/processing_client.py).
 
         Envía:
             - url
             - scraping_data
-            - html (para análisis avanzado, Bonus Opción 3)
+            - page_signals (para análisis avanzado, Bonus Opción 3); el HTML
+              ya no viaja: B no necesita parsearlo de nuevo
+            - fetch_metrics (tiempos y bytes de la descarga hecha por A)
+            - performance_mode ("reuse" o "cold")
 
         Devuelve:
             (processing_data, processing_status)
+
+        processing_status es "success", "partial" (alguna etapa falló o se
+        pasó de tiempo en el Servidor B), "busy" (todos los Servidores B
+        rechazaron la página por estar saturados) o "failed".
+
+        Con `on_stage`, se le pide a B que mande cada etapa apenas termina y
+        se llama on_stage(etapa, processing_data=...) o on_stage(etapa,
+        error=...) por cada una, antes de la respuesta final.
         """
         empty_processing: Dict[str, Any] = {
             "screenshot": None,
@@ -326,46 +1124,162 @@ class ScraperService:
             "advanced": None,
         }
 
-        try:
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(PROCESSING_SERVER_IP, PROCESSING_SERVER_PORT),
-                timeout=5,
-            )
+        request_payload: Dict[str, Any] = {
+            "action": "process_page",
+            "url": url,
+            "scraping_data": scraping_data,
+            "page_signals": page_signals,
+            "fetch_metrics": fetch_metrics,
+            "performance_mode": self._performance_mode,
+        }
 
-            request_payload: Dict[str, Any] = {
-                "action": "process_page",
-                "url": url,
-                "scraping_data": scraping_data,
-                "html": html,
-            }
+        # Modo parcial: las etapas llegan de a una y la respuesta final ya
+        # no las repite (un B viejo ignora el pedido y responde todo junto)
+        staged: Dict[str, Any] = {}
+
+        def _on_partial(message: Dict[str, Any]) -> None:
+            stage = message.get("stage")
+            values = message.get("processing_data")
+            if isinstance(values, dict):
+                values = _normalize_processing(values)
+                staged.update(values)
+                on_stage(stage, processing_data=values)
+            else:
+                on_stage(stage, error=str(message.get("error") or "error"))
+
+        if on_stage is not None:
+            request_payload["partial"] = True
 
-            await send_message_async(writer, request_payload)
-            response = await asyncio.wait_for(
-                read_message_async(reader),
+        try:
+            response = await self._processing_pool.request(
+                request_payload,
                 timeout=SCRAPING_TIMEOUT_SECONDS,
+                on_partial=_on_partial if on_stage is not None else None,
             )
 
-            writer.close()
-            await writer.wait_closed()
-
             if isinstance(response, dict) and response.get("status") == "success":
-                raw_processing = response.get("processing_data", {}) or {}
+                raw_processing = response.get("processing_data") or staged
                 result: Dict[str, Any] = {
-                    "screenshot": raw_processing.get("screenshot"),
-                    "performance": raw_processing.get("performance"),
-                    "thumbnails": raw_processing.get("thumbnails", []),
-                    "advanced": raw_processing.get("advanced"),
+                    **empty_processing,
+                    **_normalize_processing(raw_processing),
                 }
+                stage_errors = response.get("stage_errors") or {}
+                if stage_errors:
+                    # Algunas etapas fallaron: devolvemos lo que sí se pudo
+                    logging.warning("Procesamiento parcial de %s: %r", url, stage_errors)
+                    return result, "partial"
                 return result, "success"
 
+            if isinstance(response, dict) and response.get("status") == BUSY_STATUS:
+                logging.warning("Servidor de procesamiento ocupado; %s queda sin procesar", url)
+                return empty_processing, BUSY_STATUS
+
             logging.warning("Respuesta no exitosa del servidor de procesamiento: %r", response)
             return empty_processing, "failed"
 
+        except ProcessingBusyError as exc:
+            logging.warning("Servidor de procesamiento ocupado (%s); %s queda sin procesar", exc, url)
+            return empty_processing, BUSY_STATUS
         except (asyncio.TimeoutError, ConnectionRefusedError, OSError) as exc:
             logging.error("No se pudo contactar al servidor de procesamiento: %s", exc)
             return empty_processing, "failed"
 
 
+def _task_record(task: TaskInfo, heavy_fields: bool = True) -> Dict[str, Any]:
+    """
+    Registro "task" del journal con el estado completo de la tarea. Con
+    heavy_fields=False el resultado se guarda sin screenshot ni thumbnails.
+    """
+    record: Dict[str, Any] = {
+        "op": "task",
+        "id": task.task_id,
+        "url": task.url,
+        "priority": task.priority,
+        "created_at": task.created_at.isoformat(),
+        # Una tarea en curso se registra como pendiente: al recuperarla
+        # vuelve a la cola
+        "status": task.status if task.finished else "pending",
+    }
+    if task.batch_id is not None:
+        record["batch_id"] = task.batch_id
+    if task.finished:
+        if task.finished_at is not None:
+            record["finished_at"] = task.finished_at.isoformat()
+        if task.error:
+            record["error"] = task.error
+        if task.status == "completed":
+            record["result"] = _journal_result(task.result, heavy_fields)
+    return record
+
+
+def _journal_result(result: Optional[Dict[str, Any]], heavy_fields: bool) -> Optional[Dict[str, Any]]:
+    if heavy_fields or not isinstance(result, dict):
+        return result
+    return strip_heavy_fields(result)
+
+
+def _batch_record(batch_id: str, batch: BatchInfo) -> Dict[str, Any]:
+    return {
+        "op": "batch",
+        "id": batch_id,
+        "task_ids": batch.task_ids,
+        "rejected": batch.rejected,
+        "created_at": batch.created_at.isoformat(),
+    }
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _interleave_by_domain(entries: List[Tuple[int, str, int]]) -> List[Tuple[int, str, int]]:
+    """
+    Reordena (índice, url, prioridad) alternando dominios: a1, b1, c1, a2,
+    b2, ... Dentro de cada dominio se respeta el orden original.
+    """
+    by_domain: "OrderedDict[str, deque]" = OrderedDict()
+    for entry in entries:
+        domain = (urlparse(entry[1]).hostname or "").lower()
+        by_domain.setdefault(domain, deque()).append(entry)
+
+    ordered: List[Tuple[int, str, int]] = []
+    while by_domain:
+        for domain in list(by_domain):
+            queue = by_domain[domain]
+            ordered.append(queue.popleft())
+            if not queue:
+                del by_domain[domain]
+    return ordered
+
+
+def _normalize_processing(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Secciones de processing_data tal como llegan de B (completas o sólo
+    algunas), con las imágenes en base64.
+    """
+    result = dict(raw)
+    if "screenshot" in result:
+        result["screenshot"] = _as_base64(result["screenshot"])
+    if "thumbnails" in result:
+        result["thumbnails"] = [_as_base64(t) for t in result["thumbnails"] or []]
+    return result
+
+
+def _as_base64(value: Any) -> Any:
+    """
+    Por el protocolo v2 las imágenes llegan como bytes crudos; la respuesta
+    HTTP las expone en base64 como siempre.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
 # ----------------------------------------------------------------------
 #  Handlers HTTP (aiohttp.web)
 # ----------------------------------------------------------------------
@@ -380,6 +1294,10 @@ async def scrape_handler(request: web.Request) -> web.Response:
         POST /scrape  con JSON: {"url": "https://example.com"}
 
     Modo clásico: espera el scraping y procesamiento y devuelve todo el JSON.
+
+    Con ?stream=1 (o Accept: application/x-ndjson) responde NDJSON: primero
+    scraping_data y después cada sección del procesamiento apenas termina
+    (ver ScraperService.stream_url).
     """
     service: ScraperService = request.app["scraper_service"]
 
@@ -397,10 +1315,29 @@ async def scrape_handler(request: web.Request) -> web.Response:
             status=400,
         )
 
+    stream = (
+        request.rel_url.query.get("stream") == "1"
+        or "application/x-ndjson" in request.headers.get("Accept", "")
+    )
+
     try:
+        if stream:
+            # La primera sección se espera acá: si falla antes, el error
+            # sale con su código HTTP como en el modo clásico.
+            sections = service.stream_url(url)
+            first = await sections.__anext__()
+            return await _stream_sections(request, first, sections)
+
         result = await service.handle_url(url)
         return web.json_response(result, status=200)
 
+    except RateLimitError as exc:
+        logging.warning("Rate limit: %s", exc)
+        return web.json_response(
+            {"status": "error", "error": str(exc), "retry_after": round(exc.retry_after, 1)},
+            status=429,
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
     except ScrapingError as exc:
         logging.warning("Error de validación de URL: %s", exc)
         return web.json_response(
@@ -422,20 +1359,56 @@ async def scrape_handler(request: web.Request) -> web.Response:
         )
 
 
+async def _stream_sections(
+    request: web.Request,
+    first: Dict[str, Any],
+    sections: AsyncIterator[Dict[str, Any]],
+) -> web.StreamResponse:
+    """
+    Escribe las secciones como NDJSON (una por línea). Un error después de
+    enviar los headers llega como {"section": "error", "error": ...}.
+    """
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def _write(section: Dict[str, Any]) -> None:
+        await response.write(json.dumps(section, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    try:
+        await _write(first)
+        async for section in sections:
+            await _write(section)
+    except ConnectionResetError:
+        pass  # el cliente cerró la conexión
+    except Exception as exc:  # noqa: BLE001
+        logging.warning("Error en /scrape por secciones: %s", exc)
+        try:
+            await _write({"section": "error", "error": str(exc)})
+        except ConnectionResetError:
+            pass
+    finally:
+        await sections.aclose()
+    return response
+
+
 async def enqueue_task_handler(request: web.Request) -> web.Response:
     """
     Bonus Opción 1: crea una tarea en la cola y devuelve un task_id.
 
     Uso:
         POST /tasks
-        body JSON: {"url": "https://example.com"}
+        body JSON: {"url": "https://example.com", "priority": 0}
 
         Respuesta:
-            {"task_id": "...", "status": "pending"}
+            {"task_id": "...", "status": "pending", "priority": 0}
+
+    "priority" es opcional (mayor valor sale antes). Si la cola está llena
+    responde 429 con Retry-After.
     """
     service: ScraperService = request.app["scraper_service"]
 
     url = None
+    data: Any = None
     try:
         data = await request.json()
         url = data.get("url")
@@ -448,8 +1421,21 @@ async def enqueue_task_handler(request: web.Request) -> web.Response:
             status=400,
         )
 
+    priority = data.get("priority", 0) if isinstance(data, dict) else 0
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        return web.json_response(
+            {"status": "error", "error": "Campo 'priority' debe ser un entero"},
+            status=400,
+        )
+
     try:
-        task_id = service.create_task(url)
+        task_id = service.create_task(url, priority=priority)
+    except QueueFullError as exc:
+        return web.json_response(
+            {"status": "error", "error": str(exc), "retry_after": round(exc.retry_after, 1)},
+            status=429,
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
     except ScrapingError as exc:
         return web.json_response(
             {"status": "error", "error": str(exc)},
@@ -463,11 +1449,292 @@ async def enqueue_task_handler(request: web.Request) -> web.Response:
         )
 
     return web.json_response(
-        {"task_id": task_id, "status": "pending"},
+        {"task_id": task_id, "status": "pending", "priority": priority},
+        status=202,
+    )
+
+
+class _BatchTooLarge(Exception):
+    pass
+
+
+def _parse_batch_entry(entry: Any, default_priority: int) -> Tuple[str, int]:
+    """
+    Una entrada de lote: "https://..." o {"url": "...", "priority": n}.
+    Lanza ValueError si no tiene forma válida.
+    """
+    if isinstance(entry, str):
+        return entry, default_priority
+    if isinstance(entry, dict) and isinstance(entry.get("url"), str):
+        priority = entry.get("priority", default_priority)
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise ValueError("Campo 'priority' debe ser un entero")
+        return entry["url"], priority
+    raise ValueError("Cada entrada debe ser una URL o un objeto con 'url'")
+
+
+async def _read_batch_entries(request: web.Request, max_urls: int) -> List[Tuple[str, int]]:
+    """
+    Lee las URLs de un POST /tasks/batch:
+        - JSON: {"urls": [...], "priority": n} o directamente una lista.
+        - NDJSON (Content-Type application/x-ndjson): una entrada por línea
+          (string JSON, objeto o la URL sin comillas). Se lee de a líneas,
+          sin cargar el body completo.
+    Lanza ValueError si el formato es inválido y _BatchTooLarge si hay más
+    de max_urls entradas.
+    """
+    entries: List[Tuple[str, int]] = []
+
+    if request.content_type in ("application/x-ndjson", "application/jsonl"):
+        async for raw_line in request.content:
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            try:
+                entry: Any = json.loads(line)
+            except ValueError:
+                entry = line
+            entries.append(_parse_batch_entry(entry, 0))
+            if len(entries) > max_urls:
+                raise _BatchTooLarge()
+        return entries
+
+    data = await request.json()
+    default_priority = 0
+    if isinstance(data, dict):
+        default_priority = data.get("priority", 0)
+        if not isinstance(default_priority, int) or isinstance(default_priority, bool):
+            raise ValueError("Campo 'priority' debe ser un entero")
+        data = data.get("urls")
+    if not isinstance(data, list):
+        raise ValueError("Se esperaba una lista de URLs o un objeto con 'urls'")
+    if len(data) > max_urls:
+        raise _BatchTooLarge()
+    return [_parse_batch_entry(entry, default_priority) for entry in data]
+
+
+async def enqueue_batch_handler(request: web.Request) -> web.Response:
+    """
+    Crea una tarea por cada URL de un lote.
+
+    Uso:
+        POST /tasks/batch
+        body JSON: {"urls": ["https://a.com", {"url": "https://b.com", "priority": 5}]}
+        (o NDJSON con una URL por línea)
+
+        Respuesta:
+            {"batch_id": "...", "accepted": 2, "rejected": 0,
+             "tasks": [{"url": "...", "task_id": "..."}, ...]}
+
+    Las URLs inválidas no se encolan y aparecen con "error". El lote entra
+    completo o nada: si no hay lugar en la cola responde 429 con
+    Retry-After. Más de --batch-max-urls entradas: 413.
+    """
+    service: ScraperService = request.app["scraper_service"]
+    max_urls: int = request.app["batch_max_urls"]
+
+    try:
+        entries = await _read_batch_entries(request, max_urls)
+    except _BatchTooLarge:
+        return web.json_response(
+            {"status": "error", "error": f"El lote supera el máximo de {max_urls} URLs"},
+            status=413,
+        )
+    except ValueError as exc:  # incluye JSON inválido
+        return web.json_response(
+            {"status": "error", "error": str(exc) or "Body inválido"},
+            status=400,
+        )
+    if not entries:
+        return web.json_response(
+            {"status": "error", "error": "El lote no tiene URLs"},
+            status=400,
+        )
+
+    try:
+        batch_id, items = service.create_batch(entries)
+    except QueueFullError as exc:
+        return web.json_response(
+            {"status": "error", "error": str(exc), "retry_after": round(exc.retry_after, 1)},
+            status=429,
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
+    except ScrapingError as exc:
+        return web.json_response(
+            {"status": "error", "error": str(exc)},
+            status=400,
+        )
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Error inesperado al crear lote")
+        return web.json_response(
+            {"status": "error", "error": f"Error interno al crear lote: {exc}"},
+            status=500,
+        )
+
+    accepted = sum(1 for item in items if "task_id" in item)
+    return web.json_response(
+        {
+            "batch_id": batch_id,
+            "accepted": accepted,
+            "rejected": len(items) - accepted,
+            "tasks": items,
+        },
         status=202,
     )
 
 
+async def batch_status_handler(request: web.Request) -> web.Response:
+    """
+    Estado agregado de un lote.
+
+    GET /batches/{batch_id}        (?tasks=0 omite la lista de tareas)
+
+        {"batch_id": "...", "total": 3, "done": false,
+         "counts": {"pending": 1, "completed": 2},
+         "tasks": [{"task_id": "...", "url": "...", "status": "..."}, ...]}
+
+    Las tareas ya olvidadas (--task-retention) cuentan como "expired".
+    """
+    service: ScraperService = request.app["scraper_service"]
+    batch_id = request.match_info.get("batch_id", "")
+
+    found = service.get_batch_info(batch_id)
+    if found is None:
+        return web.json_response(
+            {"status": "error", "error": "Lote no encontrado"},
+            status=404,
+        )
+    batch, batch_tasks = found
+
+    counts: Dict[str, int] = {}
+    tasks: List[Dict[str, Any]] = []
+    for task_id, task in zip(batch.task_ids, batch_tasks):
+        status = task.status if task is not None else "expired"
+        counts[status] = counts.get(status, 0) + 1
+        entry: Dict[str, Any] = {"task_id": task_id, "status": status}
+        if task is not None:
+            entry["url"] = task.url
+            if task.status == "failed" and task.error:
+                entry["error"] = task.error
+        tasks.append(entry)
+
+    data: Dict[str, Any] = {
+        "batch_id": batch_id,
+        "created_at": batch.created_at.replace(microsecond=0).isoformat() + "Z",
+        "total": len(batch.task_ids),
+        "rejected": batch.rejected,
+        "done": all(status in FINISHED_STATUSES or status == "expired" for status in counts),
+        "counts": counts,
+    }
+    if request.query.get("tasks", "1") != "0":
+        data["tasks"] = tasks
+    return web.json_response(data, status=200)
+
+
+async def _write_sse(response: web.StreamResponse, event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> None:
+    message = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n" + message
+    await response.write(message.encode("utf-8"))
+
+
+async def events_handler(request: web.Request) -> web.StreamResponse:
+    """
+    Cambios de estado de las tareas en vivo (Server-Sent Events), en lugar
+    de consultar /status y /result.
+
+    GET /events?task_id=ID[&task_id=ID2...]   una o varias tareas
+    GET /events?batch_id=ID                    todas las tareas de un lote
+    GET /events                                todas las tareas
+    (&results=0 no incluye el resultado en los eventos "completed")
+
+    Primero se envía el estado actual de cada tarea pedida y después un
+    evento "status" por cada cambio; el de "completed" trae el resultado.
+    Cuando terminan todas las tareas pedidas se envía "end" y se cierra.
+    Si el cliente no lee a tiempo, recibe "overflow" y se cierra.
+    """
+    service: ScraperService = request.app["scraper_service"]
+    task_ids = request.query.getall("task_id", [])
+    batch_id = request.query.get("batch_id")
+    include_results = request.query.get("results", "1") != "0"
+
+    found = service.subscribe_events(task_ids, batch_id=batch_id)
+    if found is None:
+        return web.json_response(
+            {"status": "error", "error": "Task o lote no encontrado"},
+            status=404,
+        )
+    subscription, snapshot = found
+
+    last_status: Dict[str, str] = {}
+
+    async def _send(event: Dict[str, Any]) -> None:
+        if last_status.get(event["task_id"]) == event["status"]:
+            return  # repetido (estado inicial + evento ya en la cola)
+        last_status[event["task_id"]] = event["status"]
+        # El evento es compartido entre suscriptores: no se modifica
+        data = {
+            key: value
+            for key, value in event.items()
+            if key != "id" and (include_results or key != "result")
+        }
+        await _write_sse(response, "status", data, event.get("id"))
+
+    response = web.StreamResponse(
+        headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+    )
+    try:
+        await response.prepare(request)
+        for task in snapshot:
+            await _send(service.task_event(task))
+
+        while subscription.wants_all or any(
+            status not in FINISHED_STATUSES for status in last_status.values()
+        ):
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await response.write(b": ping\n\n")
+                continue
+            if event.get("event") == "overflow":
+                await _write_sse(response, "overflow", {"error": "Cliente demasiado lento; volver a suscribirse"})
+                break
+            await _send(event)
+        else:
+            await _write_sse(response, "end", {"tasks": len(last_status)})
+    except ConnectionResetError:
+        pass  # el cliente cerró la conexión
+    finally:
+        service.unsubscribe_events(subscription)
+    return response
+
+
+async def cancel_task_handler(request: web.Request) -> web.Response:
+    """
+    Cancela una tarea pendiente o en curso.
+
+    DELETE /tasks/{task_id}
+
+    404 si no existe; 409 si ya había terminado (devuelve su estado).
+    """
+    service: ScraperService = request.app["scraper_service"]
+    task_id = request.match_info.get("task_id", "")
+
+    status_before = getattr(service.get_task_info(task_id), "status", None)
+    task = service.cancel_task(task_id)
+    if task is None:
+        return web.json_response(
+            {"status": "error", "error": "Task no encontrada"},
+            status=404,
+        )
+    if status_before in FINISHED_STATUSES:
+        return web.json_response(
+            {"task_id": task_id, "status": task.status, "error": "La tarea ya había terminado"},
+            status=409,
+        )
+    return web.json_response({"task_id": task_id, "status": task.status}, status=200)
+
+
 async def task_status_handler(request: web.Request) -> web.Response:
     """
     Bonus Opción 1: consulta el estado de una tarea.
@@ -489,7 +1756,12 @@ async def task_status_handler(request: web.Request) -> web.Response:
         "status": task.status,
         "url": task.url,
         "created_at": task.created_at.replace(microsecond=0).isoformat() + "Z",
+        "priority": task.priority,
     }
+    if task.batch_id is not None:
+        data["batch_id"] = task.batch_id
+    if task.finished_at is not None:
+        data["finished_at"] = task.finished_at.replace(microsecond=0).isoformat() + "Z"
     if task.status == "failed" and task.error:
         data["error"] = task.error
 
@@ -500,7 +1772,11 @@ async def task_result_handler(request: web.Request) -> web.Response:
     """
     Bonus Opción 1: obtiene el resultado de una tarea.
 
-    GET /result/{task_id}
+    GET /result/{task_id}[?partial=1]
+
+    Con partial=1, mientras la tarea corre se devuelven las secciones ya
+    terminadas en "partial_result" (scraping_data primero, luego cada
+    sección de processing_data).
     """
     service: ScraperService = request.app["scraper_service"]
     task_id = request.match_info.get("task_id", "")
@@ -513,15 +1789,15 @@ async def task_result_handler(request: web.Request) -> web.Response:
         )
 
     if task.status != "completed":
-        return web.json_response(
-            {
-                "task_id": task_id,
-                "status": task.status,
-                "url": task.url,
-                "message": "La tarea aún no está completada",
-            },
-            status=202,
-        )
+        data: Dict[str, Any] = {
+            "task_id": task_id,
+            "status": task.status,
+            "url": task.url,
+            "message": "La tarea aún no está completada",
+        }
+        if request.rel_url.query.get("partial") == "1" and task.progress is not None:
+            data["partial_result"] = task.progress.snapshot()
+        return web.json_response(data, status=202)
 
     return web.json_response(
         {
@@ -541,11 +1817,26 @@ async def health_handler(_: web.Request) -> web.Response:
     return web.json_response({"status": "ok"})
 
 
+async def stats_handler(request: web.Request) -> web.Response:
+    """
+    Métricas internas del servidor: GET /stats
+    """
+    service: ScraperService = request.app["scraper_service"]
+    return web.json_response(await service.stats())
+
+
 # ----------------------------------------------------------------------
 #  Arranque del servidor
 # ----------------------------------------------------------------------
 
 
+def _processing_server_arg(value: str) -> Tuple[str, int]:
+    try:
+        return parse_address(value, PROCESSING_SERVER_PORT)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Servidor de Scraping Web Asíncrono"
@@ -577,19 +1868,196 @@ def parse_args() -> argparse.Namespace:
         default=60,
         help="Máximo de requests por minuto por dominio (0 = sin límite, default: 60)",
     )
+    parser.add_argument(
+        "--rate-limit-burst",
+        type=int,
+        default=None,
+        help="Requests seguidas permitidas a un dominio antes de espaciarlas "
+        "(default: igual a --rate-limit)",
+    )
+    parser.add_argument(
+        "--rate-limit-mode",
+        choices=RATE_LIMIT_MODES,
+        default=DEFAULT_RATE_LIMIT_MODE,
+        help="Qué hacer al superar el límite: 'reject' responde 429, 'queue' "
+        f"espera turno en una cola por dominio (default: {DEFAULT_RATE_LIMIT_MODE})",
+    )
+    parser.add_argument(
+        "--rate-limit-max-wait",
+        type=float,
+        default=DEFAULT_MAX_WAIT_SECONDS,
+        help="En modo 'queue', espera máxima en segundos antes de responder 429 "
+        f"(default: {DEFAULT_MAX_WAIT_SECONDS:g})",
+    )
     parser.add_argument(
         "--cache-ttl",
         type=int,
         default=DEFAULT_CACHE_TTL_SECONDS,
         help="TTL de la caché en segundos (0 = sin caché, default: 3600)",
     )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=DEFAULT_CACHE_MAX_BYTES / (1024 * 1024),
+        help="Memoria máxima (estimada) de la caché en MB; al pasarse se "
+        f"descartan los resultados menos usados (default: {DEFAULT_CACHE_MAX_BYTES // (1024 * 1024)})",
+    )
+    parser.add_argument(
+        "--cache-skip-heavy",
+        action="store_true",
+        help="No guardar screenshot ni thumbnails en la caché (se cachea el resto)",
+    )
+    parser.add_argument(
+        "--cache-stale-retention",
+        type=float,
+        default=DEFAULT_STALE_RETENTION_SECONDS,
+        help="Segundos que se conserva un resultado vencido con ETag/Last-Modified "
+        f"para revalidarlo con un GET condicional (default: {DEFAULT_STALE_RETENTION_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--stale-while-revalidate",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="/scrape devuelve al instante un resultado vencido hace menos de "
+        "SECONDS (marcado \"stale\": true) y lo refresca en segundo plano (default: 0, desactivado)",
+    )
+    parser.add_argument(
+        "--disk-cache",
+        metavar="PATH",
+        default=None,
+        help="Archivo SQLite para una caché persistente, compartida entre "
+        "reinicios e instancias del servidor (default: sin caché en disco)",
+    )
+    parser.add_argument(
+        "--disk-cache-max-mb",
+        type=float,
+        default=DEFAULT_DISK_CACHE_MAX_BYTES / (1024 * 1024),
+        help="Tamaño máximo de la caché en disco en MB "
+        f"(default: {DEFAULT_DISK_CACHE_MAX_BYTES // (1024 * 1024)})",
+    )
+    parser.add_argument(
+        "--task-workers",
+        type=int,
+        default=None,
+        help="Workers que atienden la cola de /tasks (default: igual a --workers)",
+    )
+    parser.add_argument(
+        "--task-queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="Máximo de tareas esperando en la cola; con la cola llena POST /tasks "
+        f"responde 429 (default: {DEFAULT_QUEUE_SIZE})",
+    )
+    parser.add_argument(
+        "--task-retention",
+        type=float,
+        default=DEFAULT_TASK_RETENTION_SECONDS,
+        help="Segundos que se conserva una tarea terminada (estado y resultado) "
+        f"(default: {DEFAULT_TASK_RETENTION_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--task-max-finished",
+        type=int,
+        default=DEFAULT_MAX_FINISHED_TASKS,
+        help="Máximo de tareas terminadas guardadas; se borran las más viejas "
+        f"(default: {DEFAULT_MAX_FINISHED_TASKS})",
+    )
+    parser.add_argument(
+        "--batch-max-urls",
+        type=int,
+        default=DEFAULT_BATCH_MAX_URLS,
+        help="Máximo de URLs por POST /tasks/batch; más responde 413 "
+        f"(default: {DEFAULT_BATCH_MAX_URLS})",
+    )
+    parser.add_argument(
+        "--task-journal",
+        default=None,
+        help="Archivo JSONL donde persistir la cola de tareas; al reiniciar se "
+        "recuperan los resultados y se reencolan las pendientes (default: desactivado)",
+    )
+    parser.add_argument(
+        "--task-journal-flush-ms",
+        type=float,
+        default=DEFAULT_FLUSH_INTERVAL_SECONDS * 1000,
+        help="Cada cuántos ms se escribe y hace fsync del journal; un crash pierde "
+        f"como mucho ese intervalo (default: {DEFAULT_FLUSH_INTERVAL_SECONDS * 1000:g})",
+    )
     parser.add_argument(
         "--max-html-size",
         type=float,
         default=DEFAULT_MAX_HTML_SIZE_MB,
         help="Tamaño máximo de HTML en MB (default: 10.0)",
-    ) 
-    return parser.parse_args()
+    )
+    parser.add_argument(
+        "--processing-server",
+        action="append",
+        type=_processing_server_arg,
+        default=None,
+        metavar="HOST:PUERTO",
+        help="Servidor de procesamiento; repetir para repartir la carga entre varios "
+        f"(default: {PROCESSING_SERVER_IP}:{PROCESSING_SERVER_PORT})",
+    )
+    parser.add_argument(
+        "--processing-broker",
+        type=_processing_server_arg,
+        default=None,
+        metavar="HOST:PUERTO",
+        help="Modo pull: escuchar acá a los servidores de procesamiento lanzados con "
+        "--pull, que piden trabajo cuando tienen lugar (excluye --processing-server)",
+    )
+    parser.add_argument(
+        "--processing-eject-after",
+        type=int,
+        default=DEFAULT_EJECT_AFTER,
+        help="Fallas seguidas para dejar de usar un servidor de procesamiento "
+        f"(default: {DEFAULT_EJECT_AFTER})",
+    )
+    parser.add_argument(
+        "--processing-eject-seconds",
+        type=float,
+        default=DEFAULT_EJECT_SECONDS,
+        help="Segundos que un servidor expulsado queda afuera antes de probarlo con un ping; "
+        f"se duplica si sigue fallando (default: {DEFAULT_EJECT_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--processing-pool-size",
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help=f"Conexiones persistentes con el servidor de procesamiento (default: {DEFAULT_POOL_SIZE})",
+    )
+    parser.add_argument(
+        "--processing-idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT_SECONDS,
+        help="Segundos sin uso antes de cerrar una conexión con el servidor de "
+        f"procesamiento (0 = nunca, default: {DEFAULT_IDLE_TIMEOUT_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--processing-health-interval",
+        type=float,
+        default=DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+        help="Cada cuántos segundos se hace ping a las conexiones ociosas "
+        f"(0 = sin health checks, default: {DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--performance-mode",
+        choices=PERFORMANCE_MODES,
+        default=DEFAULT_PERFORMANCE_MODE,
+        help="reuse: el servidor de procesamiento usa los tiempos medidos al "
+        "descargar la página; cold: vuelve a descargarla para medir (default: reuse)",
+    )
+    parser.add_argument(
+        "--html-parser",
+        choices=HTML_PARSERS,
+        default=DEFAULT_HTML_PARSER,
+        help="stream: parsea el HTML mientras se descarga, sin guardarlo completo; "
+        "soup: descarga todo y parsea con BeautifulSoup (default: stream)",
+    )
+    args = parser.parse_args()
+    if args.processing_broker and args.processing_server:
+        parser.error("--processing-broker y --processing-server no se pueden combinar")
+    return args
 
 
 def create_app(
@@ -597,18 +2065,69 @@ def create_app(
     rate_limit: int,
     cache_ttl: int,
     max_html_size: float,
+    rate_limit_burst: Optional[int] = None,
+    rate_limit_mode: str = DEFAULT_RATE_LIMIT_MODE,
+    rate_limit_max_wait: float = DEFAULT_MAX_WAIT_SECONDS,
+    processing_pool_size: int = DEFAULT_POOL_SIZE,
+    processing_idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+    processing_health_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+    performance_mode: str = DEFAULT_PERFORMANCE_MODE,
+    html_parser: str = DEFAULT_HTML_PARSER,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    cache_heavy_fields: bool = True,
+    disk_cache_path: Optional[str] = None,
+    disk_cache_max_bytes: int = DEFAULT_DISK_CACHE_MAX_BYTES,
+    cache_stale_retention: float = DEFAULT_STALE_RETENTION_SECONDS,
+    stale_while_revalidate: float = 0.0,
+    task_workers: Optional[int] = None,
+    task_queue_size: int = DEFAULT_QUEUE_SIZE,
+    task_retention_seconds: float = DEFAULT_TASK_RETENTION_SECONDS,
+    max_finished_tasks: int = DEFAULT_MAX_FINISHED_TASKS,
+    batch_max_urls: int = DEFAULT_BATCH_MAX_URLS,
+    task_journal_path: Optional[str] = None,
+    task_journal_flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+    processing_servers: Optional[List[Tuple[str, int]]] = None,
+    processing_eject_after: int = DEFAULT_EJECT_AFTER,
+    processing_eject_seconds: float = DEFAULT_EJECT_SECONDS,
+    processing_broker: Optional[Tuple[str, int]] = None,
 ) -> web.Application:
     app = web.Application()
     scraper_service = ScraperService(
         workers=workers,
         rate_limit_per_minute=rate_limit,
+        rate_limit_burst=rate_limit_burst,
+        rate_limit_mode=rate_limit_mode,
+        rate_limit_max_wait=rate_limit_max_wait,
         cache_ttl_seconds=cache_ttl,
         max_html_size_mb=max_html_size,
+        processing_pool_size=processing_pool_size,
+        processing_idle_timeout=processing_idle_timeout,
+        processing_health_interval=processing_health_interval,
+        performance_mode=performance_mode,
+        html_parser=html_parser,
+        cache_max_bytes=cache_max_bytes,
+        cache_heavy_fields=cache_heavy_fields,
+        disk_cache_path=disk_cache_path,
+        disk_cache_max_bytes=disk_cache_max_bytes,
+        cache_stale_retention=cache_stale_retention,
+        stale_while_revalidate=stale_while_revalidate,
+        task_workers=task_workers,
+        task_queue_size=task_queue_size,
+        task_retention_seconds=task_retention_seconds,
+        max_finished_tasks=max_finished_tasks,
+        task_journal_path=task_journal_path,
+        task_journal_flush_interval=task_journal_flush_interval,
+        processing_servers=processing_servers,
+        processing_eject_after=processing_eject_after,
+        processing_eject_seconds=processing_eject_seconds,
+        processing_broker=processing_broker,
     )
     app["scraper_service"] = scraper_service
+    app["batch_max_urls"] = max(1, int(batch_max_urls))
 
     # Rutas
     app.router.add_get("/", health_handler)
+    app.router.add_get("/stats", stats_handler)
 
     # Parte A (modo sin cola)
     app.router.add_get("/scrape", scrape_handler)
@@ -616,6 +2135,10 @@ def create_app(
 
     # Bonus Opción 1 (cola de tareas)
     app.router.add_post("/tasks", enqueue_task_handler)
+    app.router.add_post("/tasks/batch", enqueue_batch_handler)
+    app.router.add_get("/batches/{batch_id}", batch_status_handler)
+    app.router.add_get("/events", events_handler)
+    app.router.add_delete("/tasks/{task_id}", cancel_task_handler)
     app.router.add_get("/status/{task_id}", task_status_handler)
     app.router.add_get("/result/{task_id}", task_result_handler)
 
@@ -647,8 +2170,33 @@ def main() -> None:
     app = create_app(
         workers=args.workers,
         rate_limit=args.rate_limit,
+        rate_limit_burst=args.rate_limit_burst,
+        rate_limit_mode=args.rate_limit_mode,
+        rate_limit_max_wait=args.rate_limit_max_wait,
         cache_ttl=args.cache_ttl,
         max_html_size=args.max_html_size,
+        processing_pool_size=args.processing_pool_size,
+        processing_idle_timeout=args.processing_idle_timeout,
+        processing_health_interval=args.processing_health_interval,
+        performance_mode=args.performance_mode,
+        html_parser=args.html_parser,
+        cache_max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        cache_heavy_fields=not args.cache_skip_heavy,
+        disk_cache_path=args.disk_cache,
+        disk_cache_max_bytes=int(args.disk_cache_max_mb * 1024 * 1024),
+        cache_stale_retention=args.cache_stale_retention,
+        stale_while_revalidate=args.stale_while_revalidate,
+        task_workers=args.task_workers,
+        task_queue_size=args.task_queue_size,
+        task_retention_seconds=args.task_retention,
+        max_finished_tasks=args.task_max_finished,
+        batch_max_urls=args.batch_max_urls,
+        task_journal_path=args.task_journal,
+        task_journal_flush_interval=args.task_journal_flush_ms / 1000,
+        processing_servers=args.processing_server,
+        processing_eject_after=args.processing_eject_after,
+        processing_eject_seconds=args.processing_eject_seconds,
+        processing_broker=args.processing_broker,
     )
 
     web.run_app(app, host=args.ip, port=args.port)
@@ -9,15 +9,70 @@ las funciones puras de los módulos:
 - analyze_performance (performance.py)
 - generate_thumbnails (image_processor.py)
 - analyze_advanced (advanced_analysis.py)
+- BrowserPool (browser_pool.py) con FakeDriver, sin Chrome
+- ImageFetcher (image_fetcher.py) contra un servidor aiohttp local
+
+y el handler de server_processing.py levantado en un puerto efímero.
 """
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import concurrent.futures
+import io
+import socket
+import struct
+import threading
+import time
 import unittest
 
 from processor.performance import analyze_performance
 from processor.image_processor import generate_thumbnails
 from processor.advanced_analysis import analyze_advanced
+from common.html_parser import extract_page_bundle, extract_page_data
+from processor.browser_pool import BrowserPool, FakeDriver
+from processor.image_fetcher import ImageFetcher
+from processor.image_processor import ThumbnailOptions, make_thumbnail, thumbnails_from_blobs
+from processor import screenshot
+from common.protocol import (
+    PROTOCOL_BINARY,
+    FrameTooLargeError,
+    WireFormat,
+    encode_frame,
+    hello_message,
+    read_message,
+    read_message_async,
+    send_message,
+    send_message_async,
+    wire_from_hello_reply,
+)
+from server_processing import (
+    AdmissionControl,
+    AsyncProcessingServer,
+    PageStage,
+    ProcessingRequestHandler,
+    ProcessingTCPServer,
+    PullWorker,
+    StageContext,
+    THREAD_EXECUTOR,
+    run_page_stages,
+    run_page_stages_async,
+)
+
+
+def _sleepy_stage(job):
+    time.sleep(0.3)
+    return job["url"]
+
+
+def _failing_stage(job):
+    raise RuntimeError("boom")
+
+
+def _stuck_stage(job):
+    time.sleep(1.0)
+    return "tarde"
 
 
 class ProcessorTests(unittest.TestCase):
@@ -46,6 +101,31 @@ class ProcessorTests(unittest.TestCase):
         if result["num_requests"] is not None:
             self.assertIsInstance(result["num_requests"], int)
 
+    def test_analyze_performance_from_fetch_metrics(self) -> None:
+        """
+        Con las métricas que mide el Servidor A no se vuelve a descargar la
+        página: sólo se calculan las métricas derivadas.
+        """
+        metrics = {
+            "dns_ms": 3.0,
+            "connect_ms": 10.0,
+            "ttfb_ms": 120.0,
+            "download_ms": 500.0,
+            "total_ms": 620.4,
+            "bytes": 51200,
+            "redirects": 1,
+            "connection_reused": False,
+        }
+        # URL inválida: si intentara descargar, los valores serían None
+        result = analyze_performance("http://invalid.invalid", fetch_metrics=metrics)
+
+        self.assertEqual(result["load_time_ms"], 620)
+        self.assertEqual(result["total_size_kb"], 50.0)
+        self.assertEqual(result["num_requests"], 2)
+        self.assertEqual(result["timing"]["ttfb_ms"], 120.0)
+        self.assertEqual(result["throughput_kbps"], 100.0)
+        self.assertEqual(result["source"], "scraper")
+
     def test_generate_thumbnails_empty_list(self) -> None:
         """
         Si scraping_data no tiene imágenes, generate_thumbnails debe retornar [].
@@ -58,6 +138,102 @@ class ProcessorTests(unittest.TestCase):
         self.assertIsInstance(thumbs, list)
         self.assertEqual(len(thumbs), 0)
 
+    def test_image_fetcher_limits_and_sniffing(self) -> None:
+        """
+        ImageFetcher descarga en paralelo con límite por host, descarta lo
+        que no es imagen o es demasiado grande, y los bytes se convierten
+        en thumbnails aparte.
+        """
+        from aiohttp import web
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), color=(10, 20, 30)).save(buffer, format="JPEG")
+        jpeg_bytes = buffer.getvalue()
+
+        async def _test() -> None:
+            active = 0
+            max_active = 0
+
+            async def image(request: web.Request) -> web.Response:
+                nonlocal active, max_active
+                active += 1
+                max_active = max(max_active, active)
+                await asyncio.sleep(0.05)
+                active -= 1
+                # Content-Type mentiroso: se detecta por los bytes
+                return web.Response(body=jpeg_bytes, content_type="text/plain")
+
+            async def not_image(request: web.Request) -> web.Response:
+                return web.Response(text="<html>404</html>", content_type="image/png")
+
+            async def huge(request: web.Request) -> web.Response:
+                return web.Response(body=jpeg_bytes + b"0" * 1024)
+
+            app = web.Application()
+            app.router.add_get("/img/{n}", image)
+            app.router.add_get("/not-image", not_image)
+            app.router.add_get("/huge", huge)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            base = f"http://127.0.0.1:{port}"
+
+            fetcher = ImageFetcher(per_host_limit=2, max_bytes=len(jpeg_bytes))
+            try:
+                urls = [f"{base}/img/{n}" for n in range(6)]
+                urls += [f"{base}/not-image", f"{base}/huge"]
+                blobs = await fetcher.fetch_many(urls)
+                # Sin descargas en curso no queda ningún semáforo por host
+                self.assertEqual(fetcher._host_semaphores, {})
+            finally:
+                await fetcher.close()
+                await runner.cleanup()
+
+            self.assertEqual([b.url for b in blobs], urls[:6])
+            self.assertTrue(all(b.format == "JPEG" for b in blobs))
+            self.assertLessEqual(max_active, 2)
+
+            thumbs, stats = thumbnails_from_blobs(blobs[:2])
+            self.assertEqual(len(thumbs), 2)
+            self.assertEqual(len(stats), 2)
+
+        asyncio.run(_test())
+
+    def test_make_thumbnail_draft_decode_and_formats(self) -> None:
+        """
+        Los JPEG grandes se decodifican ya reducidos (draft), se respeta el
+        formato de salida pedido y no se pierde la transparencia si el
+        formato la soporta.
+        """
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (1600, 1200), color=(200, 10, 10)).save(buffer, format="JPEG")
+        jpeg_bytes = buffer.getvalue()
+
+        thumb, stats = make_thumbnail(jpeg_bytes, ThumbnailOptions(format="WEBP", quality=60))
+        self.assertEqual(stats["source_size"], [1600, 1200])
+        self.assertLess(stats["decoded_size"][0], 1600)  # draft() redujo al decodificar
+        self.assertEqual(stats["output_size"], [200, 150])
+        self.assertEqual(stats["output_format"], "WEBP")
+        for key in ("decode_ms", "resize_ms", "encode_ms"):
+            self.assertGreaterEqual(stats[key], 0)
+        decoded = Image.open(io.BytesIO(base64.b64decode(thumb)))
+        self.assertEqual(decoded.format, "WEBP")
+
+        buffer = io.BytesIO()
+        Image.new("RGBA", (400, 400), color=(0, 0, 0, 0)).save(buffer, format="PNG")
+        thumb, stats = make_thumbnail(buffer.getvalue(), ThumbnailOptions(format="PNG"))
+        decoded = Image.open(io.BytesIO(base64.b64decode(thumb)))
+        self.assertEqual(decoded.mode, "RGBA")
+
+        thumb, stats = make_thumbnail(buffer.getvalue(), ThumbnailOptions(format="JPEG"))
+        decoded = Image.open(io.BytesIO(base64.b64decode(thumb)))
+        self.assertEqual(decoded.mode, "RGB")
+
     def test_analyze_advanced_with_sample_html(self) -> None:
         """
         Probamos analyze_advanced con un HTML sintético que incluye:
@@ -135,6 +311,605 @@ class ProcessorTests(unittest.TestCase):
         self.assertEqual(acc["total_images"], 2)
         self.assertEqual(acc["images_with_alt"], 1)
 
+    def test_analyze_advanced_from_page_signals(self) -> None:
+        """
+        Con las señales que arma el Servidor A en su única pasada de parsing
+        el resultado es el mismo que parseando el HTML en el Servidor B.
+        """
+        sample_html = """
+        <html><head>
+            <title>T</title>
+            <meta name="generator" content="WordPress 6.4">
+            <meta name="description" content="desc">
+            <script type="application/ld+json">{"@context": "https://schema.org", "@type": "Article", "headline": "H"}</script>
+            <script type="application/ld+json">{not json}</script>
+            <script>window.jQuery = {};</script>
+            <link rel="stylesheet" href="/css/bootstrap.min.css">
+        </head><body>
+            <h1>T</h1><h2>a</h2>
+            <img src="a.png" alt="a"><img src="b.png" alt=" "><img alt="sin src">
+        </body></html>
+        """
+        scraping_data, signals = extract_page_bundle(sample_html, "https://example.com/")
+        self.assertEqual(scraping_data, extract_page_data(sample_html, "https://example.com/"))
+
+        from_html = analyze_advanced("https://example.com", scraping_data, sample_html)
+        from_signals = analyze_advanced("https://example.com", scraping_data, signals=signals)
+        self.assertEqual(from_signals, from_html)
+
+        self.assertEqual(from_signals["technologies"]["cms"], "WordPress")
+        self.assertEqual(from_signals["technologies"]["frameworks_js"], ["jQuery"])
+        self.assertEqual(from_signals["structured_data"]["json_ld_count"], 2)
+        self.assertEqual(from_signals["structured_data"]["examples"], [{"@type": "Article", "headline": "H"}])
+        self.assertEqual(from_signals["accessibility"]["total_images"], 3)
+        self.assertEqual(from_signals["accessibility"]["images_with_alt"], 2)
+
+    def test_browser_pool_reuses_and_recycles(self) -> None:
+        """
+        El navegador se lanza una vez, se reutiliza y se recicla después de
+        max_pages páginas.
+        """
+        drivers: list[FakeDriver] = []
+
+        def factory() -> FakeDriver:
+            drivers.append(FakeDriver(ready_after_polls=2))
+            return drivers[-1]
+
+        pool = BrowserPool(factory, max_pages=2)
+        pool.warm_up()
+        self.assertEqual(pool.launches, 1)
+
+        started = time.monotonic()
+        for n in range(3):
+            png = pool.capture(f"https://example.com/{n}", 320, 240)
+            self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertLess(time.monotonic() - started, 2.0)  # sin sleep fijo
+
+        self.assertEqual(pool.launches, 2)
+        self.assertTrue(drivers[0].quit_called)
+        self.assertEqual(
+            drivers[0].visited,
+            ["https://example.com/0", "about:blank", "https://example.com/1"],
+        )
+        pool.close()
+        self.assertTrue(drivers[1].quit_called)
+
+    def test_browser_pool_relaunches_after_crash(self) -> None:
+        """
+        Si el navegador se cae en medio de una página, se relanza y se
+        reintenta.
+        """
+        drivers: list[FakeDriver] = []
+
+        def factory() -> FakeDriver:
+            crash = 1 if not drivers else None
+            drivers.append(FakeDriver(crash_on_get=crash))
+            return drivers[-1]
+
+        pool = BrowserPool(factory)
+        png = pool.capture("https://example.com", 320, 240)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertEqual(pool.launches, 2)
+        self.assertTrue(drivers[0].quit_called)
+        pool.close()
+
+    def test_generate_screenshot_with_fake_worker_browser(self) -> None:
+        """
+        Con el initializer en modo "fake" el screenshot sale del pool y no
+        del placeholder.
+        """
+        try:
+            screenshot.init_worker_browser("fake")
+            result = screenshot.generate_screenshot("https://example.com", 64, 48)
+            self.assertIsInstance(result, str)
+            self.assertEqual(screenshot._WORKER_POOL.launches, 1)
+        finally:
+            screenshot._WORKER_POOL.close()
+            screenshot._WORKER_POOL = None
+
+    def test_run_page_stages_parallel_with_partial_results(self) -> None:
+        """
+        Las etapas corren en paralelo; las que fallan o se pasan de tiempo
+        quedan vacías y se informan en stage_errors.
+        """
+        stages = (
+            PageStage("screenshot", _sleepy_stage, THREAD_EXECUTOR, 5.0),
+            PageStage("performance", _sleepy_stage, THREAD_EXECUTOR, 5.0),
+            PageStage("thumbnails", _failing_stage, THREAD_EXECUTOR, 5.0),
+            PageStage("advanced", _stuck_stage, THREAD_EXECUTOR, 5.0),
+        )
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+            started = time.monotonic()
+            data, errors = run_page_stages(
+                {"url": "https://example.com", "scraping_data": {}, "html": ""},
+                StageContext(process_pool=pool, thread_pool=pool),
+                stages=stages,
+                timeouts={"advanced": 0.5},
+            )
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.9)  # no es la suma de las etapas
+        self.assertEqual(data["screenshot"], "https://example.com")
+        self.assertEqual(data["performance"], "https://example.com")
+        self.assertEqual(data["thumbnails"], [])
+        self.assertIsNone(data["advanced"])
+        self.assertEqual(errors, {"thumbnails": "boom", "advanced": "timeout"})
+
+    def test_run_page_stages_reports_stages_as_they_finish(self) -> None:
+        """
+        on_stage se llama en orden de finalización, no en el de PAGE_STAGES.
+        """
+        stages = (
+            PageStage("advanced", _stuck_stage, THREAD_EXECUTOR, 0.5),
+            PageStage("screenshot", _sleepy_stage, THREAD_EXECUTOR, 5.0),
+            PageStage("thumbnails", _failing_stage, THREAD_EXECUTOR, 5.0),
+        )
+        reported = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
+            data, errors = run_page_stages(
+                {"url": "https://example.com", "scraping_data": {}, "html": ""},
+                StageContext(process_pool=pool, thread_pool=pool),
+                stages=stages,
+                on_stage=lambda name, values, error: reported.append((name, values, error)),
+            )
+
+        self.assertEqual(
+            reported,
+            [
+                ("thumbnails", None, "boom"),
+                ("screenshot", {"screenshot": "https://example.com"}, None),
+                ("advanced", None, "timeout"),
+            ],
+        )
+        self.assertEqual(errors, {"thumbnails": "boom", "advanced": "timeout"})
+        self.assertEqual(data["screenshot"], "https://example.com")
+
+    def test_run_page_stages_async_matches_threaded_version(self) -> None:
+        """
+        La versión para event loop espera los mismos futures: mismos datos,
+        mismos errores y el mismo timeout por etapa, sin bloquear el loop.
+        """
+        stages = (
+            PageStage("screenshot", _sleepy_stage, THREAD_EXECUTOR, 5.0),
+            PageStage("thumbnails", _failing_stage, THREAD_EXECUTOR, 5.0),
+            PageStage("advanced", _stuck_stage, THREAD_EXECUTOR, 0.5),
+        )
+        reported = []
+
+        async def _test(pool) -> float:
+            ticks = 0
+
+            async def _ticker() -> None:
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            ticker = asyncio.create_task(_ticker())
+            try:
+                data, errors = await run_page_stages_async(
+                    {"url": "https://example.com", "scraping_data": {}, "html": ""},
+                    StageContext(process_pool=pool, thread_pool=pool),
+                    stages=stages,
+                    on_stage=lambda name, values, error: reported.append(name),
+                )
+            finally:
+                ticker.cancel()
+            self.assertEqual(data["screenshot"], "https://example.com")
+            self.assertEqual(errors, {"thumbnails": "boom", "advanced": "timeout"})
+            return ticks
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
+            ticks = asyncio.run(_test(pool))
+
+        self.assertGreater(ticks, 20)  # el loop siguió atendiendo otras cosas
+        self.assertEqual(reported, ["thumbnails", "screenshot", "advanced"])
+
+    def test_async_frontend_speaks_the_same_protocol(self) -> None:
+        """
+        El frontend asyncio atiende muchas conexiones sin crear threads y
+        responde igual que el de threads: ping, hello (v2), process_page con
+        etapas parciales, busy del control de admisión y límite de conexiones.
+        """
+        stages = (PageStage("screenshot", _sleepy_stage, THREAD_EXECUTOR, 5.0),)
+
+        async def _request(reader, writer, message):
+            await send_message_async(writer, message)
+            return await read_message_async(reader)
+
+        async def _test(pool) -> None:
+            admission = AdmissionControl(max_inflight=1, max_queued=0)
+            server = AsyncProcessingServer(
+                ("127.0.0.1", 0),
+                StageContext(process_pool=pool, thread_pool=pool),
+                admission=admission,
+                max_connections=150,
+                stages=stages,
+            )
+            await server.start()
+            host, port = server.server_address
+            threads_before = threading.active_count()
+            conns = [await asyncio.open_connection(host, port) for _ in range(150)]
+            try:
+                replies = await asyncio.gather(
+                    *(_request(r, w, {"action": "ping", "request_id": str(n)}) for n, (r, w) in enumerate(conns))
+                )
+                self.assertEqual({reply["status"] for reply in replies}, {"ok"})
+                self.assertEqual(threading.active_count(), threads_before)
+                self.assertEqual(server.connections, 150)
+
+                # Conexión 151: busy y se cierra
+                extra_reader, extra_writer = await asyncio.open_connection(host, port)
+                self.assertEqual((await read_message_async(extra_reader))["status"], "busy")
+                self.assertEqual(await extra_reader.read(), b"")
+                extra_writer.close()
+                self.assertEqual(server.rejected_connections, 1)
+
+                reader, writer = conns[0]
+                reply = await _request(reader, writer, dict(hello_message(), request_id="h"))
+                self.assertEqual(wire_from_hello_reply(reply).version, PROTOCOL_BINARY)
+
+                await send_message_async(
+                    writer, {"action": "process_page", "url": "https://a.com", "partial": True, "request_id": "p"}
+                )
+                await send_message_async(writer, {"action": "process_page", "url": "https://b.com", "request_id": "q"})
+                first = await read_message_async(reader)
+                self.assertEqual((first["request_id"], first["status"]), ("q", "busy"))
+                partial = await read_message_async(reader)
+                self.assertEqual((partial["status"], partial["stage"]), ("partial", "screenshot"))
+                self.assertEqual(partial["processing_data"], {"screenshot": "https://a.com"})
+                final = await read_message_async(reader)
+                self.assertEqual((final["request_id"], final["status"]), ("p", "success"))
+                self.assertNotIn("processing_data", final)
+                self.assertEqual(admission.stats()["inflight"], 0)
+            finally:
+                for _, w in conns:
+                    w.close()
+                await server.close()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            asyncio.run(_test(pool))
+
+    def test_admission_holds_slot_until_timed_out_stage_finishes(self) -> None:
+        """
+        Una etapa que se pasó de tiempo pero ya corría en el pool sigue
+        ocupando su turno hasta terminar: no se admite otra página encima.
+        """
+        gate = threading.Event()
+
+        def _gated_stage(job):
+            gate.wait(5)
+            return job["url"]
+
+        stages = (PageStage("screenshot", _gated_stage, THREAD_EXECUTOR, 0.05),)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+            # Frontend de threads: AdmissionControl.run con los futures de la página
+            admission = AdmissionControl(max_inflight=1, max_queued=0)
+            self.assertTrue(admission.try_enter())
+            jobs: list = []
+            context = StageContext(process_pool=pool, thread_pool=pool)
+            data, errors = admission.run(
+                lambda: run_page_stages({"url": "https://a.com"}, context, stages=stages, submitted=jobs), jobs
+            )
+            self.assertEqual(errors, {"screenshot": "timeout"})
+            self.assertEqual(admission.stats()["inflight"], 1)
+            self.assertFalse(admission.try_enter())
+            gate.set()
+            concurrent.futures.wait(jobs, timeout=5)
+            self.assertEqual(admission.stats()["inflight"], 0)
+            self.assertTrue(admission.try_enter())
+
+            # Frontend asyncio: mismo comportamiento a través del protocolo
+            gate.clear()
+
+            async def _test() -> None:
+                admission = AdmissionControl(max_inflight=1, max_queued=0)
+                server = AsyncProcessingServer(
+                    ("127.0.0.1", 0), StageContext(process_pool=pool, thread_pool=pool),
+                    admission=admission, stages=stages,
+                )
+                await server.start()
+                reader, writer = await asyncio.open_connection(*server.server_address)
+                try:
+                    await send_message_async(writer, {"action": "process_page", "url": "https://a.com", "request_id": "a"})
+                    self.assertEqual((await read_message_async(reader))["status"], "error")  # timeout
+                    await send_message_async(writer, {"action": "process_page", "url": "https://b.com", "request_id": "b"})
+                    self.assertEqual((await read_message_async(reader))["status"], "busy")
+
+                    gate.set()
+                    for _ in range(100):
+                        if admission.stats()["inflight"] == 0:
+                            break
+                        await asyncio.sleep(0.01)
+                    await send_message_async(writer, {"action": "process_page", "url": "https://c.com", "request_id": "c"})
+                    self.assertEqual((await read_message_async(reader))["status"], "success")
+                finally:
+                    writer.close()
+                    await server.close()
+
+            asyncio.run(_test())
+
+    def test_async_frontend_frees_queue_of_pages_cancelled_before_starting(self) -> None:
+        """
+        Una página admitida cuya tarea se cancela antes de arrancar (el
+        cliente se fue en el mismo paso del loop) devuelve su lugar en la cola.
+        """
+        from unittest.mock import MagicMock
+
+        from server_processing import _AsyncConnection
+
+        async def _test(pool) -> None:
+            admission = AdmissionControl(max_inflight=1, max_queued=1)
+            server = AsyncProcessingServer(
+                ("127.0.0.1", 0), StageContext(process_pool=pool, thread_pool=pool), admission=admission
+            )
+            await server.start()
+            try:
+                # El mensaje y el EOF ya están en el buffer: serve() crea la
+                # tarea de la página y queda esperándola en el mismo paso
+                reader = asyncio.StreamReader()
+                reader.feed_data(encode_frame({"action": "process_page", "url": "https://a.com", "request_id": "a"}))
+                reader.feed_eof()
+                writer = MagicMock()
+                writer.get_extra_info.return_value = None
+                connection = asyncio.create_task(_AsyncConnection(server, reader, writer).serve())
+                await asyncio.sleep(0)
+                connection.cancel()  # cancela la página antes de su primer paso
+                await asyncio.gather(connection, return_exceptions=True)
+
+                self.assertEqual(admission.stats()["queued"], 0)
+                self.assertTrue(admission.try_enter())
+                self.assertTrue(admission.try_enter())
+            finally:
+                await server.close()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            asyncio.run(_test(pool))
+
+    def test_processing_server_keeps_connection_alive(self) -> None:
+        """
+        El servidor B debe atender varias requests sobre la misma conexión
+        y devolver el request_id de cada una.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            server = ProcessingTCPServer(
+                ("127.0.0.1", 0), ProcessingRequestHandler, process_pool=pool
+            )
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                with socket.create_connection(server.server_address, timeout=5) as sock:
+                    for request_id in ("a", "b"):
+                        send_message(sock, {"action": "ping", "request_id": request_id})
+                        response = read_message(sock)
+                        self.assertEqual(response["status"], "ok")
+                        self.assertEqual(response["request_id"], request_id)
+
+                    send_message(sock, {"action": "nope", "request_id": "c"})
+                    response = read_message(sock)
+                    self.assertEqual(response["status"], "error")
+                    self.assertEqual(response["request_id"], "c")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_process_page_replies_error_when_stages_cannot_run(self) -> None:
+        """
+        Si run_page_stages falla entero (no una etapa), la respuesta es
+        "error" y no un "success" vacío que el Servidor A cachearía.
+        """
+        from unittest import mock
+
+        def _boom(*_args, **_kwargs):
+            raise RuntimeError("pool roto")
+
+        async def _boom_async(*_args, **_kwargs):
+            raise RuntimeError("pool roto")
+
+        async def _async_reply(pool):
+            server = AsyncProcessingServer(("127.0.0.1", 0), StageContext(process_pool=pool, thread_pool=pool))
+            await server.start()
+            reader, writer = await asyncio.open_connection(*server.server_address)
+            try:
+                await send_message_async(writer, {"action": "process_page", "url": "https://a.com", "request_id": "a"})
+                return await read_message_async(reader)
+            finally:
+                writer.close()
+                await server.close()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            server = ProcessingTCPServer(("127.0.0.1", 0), ProcessingRequestHandler, process_pool=pool)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                with mock.patch("server_processing.run_page_stages", _boom), \
+                        socket.create_connection(server.server_address, timeout=5) as sock:
+                    send_message(sock, {"action": "process_page", "url": "https://a.com", "request_id": "t"})
+                    threaded = read_message(sock)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+            with mock.patch("server_processing.run_page_stages_async", _boom_async):
+                replies = [threaded, asyncio.run(_async_reply(pool))]
+
+        for reply in replies:
+            self.assertEqual(reply["status"], "error")
+            self.assertEqual(reply["error"], "pool roto")
+            self.assertIsNone(reply["processing_data"]["screenshot"])
+
+    def test_binary_frame_roundtrip_with_attachments(self) -> None:
+        """
+        El frame v2 lleva los bytes crudos como adjuntos y comprime el JSON;
+        el frame JSON puro manda los mismos bytes en base64.
+        """
+        png = bytes(range(256)) * 40
+        message = {
+            "status": "success",
+            "processing_data": {"screenshot": png, "thumbnails": [png[:10], b""]},
+            "advanced": {"text": "señales " * 500},
+        }
+        wire = WireFormat(PROTOCOL_BINARY, "zlib")
+
+        left, right = socket.socketpair()
+        with left, right:
+            send_message(left, message, wire)
+            self.assertEqual(read_message(right), message)
+
+            send_message(left, message)
+            legacy = read_message(right)
+            self.assertEqual(legacy["processing_data"]["screenshot"], base64.b64encode(png).decode("ascii"))
+
+        frame = encode_frame(message, wire)
+        self.assertEqual(frame[0], 0xB7)
+        self.assertLess(len(frame), len(encode_frame(message)) * 2 // 3)
+
+    def test_read_message_large_frame_and_size_limit(self) -> None:
+        """
+        read_message arma mensajes grandes con recv_into y rechaza una
+        cabecera que anuncia más que max_frame_bytes sin esperar el cuerpo.
+        """
+        message = {"screenshot": "x" * (3 * 1024 * 1024), "n": 1}
+        left, right = socket.socketpair()
+        with left, right:
+            sender = threading.Thread(target=send_message, args=(left, message))
+            sender.start()
+            self.assertEqual(read_message(right), message)
+            sender.join()
+
+            left.sendall(struct.pack("!I", 3 * 1024 * 1024 * 1024))
+            with self.assertRaises(FrameTooLargeError):
+                read_message(right, max_frame_bytes=1024 * 1024)
+
+            left.close()
+            with self.assertRaises(ConnectionError):
+                read_message(right)
+
+    def test_compressed_frame_cannot_expand_past_limit(self) -> None:
+        """
+        Un frame v2 chico con la sección JSON comprimida que se expande a
+        más de max_frame_bytes (bomba de compresión) se rechaza sin
+        descomprimirlo entero.
+        """
+        bomb = encode_frame(
+            {"html": "x" * (16 * 1024 * 1024)},
+            WireFormat(version=PROTOCOL_BINARY, compression="zlib"),
+        )
+        self.assertLess(len(bomb), 128 * 1024)  # muy por debajo del límite de 1 MB
+
+        left, right = socket.socketpair()
+        with left, right:
+            left.sendall(bomb)
+            with self.assertRaises(FrameTooLargeError):
+                read_message(right, max_frame_bytes=1024 * 1024)
+
+            small = {"html": "y" * 4096}
+            left.sendall(encode_frame(small, WireFormat(version=PROTOCOL_BINARY, compression="zlib")))
+            self.assertEqual(read_message(right, max_frame_bytes=1024 * 1024), small)
+
+    def test_processing_server_negotiates_binary_frames(self) -> None:
+        """
+        Después de "hello" el servidor B responde en frame v2; sin hello
+        sigue respondiendo en JSON puro.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            server = ProcessingTCPServer(
+                ("127.0.0.1", 0), ProcessingRequestHandler, process_pool=pool
+            )
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                with socket.create_connection(server.server_address, timeout=5) as sock:
+                    send_message(sock, {"action": "ping", "request_id": "a"})
+                    self.assertNotEqual(sock.recv(1, socket.MSG_PEEK)[0], 0xB7)
+                    read_message(sock)
+
+                    send_message(sock, dict(hello_message(), request_id="h"))
+                    reply = read_message(sock)
+                    self.assertEqual(wire_from_hello_reply(reply).version, PROTOCOL_BINARY)
+
+                    send_message(sock, {"action": "ping", "request_id": "b"})
+                    self.assertEqual(sock.recv(1, socket.MSG_PEEK)[0], 0xB7)
+                    self.assertEqual(read_message(sock)["request_id"], "b")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_admission_control_rejects_when_full(self) -> None:
+        """
+        Con todo ocupado, process_page recibe "busy" (con su request_id) en
+        lugar de encolarse; una conexión de más recibe "busy" y se cierra.
+        """
+        admission = AdmissionControl(max_inflight=1, max_queued=0)
+        self.assertTrue(admission.try_enter())
+        self.assertFalse(admission.try_enter())
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            server = ProcessingTCPServer(
+                ("127.0.0.1", 0),
+                ProcessingRequestHandler,
+                process_pool=pool,
+                admission=admission,
+                max_connections=1,
+            )
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                with socket.create_connection(server.server_address, timeout=5) as sock:
+                    send_message(sock, {"action": "process_page", "url": "https://a.com", "request_id": "p"})
+                    response = read_message(sock)
+                    self.assertEqual(response["status"], "busy")
+                    self.assertEqual(response["request_id"], "p")
+                    self.assertGreater(response["retry_after"], 0)
+
+                    send_message(sock, {"action": "ping", "request_id": "q"})
+                    self.assertEqual(read_message(sock)["load"]["queued"], 1)
+
+                    with socket.create_connection(server.server_address, timeout=5) as extra:
+                        self.assertEqual(read_message(extra)["status"], "busy")
+                        self.assertEqual(extra.recv(1), b"")
+                self.assertEqual(server.rejected_connections, 1)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        # Al terminar la página que ocupaba el lugar, vuelve a haber lugar
+        self.assertEqual(admission.run(lambda: "ok"), "ok")
+        self.assertTrue(admission.try_enter())
+        self.assertEqual(admission.stats()["rejected"], 2)
+
+    def test_pull_worker_registers_with_broker(self) -> None:
+        """
+        En modo pull el servidor B se conecta al broker del servidor A,
+        anuncia sus slots y atiende las requests que le manda el broker.
+        """
+        async def _test(pool) -> None:
+            from scraper.processing_broker import ProcessingBroker
+
+            broker = ProcessingBroker("127.0.0.1", 0)
+            await broker.start()
+            port = broker._server.sockets[0].getsockname()[1]
+            worker = PullWorker(
+                ("127.0.0.1", port), slots=2, stage_context=StageContext(process_pool=pool, thread_pool=pool)
+            )
+            thread = threading.Thread(target=worker.serve_forever, daemon=True)
+            thread.start()
+            try:
+                response = await broker.request({"action": "ping"}, timeout=5)
+                self.assertEqual(response["status"], "ok")
+                stats = broker.stats()
+                self.assertEqual((stats["slots"], stats["dispatched"]), (2, 1))
+                self.assertEqual(broker._workers[0].conn.wire.version, PROTOCOL_BINARY)
+            finally:
+                worker.shutdown()
+                await broker.close()
+                await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+            self.assertFalse(thread.is_alive())
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            asyncio.run(_test(pool))
+
     # Podrías agregar más tests si querés (por ejemplo, otro HTML sin metas)
     # para ver cómo se comporta el score de SEO.
 
@@ -23,6 +23,8 @@ Para ejecutar estos tests:
 from __future__ import annotations
 
 import asyncio
+import os
+import time
 import unittest
 from typing import Any, Dict, Tuple
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -229,6 +231,1364 @@ class ScraperServerTests(unittest.TestCase):
         
         asyncio.run(_test())
 
+    def test_fetch_page_reports_metrics_mock(self) -> None:
+        """
+        fetch_page devuelve, además del HTML, los tiempos y bytes medidos
+        durante la descarga (para no volver a bajar la página en el Servidor B).
+        """
+        async def _test() -> None:
+            from scraper.async_http import fetch_page
+
+            body = b"<html><body>" + b"x" * 20000 + b"</body></html>"
+
+            mock_response = MagicMock()
+            mock_response.status = 200
+            mock_response.headers = {}
+            mock_response.url = "https://example.com/final"
+            mock_response.raise_for_status = MagicMock()
+            mock_response.get_encoding = MagicMock(return_value="utf-8")
+
+            async def async_iter():
+                yield body[:8192]
+                yield body[8192:]
+
+            mock_response.content.iter_chunked = MagicMock(return_value=async_iter())
+
+            mock_session = MagicMock()
+            mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+            mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
+
+            result = await fetch_page("https://example.com", session=mock_session)
+
+            self.assertEqual(result.url, "https://example.com/final")
+            self.assertEqual(result.metrics["bytes"], len(body))
+            self.assertEqual(result.metrics["status"], 200)
+            self.assertEqual(result.metrics["redirects"], 0)
+            self.assertGreaterEqual(result.metrics["total_ms"], result.metrics["ttfb_ms"])
+
+        asyncio.run(_test())
+
+    def test_streaming_parser_matches_soup(self) -> None:
+        """
+        StreamingPageParser produce lo mismo que extract_page_bundle aunque
+        el HTML llegue en pedazos que cortan tags, atributos y patrones.
+        """
+        from common.html_parser import extract_page_bundle, extract_page_bundle_streaming
+
+        html = """
+        <html><head>
+            <title> Página &amp; ejemplo </title>
+            <meta name="description" content=" desc ">
+            <meta name="description" content="ignorada">
+            <meta property="og:title" content="OG">
+            <meta name="generator" content="Joomla! 4">
+            <script type="application/ld+json">{"@type": "Article", "headline": "H", "url": "x"}</script>
+            <script src="/static/vue.min.js"></script>
+        </head><body>
+            <h1>a</h1><div><h2>b</h2><h2>c</h2></div>
+            <a href=" /rel ">rel</a><a href="https://other.com/x">abs</a><a>sin href</a>
+            <p><img src="a.png" alt="A"><img src="b.png"></p>
+            <footer>theme tailwind</footer>
+        </body></html>
+        """
+        expected = extract_page_bundle(html, "https://example.com/dir/")
+        for chunk_size in (1, 5, 64):
+            self.assertEqual(
+                extract_page_bundle_streaming(html, "https://example.com/dir/", chunk_size),
+                expected,
+            )
+        self.assertEqual(expected[0]["links"][0], "https://example.com/rel")
+        self.assertEqual(expected[1]["other"], ["Tailwind CSS"])
+
+    def test_fetch_page_stream_parse_mock(self) -> None:
+        """
+        Con stream_parse=True fetch_page parsea mientras descarga: no guarda
+        el HTML y decodifica bien caracteres partidos entre dos pedazos.
+        """
+        async def _test() -> None:
+            from scraper.async_http import fetch_page
+
+            body = "<html><head><title>Canción ñandú</title></head><body><a href='/x'>x</a></body></html>".encode()
+            split = body.index("ñ".encode()) + 1  # corta en medio de la ñ
+
+            mock_response = MagicMock()
+            mock_response.status = 200
+            mock_response.headers = {}
+            mock_response.charset = "utf-8"
+            mock_response.url = "https://example.com/final/"
+            mock_response.raise_for_status = MagicMock()
+
+            async def async_iter():
+                yield body[:split]
+                yield body[split:]
+
+            mock_response.content.iter_chunked = MagicMock(return_value=async_iter())
+
+            mock_session = MagicMock()
+            mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+            mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
+
+            result = await fetch_page("https://example.com", session=mock_session, stream_parse=True)
+
+            self.assertEqual(result.html, "")
+            self.assertEqual(result.metrics["bytes"], len(body))
+            self.assertEqual(result.scraping_data["title"], "Canción ñandú")
+            self.assertEqual(result.scraping_data["links"], ["https://example.com/x"])
+            self.assertIsNotNone(result.page_signals)
+
+        asyncio.run(_test())
+
+    def test_fetch_page_meta_charset_both_modes(self) -> None:
+        """
+        Sin charset en el Content-Type, los dos modos de lectura usan el
+        <meta charset> del comienzo de la página (acá latin-1).
+        """
+        async def _test() -> None:
+            from scraper.async_http import fetch_page, sniff_meta_charset
+
+            self.assertEqual(
+                sniff_meta_charset(b'<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">'),
+                "iso8859-1",
+            )
+            self.assertEqual(sniff_meta_charset(b'<meta charset="utf-16">'), "utf-8")
+            self.assertIsNone(sniff_meta_charset(b'<meta charset="no-existe">'))
+
+            head = '<html><head><meta charset="iso-8859-1"><title>Canción ñandú</title></head>'
+            # Un cuerpo de más de 1 KB (se decide con el primer KB) y uno corto
+            for padding in (3000, 0):
+                body = (head + "<body>" + "x" * padding + "</body></html>").encode("latin-1")
+
+                def _session():
+                    mock_response = MagicMock()
+                    mock_response.status = 200
+                    mock_response.headers = {}
+                    mock_response.charset = None
+                    mock_response.url = "https://example.com/"
+                    mock_response.raise_for_status = MagicMock()
+
+                    async def async_iter():
+                        for start in range(0, len(body), 100):
+                            yield body[start:start + 100]
+
+                    mock_response.content.iter_chunked = MagicMock(return_value=async_iter())
+                    mock_session = MagicMock()
+                    mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+                    mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
+                    return mock_session
+
+                streamed = await fetch_page("https://example.com", session=_session(), stream_parse=True)
+                self.assertEqual(streamed.scraping_data["title"], "Canción ñandú")
+                self.assertEqual(streamed.metrics["bytes"], len(body))
+                whole = await fetch_page("https://example.com", session=_session())
+                self.assertIn("Canción ñandú", whole.html)
+
+        asyncio.run(_test())
+
+    def test_result_cache_lru_budget_and_ttl(self) -> None:
+        """
+        La caché desaloja por LRU al pasarse del presupuesto en bytes,
+        descarta las entradas vencidas y lleva los contadores.
+        """
+        from scraper.cache import ResultCache, estimate_size
+
+        def _result(n: int) -> Dict[str, Any]:
+            return {"url": f"https://e.com/{n}", "processing_data": {"screenshot": "x" * 1000}}
+
+        entry_size = estimate_size(_result(0))
+        cache = ResultCache(ttl_seconds=10, max_bytes=entry_size * 2, sweep_interval=0)
+
+        cache.put("a", _result(1), now=0)
+        cache.put("b", _result(2), now=0)
+        self.assertIsNotNone(cache.get("a", now=1))  # "a" pasa a ser el más reciente
+        cache.put("c", _result(3), now=1)            # desaloja "b"
+
+        self.assertNotIn("b", cache)
+        self.assertIsNotNone(cache.get("c", now=2))
+        self.assertIsNone(cache.get("a", now=10))    # vencida
+        self.assertEqual(cache.sweep(now=11), 1)     # "c" vence en el barrido
+        self.assertEqual(len(cache), 0)
+
+        stats = cache.stats()
+        self.assertEqual(stats["bytes"], 0)
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertEqual((stats["evictions"], stats["expired"]), (1, 2))
+
+    def test_result_cache_can_skip_heavy_fields(self) -> None:
+        from scraper.cache import ResultCache
+
+        cache = ResultCache(ttl_seconds=10, sweep_interval=0, store_heavy_fields=False)
+        result = {
+            "url": "https://e.com",
+            "processing_data": {"screenshot": "x" * 5000, "thumbnails": ["t"], "performance": {"a": 1}},
+        }
+        cache.put("k", result, now=0)
+        cached = cache.get("k", now=1)
+
+        self.assertIsNone(cached["processing_data"]["screenshot"])
+        self.assertEqual(cached["processing_data"]["thumbnails"], [])
+        self.assertEqual(cached["processing_data"]["performance"], {"a": 1})
+        self.assertEqual(cached["omitted_fields"], ["screenshot", "thumbnails"])
+        self.assertEqual(len(result["processing_data"]["screenshot"]), 5000)  # el original no cambia
+        self.assertLess(cache.stats()["bytes"], 5000)
+
+    def test_normalize_url_for_cache_keys(self) -> None:
+        from scraper.cache import normalize_url
+
+        self.assertEqual(normalize_url("HTTP://Example.com:80/#x"), "http://example.com/")
+        self.assertEqual(normalize_url("https://a.com:443/p?b=2&a=1"), "https://a.com/p?a=1&b=2")
+        self.assertEqual(normalize_url("http://a.com:8080/p"), "http://a.com:8080/p")
+        self.assertEqual(normalize_url("http://[::1]:9000/"), "http://[::1]:9000/")
+
+    def test_disk_cache_is_shared_between_instances(self) -> None:
+        """
+        Dos DiskCache sobre el mismo archivo (como dos procesos del
+        Servidor A) ven lo que guarda el otro; los PNG vuelven en base64.
+        """
+        import base64
+        import tempfile
+
+        from scraper.disk_cache import DiskCache
+
+        png = base64.b64encode(b"\x89PNG" + bytes(range(256))).decode("ascii")
+        result = {
+            "url": "https://a.com/",
+            "scraping_data": {"title": "A"},
+            "processing_data": {"screenshot": png, "thumbnails": [png, png], "performance": {"a": 1}},
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.db")
+            writer = DiskCache(path, ttl_seconds=10, compact_interval=0)
+            reader = DiskCache(path, ttl_seconds=10, compact_interval=0)
+            try:
+                self.assertTrue(writer.put("https://a.com/", result, now=0))
+                cached = reader.get("https://a.com/", now=1)
+                self.assertEqual(cached, result)
+
+                self.assertIsNone(reader.get("https://a.com/", now=10))  # vencida
+                self.assertEqual(writer.compact(now=10), 1)
+                self.assertEqual(reader.stats()["entries"], 0)
+            finally:
+                writer._close_conn()
+                reader._close_conn()
+
+    def test_disk_cache_evicts_least_recently_used(self) -> None:
+        import tempfile
+
+        from scraper.disk_cache import DiskCache
+
+        def _result(n: int) -> dict:
+            return {"url": f"u{n}", "scraping_data": {"text": "x" * 1000}}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = DiskCache(os.path.join(tmp, "c.db"), ttl_seconds=100, max_bytes=2500, compact_interval=0)
+            try:
+                cache.put("a", _result(1), now=0)
+                cache.put("b", _result(2), now=1)
+                self.assertIsNotNone(cache.get("a", now=2))  # "a" pasa a ser el más reciente
+                cache.put("c", _result(3), now=3)            # desaloja "b"
+                self.assertIsNone(cache.get("b", now=4))
+                self.assertIsNotNone(cache.get("a", now=4))
+                self.assertIsNotNone(cache.get("c", now=4))
+                self.assertEqual(cache.stats()["evictions"], 1)
+            finally:
+                cache._close_conn()
+
+    def test_conditional_revalidation_skips_processing(self) -> None:
+        """
+        Al vencer la entrada, el siguiente pedido manda If-None-Match; ante
+        un 304 se renueva la caché sin volver a llamar al Servidor B.
+        """
+        async def _test() -> None:
+            from aiohttp import web as aio_web
+
+            import server_scraping
+
+            seen_headers = []
+
+            async def _page(request):
+                seen_headers.append(request.headers.get("If-None-Match"))
+                if request.headers.get("If-None-Match") == '"v1"':
+                    return aio_web.Response(status=304, headers={"ETag": '"v1"'})
+                return aio_web.Response(
+                    text="<html><title>Estable</title></html>",
+                    content_type="text/html",
+                    headers={"ETag": '"v1"'},
+                )
+
+            app = aio_web.Application()
+            app.router.add_get("/", _page)
+            runner = aio_web.AppRunner(app)
+            await runner.setup()
+            site = aio_web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            url = f"http://127.0.0.1:{port}/"
+
+            service = server_scraping.ScraperService(workers=2, cache_ttl_seconds=60)
+            service._session = aiohttp.ClientSession()
+            service._request_processing_server = AsyncMock(return_value=({"performance": {}}, "success"))
+            try:
+                first = await service.handle_url(url)
+                service._cache._entries[url].expires_at = time.time() - 1  # vence
+                second = await service.handle_url(url)
+                third = await service.handle_url(url)  # hit normal, sin red
+            finally:
+                await service._session.close()
+                await runner.cleanup()
+
+            self.assertEqual(seen_headers, [None, '"v1"'])
+            self.assertEqual(service._request_processing_server.await_count, 1)
+            self.assertEqual(first["scraping_data"]["title"], "Estable")
+            self.assertIs(second, first)
+            self.assertIs(third, first)
+            stats = await service.stats()
+            self.assertEqual(stats["revalidation"], {"not_modified": 1, "modified": 0})
+            self.assertEqual(stats["cache"]["revalidated"], 1)
+
+        asyncio.run(_test())
+
+    def test_stale_while_revalidate_serves_stale_and_refreshes(self) -> None:
+        async def _test() -> None:
+            import server_scraping
+            from scraper.async_http import FetchResult
+
+            titles = iter(["Vieja", "Nueva"])
+            fetches = 0
+
+            async def _fake_fetch(url, **_kwargs):
+                nonlocal fetches
+                fetches += 1
+                await asyncio.sleep(0.05)
+                return FetchResult(html=f"<html><title>{next(titles)}</title></html>", url=url)
+
+            service = server_scraping.ScraperService(workers=2, cache_ttl_seconds=60, stale_while_revalidate=30)
+            service._session = MagicMock()
+            service._request_processing_server = AsyncMock(return_value=({}, "success"))
+            url = "https://example.com/"
+
+            with patch.object(server_scraping, "fetch_page", _fake_fetch):
+                first = await service.handle_url(url)
+                service._cache._entries[url].expires_at = time.time() - 1
+
+                started = time.perf_counter()
+                stale = await service.handle_url(url)
+                self.assertLess(time.perf_counter() - started, 0.04)  # no esperó la descarga
+                await service.handle_url(url)  # sigue vencida: no lanza otro refresco
+                await asyncio.gather(*service._background.values())
+
+                fresh = await service.handle_url(url)
+
+            self.assertTrue(stale["stale"])
+            self.assertEqual(stale["scraping_data"]["title"], "Vieja")
+            self.assertNotIn("stale", first)  # no se modifica el resultado cacheado
+            self.assertNotIn("stale", fresh)
+            self.assertEqual(fresh["scraping_data"]["title"], "Nueva")
+            self.assertEqual(fetches, 2)
+
+            stats = (await service.stats())["stale_while_revalidate"]
+            self.assertEqual(stats["served"], 2)
+            self.assertEqual(stats["refreshes"], 1)
+
+        asyncio.run(_test())
+
+    def test_caches_keep_expired_entries_with_validators(self) -> None:
+        import tempfile
+
+        from scraper.cache import ResultCache
+        from scraper.disk_cache import DiskCache
+
+        validators = {"etag": '"v1"'}
+        cache = ResultCache(ttl_seconds=10, sweep_interval=0, stale_retention=100)
+        cache.put("con", {"n": 1}, now=0, validators=validators)
+        cache.put("sin", {"n": 2}, now=0)
+
+        self.assertIsNone(cache.get("con", now=20))
+        self.assertEqual(cache.get_stale("con", now=20), ({"n": 1}, validators))
+        self.assertIsNone(cache.get_stale("sin", now=20))
+        self.assertEqual(cache.sweep(now=20), 1)  # sólo "sin"
+        cache.refresh("con", now=30, validators={"etag": '"v2"'})
+        self.assertEqual(cache.get("con", now=35), {"n": 1})
+        self.assertEqual(cache.sweep(now=200), 1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            disk = DiskCache(os.path.join(tmp, "c.db"), ttl_seconds=10, compact_interval=0, stale_retention=100)
+            try:
+                disk.put("con", {"n": 1}, now=0, validators=validators)
+                disk.put("sin", {"n": 2}, now=0)
+                self.assertIsNone(disk.get("con", now=20))
+                self.assertEqual(disk.lookup_stale("con", now=20), ({"n": 1}, validators))
+                self.assertEqual(disk.compact(now=20), 1)
+                self.assertTrue(disk.refresh("con", now=30))
+                self.assertEqual(disk.lookup("con", now=35), ({"n": 1}, 40, validators))
+            finally:
+                disk._close_conn()
+
+            # Ventana stale-while-revalidate: también sin validadores
+            disk = DiskCache(os.path.join(tmp, "s.db"), ttl_seconds=10, compact_interval=0, stale_window=5)
+            try:
+                disk.put("sin", {"n": 2}, now=0)
+                self.assertEqual(disk.lookup_stale("sin", now=12, max_staleness=5), ({"n": 2}, {}))
+                self.assertIsNone(disk.lookup_stale("sin", now=12))  # sin validadores no se revalida
+                self.assertIsNone(disk.lookup_stale("sin", now=16, max_staleness=5))
+            finally:
+                disk._close_conn()
+
+    def test_single_flight_coalesces_concurrent_scrapes(self) -> None:
+        """
+        Pedidos concurrentes de la misma URL (aunque escrita distinto) y
+        tareas de la cola deben compartir una sola descarga y un solo
+        trabajo en el Servidor B.
+        """
+        async def _test() -> None:
+            import server_scraping
+            from scraper.async_http import FetchResult
+
+            fetches = 0
+
+            async def _fake_fetch(url, **_kwargs):
+                nonlocal fetches
+                fetches += 1
+                await asyncio.sleep(0.05)
+                return FetchResult(html="<html><title>T</title></html>", url=url)
+
+            service = server_scraping.ScraperService(workers=4, cache_ttl_seconds=0)
+            service._session = MagicMock()
+            service._request_processing_server = AsyncMock(return_value=({}, "success"))
+
+            await service._task_queue.start()
+            try:
+                with patch.object(server_scraping, "fetch_page", _fake_fetch):
+                    task_id = service.create_task("https://example.com/?b=1&a=2")
+                    results = await asyncio.gather(
+                        service.handle_url("https://example.com/?a=2&b=1"),
+                        service.handle_url("HTTPS://EXAMPLE.COM:443/?b=1&a=2#top"),
+                        service.handle_url("https://example.com/?a=2&b=1"),
+                    )
+                    await asyncio.sleep(0.01)
+            finally:
+                await service._task_queue.close()
+
+            self.assertEqual(fetches, 1)
+            self.assertEqual(service._request_processing_server.await_count, 1)
+            self.assertTrue(all(result is results[0] for result in results))
+            task = service.get_task_info(task_id)
+            self.assertEqual(task.status, "completed")
+            self.assertIs(task.result, results[0])
+
+            stats = (await service.stats())["single_flight"]
+            self.assertEqual(stats["leaders"], 1)
+            self.assertEqual(stats["coalesced"], 3)
+            self.assertEqual(stats["in_flight"], 0)
+
+        asyncio.run(_test())
+
+    def test_single_flight_shares_errors_and_survives_cancellation(self) -> None:
+        async def _test() -> None:
+            from scraper.single_flight import SingleFlight
+
+            flights = SingleFlight()
+            release = asyncio.Event()
+
+            async def _fail(_participants):
+                await release.wait()
+                raise ValueError("boom")
+
+            first = asyncio.create_task(flights.run("k", _fail))
+            second = asyncio.create_task(flights.run("k", _fail))
+            await asyncio.sleep(0)
+            self.assertEqual(flights.stats()["waiting"], 2)
+            first.cancel()  # el otro sigue esperando el mismo trabajo
+            await asyncio.sleep(0)
+            self.assertEqual(flights.stats()["waiting"], 1)
+            release.set()
+
+            with self.assertRaises(ValueError):
+                await second
+            self.assertTrue(first.cancelled())
+            self.assertNotIn("k", flights)
+
+            # Terminado el anterior, la misma clave arranca un trabajo nuevo
+            async def _ok(participants):
+                return list(participants)
+
+            self.assertEqual(await flights.run("k", _ok, participant="p"), ["p"])
+            self.assertEqual(flights.stats()["leaders"], 2)
+
+        asyncio.run(_test())
+
+    def test_rate_limiter_burst_and_idle_eviction(self) -> None:
+        from scraper.rate_limiter import DomainRateLimiter
+
+        limiter = DomainRateLimiter(rate_per_minute=60, burst=3)  # 1 por segundo
+        self.assertEqual([limiter.try_acquire("a.com", now=0) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(limiter.try_acquire("a.com", now=0), 1.0)
+        self.assertEqual(limiter.try_acquire("b.com", now=0), 0)  # otro dominio, otro bucket
+        self.assertEqual(limiter.try_acquire("a.com", now=1.0), 0)
+
+        # Pasado el tiempo de recarga, los dominios inactivos se olvidan
+        limiter.try_acquire("c.com", now=100)
+        self.assertNotIn("a.com", limiter)
+        self.assertNotIn("b.com", limiter)
+        self.assertEqual(len(limiter), 1)
+        self.assertEqual(limiter.stats()["rejected"], 1)
+
+    def test_rate_limiter_queue_mode_waits_in_order(self) -> None:
+        async def _test() -> None:
+            from scraper.rate_limiter import DomainRateLimiter, RateLimitExceeded
+
+            limiter = DomainRateLimiter(rate_per_minute=1200, burst=1, mode="queue", max_wait=0.12)  # 50 ms
+            finished = []
+
+            async def _request(n: int) -> None:
+                await limiter.acquire("a.com")
+                finished.append(n)
+
+            tasks = [asyncio.create_task(_request(n)) for n in range(3)]
+            await asyncio.sleep(0)
+            with self.assertRaises(RateLimitExceeded) as ctx:  # el 4.º esperaría 150 ms
+                await limiter.acquire("a.com")
+            self.assertGreater(ctx.exception.retry_after, 0.12)
+
+            await asyncio.gather(*tasks)
+            self.assertEqual(finished, [0, 1, 2])
+            stats = limiter.stats()
+            self.assertEqual((stats["allowed"], stats["delayed"], stats["rejected"]), (3, 2, 1))
+
+            # Cancelar una espera devuelve el turno reservado
+            waiting = asyncio.create_task(limiter.acquire("a.com"))
+            await asyncio.sleep(0)
+            tat = limiter._tat["a.com"]
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertLess(limiter._tat["a.com"], tat)
+
+        asyncio.run(_test())
+
+    def test_rate_limit_error_maps_to_429(self) -> None:
+        async def _test() -> None:
+            from aiohttp.test_utils import TestClient, TestServer
+            from aiohttp import web as aio_web
+
+            import server_scraping
+
+            service = MagicMock()
+            service.handle_url = AsyncMock(
+                side_effect=server_scraping.RateLimitError("Rate limit excedido", retry_after=2.3)
+            )
+            app = aio_web.Application()
+            app["scraper_service"] = service
+            app.router.add_get("/scrape", server_scraping.scrape_handler)
+
+            async with TestClient(TestServer(app)) as client:
+                resp = await client.get("/scrape", params={"url": "https://example.com"})
+                data = await resp.json()
+
+            self.assertEqual(resp.status, 429)
+            self.assertEqual(resp.headers["Retry-After"], "3")
+            self.assertEqual(data["retry_after"], 2.3)
+
+        asyncio.run(_test())
+
+    def test_task_queue_priorities_bounds_and_cancel(self) -> None:
+        async def _test() -> None:
+            from scraper.task_queue import TaskQueue, TaskQueueFull
+
+            order = []
+            release = asyncio.Event()
+
+            async def _handler(task_id: str) -> None:
+                order.append(task_id)
+                if task_id == "bloqueante":
+                    await release.wait()
+
+            queue = TaskQueue(_handler, workers=1, max_pending=3)
+            await queue.start()
+            try:
+                queue.submit("bloqueante")
+                await asyncio.sleep(0)  # el worker la toma
+                queue.submit("baja", priority=-1)
+                queue.submit("normal")
+                queue.submit("alta", priority=5)
+                with self.assertRaises(TaskQueueFull) as ctx:
+                    queue.submit("sobra")
+                self.assertGreaterEqual(ctx.exception.retry_after, 1.0)
+
+                self.assertTrue(queue.cancel("normal"))
+                self.assertFalse(queue.cancel("inexistente"))
+                release.set()
+                while queue.pending or queue.stats()["running"]:
+                    await asyncio.sleep(0.001)
+            finally:
+                await queue.close()
+
+            self.assertEqual(order, ["bloqueante", "alta", "baja"])
+            stats = queue.stats()
+            self.assertEqual((stats["rejected"], stats["cancelled"], stats["finished"]), (1, 1, 3))
+
+        asyncio.run(_test())
+
+    def test_tasks_cancel_backpressure_and_retention(self) -> None:
+        async def _test() -> None:
+            import server_scraping
+            from scraper.async_http import FetchResult
+
+            async def _slow_fetch(url, **_kwargs):
+                await asyncio.sleep(10)
+                return FetchResult(html="", url=url)
+
+            service = server_scraping.ScraperService(
+                workers=1, cache_ttl_seconds=0, task_queue_size=1,
+                task_retention_seconds=60, max_finished_tasks=1,
+            )
+            service._session = MagicMock()
+            await service._task_queue.start()
+            try:
+                with patch.object(server_scraping, "fetch_page", _slow_fetch):
+                    running = service.create_task("https://a.com/")
+                    await asyncio.sleep(0.01)
+                    queued = service.create_task("https://b.com/")
+                    with self.assertRaises(server_scraping.QueueFullError):
+                        service.create_task("https://c.com/")
+
+                    self.assertEqual(service.get_task_info(running).status, "scraping")
+                    self.assertEqual(service.cancel_task(queued).status, "cancelled")
+                    self.assertEqual(service.cancel_task(running).status, "cancelled")
+                    await asyncio.sleep(0.01)
+                    self.assertEqual(service._task_queue.stats()["running"], 0)
+            finally:
+                await service._task_queue.close()
+
+            # max_finished_tasks=1: sólo queda la última terminada
+            self.assertIsNone(service.get_task_info(queued))
+            self.assertIsNotNone(service.get_task_info(running).finished_at)
+            service._prune_tasks(now=time.monotonic() + 61)  # vence la retención
+            self.assertIsNone(service.get_task_info(running))
+            self.assertEqual((await service.stats())["tasks"]["stored"], 0)
+
+        asyncio.run(_test())
+
+    def test_task_journal_survives_restart(self) -> None:
+        """
+        Con --task-journal, un reinicio conserva los resultados terminados y
+        vuelve a encolar lo que estaba pendiente o en curso.
+        """
+        async def _test(tmp: str) -> None:
+            import server_scraping
+
+            path = os.path.join(tmp, "tasks.jsonl")
+
+            async def _fake_pipeline(url, job, **_kwargs):
+                if "lenta" in url:
+                    service._set_status([job], "scraping")
+                    await asyncio.sleep(10)
+                job.result = {"url": url}
+
+            service = server_scraping.ScraperService(workers=1, task_workers=1, cache_ttl_seconds=0, task_journal_path=path)
+            service._run_pipeline = _fake_pipeline
+            await service._restore_tasks()
+            await service._task_queue.start()
+            done = service.create_task("https://a.com/")
+            await asyncio.sleep(0.02)
+            running = service.create_task("https://lenta.com/")
+            await asyncio.sleep(0.02)
+            batch_id, _ = service.create_batch([("https://b.com/", 0), ("https://c.com/", 5)])
+            self.assertEqual(service.get_task_info(running).status, "scraping")
+            service._closing = True
+            await service._task_queue.close()
+            await service._journal.close()
+
+            # Crash a mitad de una escritura: la última línea queda cortada
+            with open(path, "ab") as fh:
+                fh.write(b'{"op":"status","id":"')
+
+            restarted = server_scraping.ScraperService(workers=1, task_workers=1, cache_ttl_seconds=0, task_journal_path=path)
+            await restarted._restore_tasks()
+            try:
+                task = restarted.get_task_info(done)
+                self.assertEqual((task.status, task.result), ("completed", {"url": "https://a.com/"}))
+                self.assertEqual(restarted.get_task_info(running).status, "pending")
+                # Se reencolan por prioridad: c.com (5) antes que el resto
+                queued = [restarted._task_queue._queue.get_nowait()[2] for _ in range(3)]
+                self.assertEqual(restarted.get_task_info(queued[0]).url, "https://c.com/")
+                self.assertIn(running, queued)
+
+                info = restarted.get_batch_info(batch_id)
+                self.assertIsNotNone(info)
+                self.assertEqual(len(info[0].task_ids), 2)
+                stats = restarted._journal.stats()
+                self.assertEqual((stats["replayed_tasks"], stats["corrupt_lines"]), (4, 1))
+            finally:
+                await restarted._journal.close()
+
+            # El arranque compactó el journal: una línea por tarea y lote
+            with open(path, encoding="utf-8") as fh:
+                self.assertEqual(len(fh.readlines()), 5)
+
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(_test(tmp))
+
+    def test_task_journal_skips_heavy_fields(self) -> None:
+        """Con --cache-skip-heavy, el journal no guarda screenshot ni thumbnails."""
+        async def _test(tmp: str) -> None:
+            import server_scraping
+            from scraper.task_journal import replay
+
+            path = os.path.join(tmp, "tasks.jsonl")
+
+            async def _fake_pipeline(url, job, **_kwargs):
+                job.result = {
+                    "url": url,
+                    "processing_data": {"screenshot": "A" * 4096, "thumbnails": ["B" * 1024], "performance": {}},
+                }
+
+            service = server_scraping.ScraperService(
+                workers=1, task_workers=1, cache_ttl_seconds=0,
+                cache_heavy_fields=False, task_journal_path=path,
+            )
+            service._run_pipeline = _fake_pipeline
+            await service._restore_tasks()
+            await service._task_queue.start()
+            task_id = service.create_task("https://a.com/")
+            for _ in range(50):
+                if service.get_task_info(task_id).finished:
+                    break
+                await asyncio.sleep(0.01)
+            # En memoria el resultado sigue completo
+            self.assertEqual(len(service.get_task_info(task_id).result["processing_data"]["thumbnails"]), 1)
+            await service._journal.flush()
+            with open(path, encoding="utf-8") as fh:
+                self.assertNotIn("A" * 4096, fh.read())
+
+            # La compactación tampoco los escribe
+            await service._journal.compact()
+            service._closing = True
+            await service._task_queue.close()
+            await service._journal.close()
+            records, _, _ = replay(path)
+            result = records[task_id]["result"]
+            self.assertEqual(result["processing_data"]["screenshot"], None)
+            self.assertEqual(result["processing_data"]["thumbnails"], [])
+            self.assertEqual(result["omitted_fields"], ["screenshot", "thumbnails"])
+
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(_test(tmp))
+
+    def test_task_journal_flush_retries_after_write_error(self) -> None:
+        """
+        Si el write/fsync falla (disco lleno), los registros no se pierden:
+        vuelven al buffer y el próximo flush los escribe una sola vez.
+        """
+        async def _test(tmp: str) -> None:
+            from unittest import mock
+
+            from scraper import task_journal
+            from scraper.task_journal import TaskJournal, replay
+
+            path = os.path.join(tmp, "tasks.jsonl")
+            journal = TaskJournal(path, flush_interval=60)
+            await journal.start(compact=False)
+            journal.append({"op": "task", "id": "a", "url": "https://a.com/", "status": "pending"})
+            journal.append({"op": "task", "id": "b", "url": "https://b.com/", "status": "pending"})
+
+            real_fsync = os.fsync
+            calls = []
+
+            def _fsync_fails_once(fd):
+                calls.append(fd)
+                if len(calls) == 1:
+                    raise OSError(28, "No space left on device")
+                real_fsync(fd)
+
+            with mock.patch.object(task_journal.os, "fsync", _fsync_fails_once):
+                with self.assertRaises(OSError):
+                    await journal.flush()
+                self.assertEqual(journal.stats()["buffered"], 2)
+                journal.append({"op": "status", "id": "a", "status": "completed", "result": {"n": 1}})
+                await journal.flush()
+            await journal.close()
+
+            stats = journal.stats()
+            self.assertEqual((stats["buffered"], stats["written"], stats["flushes"]), (0, 3, 1))
+            with open(path, encoding="utf-8") as fh:
+                self.assertEqual(len(fh.readlines()), 3)  # sin duplicados del intento fallido
+            tasks, _, corrupt = replay(path)
+            self.assertEqual(corrupt, 0)
+            self.assertEqual((tasks["a"]["status"], tasks["b"]["status"]), ("completed", "pending"))
+
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(_test(tmp))
+
+    def test_task_journal_compaction_drops_forgotten_tasks(self) -> None:
+        async def _test(tmp: str) -> None:
+            from scraper.task_journal import TaskJournal, replay
+
+            path = os.path.join(tmp, "j.jsonl")
+            live = [{"op": "task", "id": "b", "url": "https://b.com/", "status": "pending"}]
+            journal = TaskJournal(path, flush_interval=60, compact_min_bytes=0, snapshot=lambda: live)
+            await journal.start()
+            journal.append({"op": "task", "id": "a", "url": "https://a.com/", "status": "pending"})
+            journal.append({"op": "status", "id": "a", "status": "completed", "result": {"n": 1}})
+            journal.append(live[0])
+            await journal.flush()
+            tasks, _, _ = replay(path)
+            self.assertEqual(tasks["a"]["result"], {"n": 1})
+            self.assertEqual(journal.stats()["flushes"], 1)  # un solo fsync para los 3
+
+            await journal.compact()
+            await journal.close()
+            tasks, _, corrupt = replay(path)
+            self.assertEqual((list(tasks), corrupt), (["b"], 0))
+
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(_test(tmp))
+
+    def test_batch_submission_interleaves_domains(self) -> None:
+        async def _test() -> None:
+            from aiohttp.test_utils import TestClient, TestServer
+            from aiohttp import web as aio_web
+
+            import server_scraping
+
+            # Sin workers: las tareas quedan pendientes en la cola
+            service = server_scraping.ScraperService(workers=1, cache_ttl_seconds=0)
+            app = aio_web.Application()
+            app["scraper_service"] = service
+            app["batch_max_urls"] = 10
+            app.router.add_post("/tasks/batch", server_scraping.enqueue_batch_handler)
+            app.router.add_get("/batches/{batch_id}", server_scraping.batch_status_handler)
+
+            urls = ["https://a.com/1", "https://a.com/2", "ftp://x", "https://b.com/1", "https://a.com/3"]
+            async with TestClient(TestServer(app)) as client:
+                resp = await client.post("/tasks/batch", json={"urls": urls})
+                data = await resp.json()
+                self.assertEqual(resp.status, 202)
+                self.assertEqual((data["accepted"], data["rejected"]), (4, 1))
+                self.assertEqual([item["url"] for item in data["tasks"]], urls)
+                self.assertIn("error", data["tasks"][2])
+
+                # Orden de la cola: alterna dominios
+                queued = [service._task_queue._queue.get_nowait()[2] for _ in range(4)]
+                by_id = {item.get("task_id"): item["url"] for item in data["tasks"]}
+                self.assertEqual(
+                    [by_id[task_id] for task_id in queued],
+                    ["https://a.com/1", "https://b.com/1", "https://a.com/2", "https://a.com/3"],
+                )
+
+                resp = await client.get(f"/batches/{data['batch_id']}")
+                status = await resp.json()
+                self.assertEqual(status["total"], 4)
+                self.assertEqual(status["counts"], {"pending": 4})
+                self.assertFalse(status["done"])
+                self.assertEqual(len(status["tasks"]), 4)
+
+                resp = await client.get("/batches/nada")
+                self.assertEqual(resp.status, 404)
+
+        asyncio.run(_test())
+
+    def test_batch_submission_ndjson_and_limits(self) -> None:
+        async def _test() -> None:
+            from aiohttp.test_utils import TestClient, TestServer
+            from aiohttp import web as aio_web
+
+            import server_scraping
+
+            service = server_scraping.ScraperService(workers=1, cache_ttl_seconds=0, task_queue_size=3)
+            app = aio_web.Application()
+            app["scraper_service"] = service
+            app["batch_max_urls"] = 3
+            app.router.add_post("/tasks/batch", server_scraping.enqueue_batch_handler)
+
+            ndjson = 'https://a.com/\n"https://b.com/"\n\n{"url": "https://c.com/", "priority": 2}\n'
+            async with TestClient(TestServer(app)) as client:
+                resp = await client.post(
+                    "/tasks/batch", data=ndjson, headers={"Content-Type": "application/x-ndjson"}
+                )
+                data = await resp.json()
+                self.assertEqual((resp.status, data["accepted"]), (202, 3))
+                task_c = data["tasks"][2]["task_id"]
+                self.assertEqual(service.get_task_info(task_c).priority, 2)
+                self.assertEqual(service.get_task_info(task_c).batch_id, data["batch_id"])
+
+                # La cola está llena: el lote entero se rechaza
+                resp = await client.post("/tasks/batch", json=["https://d.com/"])
+                self.assertEqual(resp.status, 429)
+                self.assertIn("Retry-After", resp.headers)
+                self.assertEqual(service._task_queue.pending, 3)
+
+                resp = await client.post("/tasks/batch", json=["https://e.com/"] * 4)
+                self.assertEqual(resp.status, 413)
+                resp = await client.post("/tasks/batch", json={"urls": "https://e.com/"})
+                self.assertEqual(resp.status, 400)
+
+        asyncio.run(_test())
+
+    def test_events_stream_task_transitions(self) -> None:
+        async def _test() -> None:
+            import json as json_module
+
+            from aiohttp.test_utils import TestClient, TestServer
+            from aiohttp import web as aio_web
+
+            import server_scraping
+            from scraper.async_http import FetchResult
+
+            async def _fake_fetch(url, **_kwargs):
+                await asyncio.sleep(0.02)
+                return FetchResult(html="<html><title>T</title></html>", url=url)
+
+            service = server_scraping.ScraperService(workers=1, cache_ttl_seconds=0)
+            service._session = MagicMock()
+            service._request_processing_server = AsyncMock(return_value=({"ok": 1}, "success"))
+            app = aio_web.Application()
+            app["scraper_service"] = service
+            app.router.add_get("/events", server_scraping.events_handler)
+
+            with patch.object(server_scraping, "fetch_page", _fake_fetch):
+                task_id = service.create_task("https://example.com/")
+                async with TestClient(TestServer(app)) as client:
+                    resp = await client.get("/events", params={"task_id": task_id})
+                    self.assertEqual(resp.headers["Content-Type"], "text/event-stream")
+                    await service._task_queue.start()
+                    try:
+                        body = (await asyncio.wait_for(resp.text(), timeout=5)).strip()
+                    finally:
+                        await service._task_queue.close()
+
+                    missing = await client.get("/events", params={"task_id": "nada"})
+                    self.assertEqual(missing.status, 404)
+
+            events = []
+            for block in body.split("\n\n"):
+                fields = dict(line.split(": ", 1) for line in block.splitlines())
+                events.append((fields["event"], json_module.loads(fields["data"])))
+
+            statuses = [data["status"] for name, data in events if name == "status"]
+            self.assertEqual(statuses, ["pending", "scraping", "processing", "completed"])
+            self.assertEqual(events[-2][1]["result"]["processing_data"], {"ok": 1})
+            self.assertEqual(events[-1], ("end", {"tasks": 1}))
+            self.assertEqual((await service.stats())["events"]["subscribers"], 0)
+
+        asyncio.run(_test())
+
+    def test_task_events_overflow_disconnects_slow_subscriber(self) -> None:
+        async def _test() -> None:
+            from scraper.events import TaskEvents
+
+            events = TaskEvents(queue_size=2)
+            slow = events.subscribe(task_ids=["t1"])
+            batch = events.subscribe(batch_id="b1")
+            for status in ("pending", "scraping", "processing"):
+                events.publish({"task_id": "t1", "batch_id": "b1", "status": status})
+            events.publish({"task_id": "t2", "status": "pending"})  # nadie suscripto
+
+            self.assertTrue(slow.overflowed and batch.overflowed)
+            self.assertEqual((await slow.get())["status"], "scraping")  # se descartó el más viejo
+            self.assertEqual(await slow.get(), {"event": "overflow"})
+            self.assertEqual(events.stats()["subscribers"], 0)
+
+        asyncio.run(_test())
+
+    def test_stream_url_sends_sections_as_they_finish(self) -> None:
+        async def _test() -> None:
+            import server_scraping
+            from scraper.async_http import FetchResult
+
+            async def _fake_fetch(url, **_kwargs):
+                return FetchResult(html="<html><title>T</title></html>", url=url)
+
+            release = asyncio.Event()
+            snapshots = []
+
+            async def _fake_request(payload, timeout, on_partial=None):
+                self.assertTrue(payload["partial"])
+                on_partial({"status": "partial", "stage": "advanced", "processing_data": {"advanced": {"seo": 1}}})
+                on_partial({"status": "partial", "stage": "screenshot", "error": "timeout"})
+                snapshots.append(service.get_task_info(task_id).progress.snapshot())
+                await release.wait()
+                return {"status": "success", "stage_errors": {"screenshot": "timeout"}}
+
+            service = server_scraping.ScraperService(workers=2, cache_ttl_seconds=0)
+            service._session = MagicMock()
+            service._processing_pool.request = _fake_request
+
+            await service._task_queue.start()
+            try:
+                with patch.object(server_scraping, "fetch_page", _fake_fetch):
+                    task_id = service.create_task("https://example.com/")
+                    sections = []
+                    async for section in service.stream_url("https://example.com/"):
+                        sections.append(section)
+                        if len(sections) == 3:
+                            release.set()  # B termina después de mandar dos etapas
+                    await asyncio.sleep(0.01)
+            finally:
+                await service._task_queue.close()
+
+            self.assertEqual(
+                [(s["section"], s.get("stage")) for s in sections],
+                [("scraping", None), ("processing", "advanced"), ("processing", "screenshot"),
+                 ("processing", None), ("done", None)],
+            )
+            self.assertEqual(sections[0]["scraping_data"]["title"], "T")
+            self.assertEqual(sections[2]["error"], "timeout")
+            # Lo que no llegó por etapas sale del resultado final
+            self.assertEqual(set(sections[3]["processing_data"]), {"performance", "thumbnails"})
+            self.assertEqual(sections[4]["processing_status"], "partial")
+
+            # /result?partial=1 ve las mismas secciones mientras la tarea corre
+            self.assertEqual(snapshots[0]["processing_data"], {"advanced": {"seo": 1}})
+            self.assertEqual(snapshots[0]["pending_sections"], ["performance", "thumbnails"])
+            task = service.get_task_info(task_id)
+            self.assertEqual(task.result["processing_data"]["advanced"], {"seo": 1})
+            self.assertIsNone(task.progress)
+            self.assertEqual(service._progress, {})
+
+        asyncio.run(_test())
+
+    def test_processing_pool_multiplexes_requests(self) -> None:
+        """
+        El pool de conexiones con el Servidor B debe reutilizar conexiones
+        persistentes y emparejar cada respuesta con su request_id, aunque
+        las respuestas lleguen fuera de orden.
+        """
+        async def _test() -> None:
+            from common.protocol import read_message_async, send_message_async
+            from scraper.processing_client import ProcessingConnectionPool
+
+            connections = 0
+
+            async def _fake_server(reader, writer) -> None:
+                nonlocal connections
+                connections += 1
+
+                async def _answer(msg) -> None:
+                    # Las requests "lentas" responden después que las rápidas
+                    await asyncio.sleep(0.05 if (msg.get("n") or 0) % 2 == 0 else 0.0)
+                    await send_message_async(
+                        writer,
+                        {"status": "ok", "n": msg.get("n"), "request_id": msg["request_id"]},
+                    )
+
+                try:
+                    while True:
+                        msg = await read_message_async(reader)
+                        asyncio.create_task(_answer(msg))
+                except asyncio.IncompleteReadError:
+                    writer.close()
+
+            server = await asyncio.start_server(_fake_server, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+
+            pool = ProcessingConnectionPool("127.0.0.1", port, size=2)
+            await pool.start()
+            try:
+                responses = await asyncio.gather(
+                    *(pool.request({"action": "ping", "n": n}, timeout=5) for n in range(20))
+                )
+                self.assertEqual([r["n"] for r in responses], list(range(20)))
+                self.assertLessEqual(connections, 2)
+                self.assertLessEqual(pool.open_connections, 2)
+            finally:
+                await pool.close()
+                server.close()
+                await server.wait_closed()
+
+        asyncio.run(_test())
+
+
+    def test_processing_balancer_spreads_load_and_ejects_dead_backends(self) -> None:
+        async def _test() -> None:
+            import socket
+
+            from common.protocol import read_message_async, send_message_async
+            from common.addresses import parse_address
+            from scraper.processing_balancer import ProcessingBalancer
+
+            self.assertEqual(parse_address("10.0.0.2:9100", 9000), ("10.0.0.2", 9100))
+            self.assertEqual(parse_address("[::1]", 9000), ("::1", 9000))
+            self.assertEqual(parse_address("[::1]:9100"), ("::1", 9100))
+            with self.assertRaises(ValueError):
+                parse_address("host:x", 9000)
+            with self.assertRaises(ValueError):  # sin default, el puerto es obligatorio
+                parse_address("host")
+
+            served = {}
+
+            def _handler(name):
+                async def _serve(reader, writer) -> None:
+                    async def _answer(msg) -> None:
+                        await asyncio.sleep(0.02)
+                        if msg.get("n") is not None:
+                            served[name] = served.get(name, 0) + 1
+                        await send_message_async(writer, {"status": "ok", "request_id": msg["request_id"]})
+
+                    try:
+                        while True:
+                            msg = await read_message_async(reader)
+                            asyncio.create_task(_answer(msg))
+                    except asyncio.IncompleteReadError:
+                        writer.close()
+                return _serve
+
+            servers = [await asyncio.start_server(_handler(n), "127.0.0.1", 0) for n in ("a", "b")]
+            ports = [srv.sockets[0].getsockname()[1] for srv in servers]
+            # Un puerto sin nadie escuchando: conexión rechazada
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                dead_port = sock.getsockname()[1]
+
+            balancer = ProcessingBalancer(
+                [("127.0.0.1", ports[0]), ("127.0.0.1", ports[1]), ("127.0.0.1", dead_port)],
+                pool_size=2, eject_after=2, eject_seconds=0.2,
+            )
+            await balancer.start()
+            try:
+                responses = await asyncio.gather(
+                    *(balancer.request({"action": "ping", "n": n}, timeout=5) for n in range(40))
+                )
+                self.assertTrue(all(r["status"] == "ok" for r in responses))
+                self.assertEqual(served["a"] + served["b"], 40)
+                self.assertGreater(min(served.values()), 5)  # ambos reciben carga
+
+                stats = balancer.stats()
+                dead = stats["backends"][2]
+                self.assertFalse(dead["healthy"])
+                self.assertEqual(dead["ejections"], 1)
+                self.assertEqual(stats["healthy"], 2)
+                self.assertGreater(stats["retries"], 0)
+
+                # Aparece un servidor en el puerto muerto: el ping lo readmite
+                servers.append(await asyncio.start_server(_handler("c"), "127.0.0.1", dead_port))
+                for _ in range(50):
+                    if balancer.stats()["healthy"] == 3:
+                        break
+                    await asyncio.sleep(0.05)
+                self.assertEqual(balancer.stats()["healthy"], 3)
+            finally:
+                await balancer.close()
+                for srv in servers:
+                    srv.close()
+                    await srv.wait_closed()
+
+        asyncio.run(_test())
+
+    def test_busy_processing_servers_are_skipped_and_not_cached(self) -> None:
+        """
+        Un Servidor B que responde "busy" no cuenta como falla: la página va
+        a otro y se lo evita hasta su retry_after. Si todos están ocupados,
+        processing_status queda "busy" y el resultado no se cachea.
+        """
+        async def _test() -> None:
+            import server_scraping
+            from common.protocol import read_message_async, send_message_async
+            from scraper.async_http import FetchResult
+            from scraper.processing_balancer import ProcessingBalancer
+
+            served = {"busy": 0, "ok": 0}
+
+            def _handler(name):
+                async def _serve(reader, writer) -> None:
+                    try:
+                        while True:
+                            msg = await read_message_async(reader)
+                            reply = {"status": "ok"}
+                            if msg.get("action") == "process_page":
+                                served[name] += 1
+                                reply = (
+                                    {"status": "busy", "retry_after": 30}
+                                    if name == "busy"
+                                    else {"status": "success", "processing_data": {}}
+                                )
+                            await send_message_async(writer, dict(reply, request_id=msg["request_id"]))
+                    except asyncio.IncompleteReadError:
+                        writer.close()
+                return _serve
+
+            servers = {n: await asyncio.start_server(_handler(n), "127.0.0.1", 0) for n in served}
+            ports = {n: srv.sockets[0].getsockname()[1] for n, srv in servers.items()}
+
+            balancer = ProcessingBalancer([("127.0.0.1", ports["busy"]), ("127.0.0.1", ports["ok"])])
+            try:
+                for _ in range(10):
+                    response = await balancer.request({"action": "process_page"}, timeout=5)
+                    self.assertEqual(response["status"], "success")
+                self.assertLessEqual(served["busy"], 1)  # después se lo evita
+                self.assertEqual(served["ok"], 10)
+                busy_stats = balancer.stats()["backends"][0]
+                self.assertTrue(busy_stats["healthy"])
+                self.assertEqual(busy_stats["failures"], 0)
+            finally:
+                await balancer.close()
+
+            async def _fake_fetch(url, **_kwargs):
+                return FetchResult(html="<html><title>T</title></html>", url=url)
+
+            service = server_scraping.ScraperService(
+                workers=1, processing_servers=[("127.0.0.1", ports["busy"])]
+            )
+            service._session = MagicMock()
+            url = "https://example.com/"
+            try:
+                with patch.object(server_scraping, "fetch_page", _fake_fetch):
+                    result = await service.handle_url(url)
+            finally:
+                await service._processing_pool.close()
+                for srv in servers.values():
+                    srv.close()
+                    await srv.wait_closed()
+
+            self.assertEqual(result["status"], "success")
+            self.assertEqual(result["processing_status"], "busy")
+            self.assertEqual(result["scraping_data"]["title"], "T")
+            self.assertIsNone(service._cache.get(url))
+
+        asyncio.run(_test())
+
+    def test_processing_broker_respects_worker_slots(self) -> None:
+        """
+        En modo pull cada Servidor B recibe como mucho sus slots a la vez;
+        el resto espera en la cola del broker. Si un worker se cae con una
+        página en curso, la página vuelve a la cola.
+        """
+        async def _test() -> None:
+            from common.protocol import read_message_async, send_message_async
+            from scraper.processing_broker import ProcessingBroker
+
+            broker = ProcessingBroker("127.0.0.1", 0)
+            await broker.start()
+            port = broker._server.sockets[0].getsockname()[1]
+            peak = {}
+            handled = {}
+
+            async def _worker(name, slots, delay, die_after=None):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                await send_message_async(writer, {"action": "register", "slots": slots})
+                running = 0
+
+                async def _answer(msg):
+                    nonlocal running
+                    running += 1
+                    peak[name] = max(peak.get(name, 0), running)
+                    await asyncio.sleep(delay)
+                    running -= 1
+                    handled.setdefault(name, []).append(msg["n"])
+                    await send_message_async(writer, {"status": "ok", "n": msg["n"], "request_id": msg["request_id"]})
+
+                try:
+                    while True:
+                        msg = await read_message_async(reader)
+                        if msg.get("action") == "hello":
+                            await send_message_async(writer, {"status": "error", "request_id": msg["request_id"]})
+                            continue
+                        if die_after is not None and len(handled.get(name, [])) >= die_after:
+                            writer.close()  # se cae con la página en curso
+                            return
+                        asyncio.create_task(_answer(msg))
+                except asyncio.IncompleteReadError:
+                    writer.close()
+
+            workers = [
+                asyncio.create_task(_worker("rapido", 2, 0.01)),
+                asyncio.create_task(_worker("lento", 1, 0.05, die_after=1)),
+            ]
+            try:
+                while broker.stats()["slots"] < 3:
+                    await asyncio.sleep(0.01)
+                responses = await asyncio.gather(
+                    *(broker.request({"action": "process_page", "n": n}, timeout=5) for n in range(12))
+                )
+                self.assertEqual([r["n"] for r in responses], list(range(12)))
+                self.assertLessEqual(peak["rapido"], 2)
+                self.assertLessEqual(peak["lento"], 1)
+                self.assertGreater(len(handled["rapido"]), len(handled["lento"]))
+
+                stats = broker.stats()
+                self.assertEqual(stats["requeued"], 1)
+                self.assertEqual(len(stats["workers"]), 1)  # "lento" se desconectó
+                self.assertEqual((stats["busy"], stats["queued"]), (0, 0))
+
+                # Sin slots libres, la espera en la cola cuenta para el timeout
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.gather(
+                        *(broker.request({"action": "process_page", "n": n}, timeout=0.015) for n in range(4))
+                    )
+            finally:
+                await broker.close()
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        asyncio.run(_test())
+
+    def test_processing_broker_keeps_slot_of_timed_out_page(self) -> None:
+        """
+        Si una request vence con la página ya en el worker, el slot sigue
+        ocupado hasta la respuesta tardía: no se le manda otra página.
+        """
+        async def _test() -> None:
+            from common.protocol import read_message_async, send_message_async
+            from scraper.processing_broker import ProcessingBroker
+
+            broker = ProcessingBroker("127.0.0.1", 0)
+            await broker.start()
+            port = broker._server.sockets[0].getsockname()[1]
+            received = []
+            release = asyncio.Event()
+
+            async def _worker():
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                await send_message_async(writer, {"action": "register", "slots": 1})
+
+                async def _answer(msg):
+                    if msg["n"] == 0:
+                        await release.wait()  # página lenta
+                    await send_message_async(writer, {"status": "ok", "n": msg["n"], "request_id": msg["request_id"]})
+
+                try:
+                    while True:
+                        msg = await read_message_async(reader)
+                        if msg.get("action") == "hello":
+                            await send_message_async(writer, {"status": "error", "request_id": msg["request_id"]})
+                            continue
+                        received.append(msg["n"])
+                        asyncio.create_task(_answer(msg))
+                except asyncio.IncompleteReadError:
+                    writer.close()
+
+            worker = asyncio.create_task(_worker())
+            try:
+                while broker.stats()["slots"] < 1:
+                    await asyncio.sleep(0.01)
+                with self.assertRaises(asyncio.TimeoutError):
+                    await broker.request({"action": "process_page", "n": 0}, timeout=0.1)
+
+                second = asyncio.create_task(broker.request({"action": "process_page", "n": 1}, timeout=5))
+                await asyncio.sleep(0.2)
+                self.assertEqual(received, [0])  # el slot sigue tomado
+                stats = broker.stats()
+                self.assertEqual((stats["busy"], stats["queued"], stats["abandoned"]), (1, 1, 1))
+
+                release.set()  # llega la respuesta tardía: se libera el slot
+                self.assertEqual((await second)["n"], 1)
+                self.assertEqual(received, [0, 1])
+                self.assertEqual(broker.stats()["busy"], 0)
+            finally:
+                await broker.close()
+                worker.cancel()
+                await asyncio.gather(worker, return_exceptions=True)
+
+        asyncio.run(_test())
 
 
 if __name__ == "__main__":